@@ -0,0 +1,94 @@
+"""
+Benchmark Import: Measures cold import time of the RAG pipeline (src.rag.rag_pipeline).
+
+Each run imports the module in a fresh interpreter with `-X importtime`.
+The script reports the median wall time, the slowest modules by cumulative
+import time, and whether any SDK that should load lazily (Gemini, Pinecone)
+was imported anyway. With --budget-ms it exits non-zero when the median goes
+over budget, so a slow import fails CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# SDKs that must only load when a client is first used
+LAZY_MODULES = ("google.genai", "google.generativeai", "pinecone")
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def import_once(module, env):
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        (seconds, eagerly loaded SDKs, {module: cumulative microseconds})
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return probe["seconds"], probe["loaded"], cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold import time")
+    parser.add_argument("--module", default="src.rag.rag_pipeline")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import is slower")
+    parser.add_argument("--without-keys", action="store_true", help="Unset API keys (import must still succeed)")
+    parser.add_argument("--output", help="Write the result as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.without_keys:
+        for key in ("GOOGLE_API_KEY", "PINECONE_API_KEY"):
+            env.pop(key, None)
+
+    runs = [import_once(args.module, env) for _ in range(args.runs)]
+    seconds = [run[0] for run in runs]
+    loaded = sorted({name for run in runs for name in run[1]})
+    median_ms = statistics.median(seconds) * 1000
+    slowest = sorted(runs[-1][2].items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(f"import {args.module}: median {median_ms:.0f} ms, min {min(seconds) * 1000:.0f} ms over {args.runs} runs")
+    print(f"\n{'module':<48}{'cumulative ms':>14}")
+    for name, micros in slowest:
+        print(f"{name:<48}{micros / 1000:>14.1f}")
+    if loaded:
+        print(f"\nEagerly imported SDKs: {', '.join(loaded)}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"module": args.module, "median_ms": round(median_ms, 1),
+                       "runs_ms": [round(s * 1000, 1) for s in seconds], "eager_sdks": loaded,
+                       "slowest": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in slowest]},
+                      f, indent=2)
+
+    if loaded or (args.budget_ms is not None and median_ms > args.budget_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark Quantization: Compares exact, int8, PQ and HNSW local search.
+
+Reports memory per vector, queries per second and recall@k against exact
+search. Runs on the real embedding store when it exists, otherwise on
+synthetic clustered vectors, so it needs no API keys.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_db.embedding_store import open_store, write_store
+from src.vector_db.local_index import LocalVectorIndex
+from src.vector_db.quantized_index import QuantizedVectorIndex
+from src.vector_db.hnsw_index import HNSWVectorIndex
+
+
+def synthetic_store(path, count, dim, seed=0):
+    # Clustered data behaves more like real embeddings than isotropic noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, count // 200), dim))
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.35 * rng.normal(size=(count, dim))
+    ids = [f"v{i}" for i in range(count)]
+    metadata = [{"year": 2015 + i % 10} for i in range(count)]
+    return write_store(path, ids, vectors.astype(np.float32), metadata)
+
+
+def measure(index, queries, top_k):
+    start = time.perf_counter()
+    results = [[hit[0] for hit in index.query(q, top_k=top_k)] for q in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def recall(results, truth):
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized local search")
+    parser.add_argument("--embeddings", default="data/embeddings/clios_embeddings.jsonl")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Vectors to generate when no embeddings exist")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pq-subspaces", type=int, default=96)
+    parser.add_argument("--rescore-factor", type=int, default=10)
+    parser.add_argument("--modes", default="int8,pq", help="Comma-separated modes to compare (int8, pq, hnsw)")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if os.path.exists(args.embeddings):
+            store = open_store(args.embeddings)
+            print(f"Using {args.embeddings}: {len(store)} vectors, {store.dim} dims")
+        else:
+            store = synthetic_store(os.path.join(tmp, "synthetic.embstore"), args.synthetic, args.dim)
+            print(f"Using synthetic data: {len(store)} vectors, {store.dim} dims")
+
+        rng = np.random.default_rng(1)
+        rows = rng.choice(len(store), size=min(args.queries, len(store)), replace=False)
+        # Perturbed copies of stored vectors stand in for real queries
+        queries = np.asarray(store.vectors[np.sort(rows)], dtype=np.float32)
+        queries += 0.1 * queries.std() * rng.normal(size=queries.shape).astype(np.float32)
+
+        exact = LocalVectorIndex(store)
+        truth, exact_qps = measure(exact, queries, args.top_k)
+
+        print(f"\n{'mode':<8}{'bytes/vector':>14}{'QPS':>10}{f'recall@{args.top_k}':>12}{'build s':>10}")
+        print(f"{'exact':<8}{store.vectors.dtype.itemsize * store.dim:>14}{exact_qps:>10.0f}{1.0:>12.3f}{0:>10.1f}")
+
+        for mode in args.modes.split(","):
+            start = time.perf_counter()
+            if mode == "hnsw":
+                index = HNSWVectorIndex.load(store, M=args.hnsw_m, ef_search=args.hnsw_ef_search,
+                                             path=os.path.join(tmp, "benchmark.hnsw"))
+                # Normalized float32 copy plus the layer-0 links
+                bytes_per_vector = 4 * store.dim + 4 * index.graph.M0
+            else:
+                index = QuantizedVectorIndex.build(store, mode, args.pq_subspaces, rescore_factor=args.rescore_factor)
+                bytes_per_vector = index.bytes_per_vector
+            build_seconds = time.perf_counter() - start
+            results, qps = measure(index, queries, args.top_k)
+            print(f"{mode:<8}{bytes_per_vector:>14}{qps:>10.0f}{recall(results, truth):>12.3f}{build_seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""
+Benchmark RAG: Offline latency, throughput, memory and recall benchmark for rag_pipeline.query.
+
+Gemini and Pinecone are replaced by deterministic local stand-ins with
+configurable injected latency:
+
+- embedding: hashed bag-of-words vectors (same text -> same vector)
+- vector search: the real LocalVectorIndex over the golden documents plus
+  synthetic distractors, embedded with the same hash embedder
+- LLM: a fake Gemini model that sleeps and returns a fixed answer
+
+Everything between the stubs (filter extraction, retrieval fan-out, BM25,
+fusion, context building, prompt building) is the real code. Results are
+written as JSON; pass --compare with an earlier result file to print the
+change per metric between commits.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The stubs replace every network client, so the config must not demand real keys
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from src.rag import rag_pipeline, reranker, retriever, response_generator
+from src.rag.reranker import CrossEncoderReranker
+from src.vector_db.embedding_store import write_store
+from src.vector_db.lexical_index import tokenize
+from src.vector_db.local_index import LocalVectorIndex
+from src.vector_db.pinecone_utils import format_match
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_queries.json")
+RESULTS_DIR = "data/benchmarks"
+
+DISTRACTOR_WORDS = (
+    "campaign agency brand film print digital radio design social craft innovation launch "
+    "shortlist bronze silver gold entry client creative director partnership experiential "
+    "billboard stadium concert festival album trailer series streaming podcast wellness pharma"
+).split()
+CATEGORIES = ["Clio Sports", "Clio Music", "Clio Health", "Clio Entertainment", "Clio Cannabis", None]
+PAGE_TYPES = ["winners", "jury", "events", "home"]
+
+
+def hash_embed(text, dim):
+    """
+    Deterministic bag-of-words embedding: each token adds +-1 to one hashed dimension.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'little')
+        vector[value % dim] += 1.0 if (value >> 63) else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def load_golden(path=GOLDEN_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_corpus(documents, distractors, seed=0):
+    """
+    Golden documents followed by synthetic distractor chunks with random metadata.
+    """
+    rng = random.Random(seed)
+    corpus = list(documents)
+    for i in range(distractors):
+        words = rng.choices(DISTRACTOR_WORDS, k=40)
+        corpus.append({
+            "chunk_id": f"distractor_{i}",
+            "title": f"Entry {i}",
+            "url": f"https://clios.com/entries/{i}",
+            "year": rng.choice([None] + list(range(2015, 2026))),
+            "category": rng.choice(CATEGORIES),
+            "page_type": rng.choice(PAGE_TYPES),
+            "content": " ".join(words)
+        })
+    return corpus
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations (ms) per pipeline stage from any thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds * 1000.0)
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+
+    def wrap(self, stage, func):
+        if asyncio.iscoroutinefunction(func):
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        with self.lock:
+            return {stage: summarize(values) for stage, values in self.samples.items()}
+
+
+def summarize(values_ms):
+    values = np.asarray(values_ms, dtype=np.float64)
+    if values.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": int(values.size), "mean_ms": round(float(values.mean()), 3), "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+
+class Latency:
+    """
+    Injected latency: base milliseconds plus uniform jitter (a fraction of the base).
+    """
+
+    def __init__(self, ms, jitter=0.0, seed=0):
+        self.ms = ms
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def seconds(self):
+        with self.lock:
+            spread = self.ms * self.jitter * (2.0 * self.rng.random() - 1.0)
+        return max(0.0, self.ms + spread) / 1000.0
+
+
+@contextlib.contextmanager
+def stubbed_pipeline(corpus, embed_latency, search_latency, llm_latency, dim=256, hybrid=True,
+                     answer_cache=False, rerank=False):
+    """
+    Swap the network-bound functions of the pipeline for local stand-ins and time every stage.
+
+    Yields:
+        StageTimer receiving the per-stage durations
+    """
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as tmp:
+        chunks_file = os.path.join(tmp, "chunks.jsonl")
+        with open(chunks_file, 'w', encoding='utf-8') as f:
+            for chunk in corpus:
+                f.write(json.dumps(chunk) + "\n")
+
+        metadata = [{key: value for key, value in chunk.items() if key != "chunk_id"} for chunk in corpus]
+        vectors = np.stack([hash_embed(f"{c['title']} {c['content']}", dim) for c in corpus])
+        index = LocalVectorIndex(write_store(os.path.join(tmp, "corpus.embstore"),
+                                             [c["chunk_id"] for c in corpus], vectors, metadata))
+
+        async def stub_embed(text):
+            await asyncio.sleep(embed_latency.seconds())
+            return hash_embed(text, dim).tolist()
+
+        def stub_search(query_embedding, top_k=5, filters=None):
+            time.sleep(search_latency.seconds())
+            hits = index.query(query_embedding, top_k=top_k, filters=filters or None)
+            return [format_match(match_id, score, meta) for match_id, score, meta in hits]
+
+        class StubModels:
+            async def generate_content(self, model, contents, config=None):
+                await asyncio.sleep(llm_latency.seconds())
+                return SimpleNamespace(text=f"Stub answer from {contents.count('[Result ')} sources.")
+
+        stub_client = SimpleNamespace(aio=SimpleNamespace(models=StubModels()))
+
+        patches = [
+            (rag_pipeline, "answer_cache", rag_pipeline.answer_cache if answer_cache else None),
+            (rag_pipeline, "extract_filters", timer.wrap("filters", rag_pipeline.extract_filters)),
+            (rag_pipeline, "embed_query_async", timer.wrap("embed", stub_embed)),
+            (rag_pipeline, "retrieve_async", timer.wrap("retrieve", rag_pipeline.retrieve_async)),
+            (rag_pipeline, "build_context", timer.wrap("context", rag_pipeline.build_context)),
+            (rag_pipeline, "generate_response_async", timer.wrap("generate", rag_pipeline.generate_response_async)),
+            (retriever, "embed_query_async", timer.wrap("embed", stub_embed)),
+            (retriever, "search_by_vector", timer.wrap("vector_search", stub_search)),
+            (retriever, "lexical_search", timer.wrap("lexical_search", retriever.lexical_search)),
+            (retriever, "HYBRID_SEARCH_ENABLED", hybrid),
+            # The cross-encoder runs for real (on the CPU) only when asked for
+            (retriever, "get_reranker", retriever.get_reranker if rerank else (lambda: None)),
+            (reranker, "RERANK_ENABLED", rerank or reranker.RERANK_ENABLED),
+            (CrossEncoderReranker, "rerank", timer.wrap("rerank", CrossEncoderReranker.rerank)),
+            (retriever, "LEXICAL_CHUNKS_FILE", chunks_file),
+            (response_generator, "get_gemini_client", lambda: stub_client),
+        ]
+        originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+        try:
+            for module, name, value in patches:
+                setattr(module, name, value)
+            yield timer
+        finally:
+            for module, name, value in originals:
+                setattr(module, name, value)
+
+
+def timed_query(timer, query):
+    start = time.perf_counter()
+    response = rag_pipeline.query(query)
+    timer.record("total", time.perf_counter() - start)
+    return response
+
+
+def run_level(timer, queries, concurrency, requests):
+    """
+    Issue `requests` queries from `concurrency` threads, each calling rag_pipeline.query.
+    """
+    timer.reset()
+    workload = [queries[i % len(queries)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda q: timed_query(timer, q), workload))
+    elapsed = time.perf_counter() - start
+    stages = timer.summary()
+    return {"concurrency": concurrency, "requests": requests, "seconds": round(elapsed, 3),
+            "qps": round(requests / elapsed, 2), "latency": stages.pop("total"), "stages": stages}
+
+
+def measure_memory(timer, queries, top_sites=5):
+    """
+    Run each query once under tracemalloc.
+
+    Reports peak traced memory, blocks still allocated afterwards (growth that
+    would accumulate per request), garbage collections triggered, and the
+    source lines that allocated the most.
+    """
+    for query in queries:
+        timed_query(timer, query)  # Warm lazily built indexes and caches first
+
+    gc.collect()
+    collections_before = sum(stat["collections"] for stat in gc.get_stats())
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for query in queries:
+        timed_query(timer, query)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections_before
+
+    # The harness's own bookkeeping (stage samples) is not pipeline memory
+    exclude = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(exclude).compare_to(before.filter_traces(exclude), "lineno")
+    retained_blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+    top = sorted(diff, key=lambda stat: stat.size_diff, reverse=True)[:top_sites]
+    return {
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_blocks": retained_blocks,
+        "retained_blocks_per_query": round(retained_blocks / len(queries), 1),
+        "gc_collections": collections,
+        "top_sites": [{"site": str(stat.traceback[0]), "size_diff_kib": round(stat.size_diff / 1024, 1),
+                       "count_diff": stat.count_diff} for stat in top]
+    }
+
+
+def measure_recall(golden_queries, k):
+    """
+    recall@k of the golden set: share of expected source IDs among the top-k sources.
+    """
+    per_query = []
+    for item in golden_queries:
+        sources = [source['id'] for source in rag_pipeline.query(item["query"])['sources'][:k]]
+        expected = set(item["expected"])
+        per_query.append({"query": item["query"], "recall": round(len(expected & set(sources)) / len(expected), 3),
+                          "sources": sources})
+    return {"k": k, "recall_at_k": round(float(np.mean([q["recall"] for q in per_query])), 4),
+            "queries": per_query}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(golden, distractors=2000, concurrency_levels=(1, 4, 16), requests=100, embed_ms=50.0,
+                  search_ms=20.0, llm_ms=400.0, jitter=0.2, hybrid=True, rerank=False, k=5, seed=0):
+    """
+    Run the full benchmark and return the result document.
+    """
+    corpus = build_corpus(golden["documents"], distractors, seed)
+    queries = [item["query"] for item in golden["queries"]]
+    latencies = [Latency(embed_ms, jitter, seed), Latency(search_ms, jitter, seed + 1), Latency(llm_ms, jitter, seed + 2)]
+
+    with stubbed_pipeline(corpus, *latencies, hybrid=hybrid, rerank=rerank) as timer:
+        recall = measure_recall(golden["queries"], k)
+        levels = [run_level(timer, queries, c, requests) for c in concurrency_levels]
+        memory = measure_memory(timer, queries)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {"corpus_size": len(corpus), "requests": requests, "embed_ms": embed_ms,
+                     "search_ms": search_ms, "llm_ms": llm_ms, "jitter": jitter, "hybrid": hybrid, "rerank": rerank},
+        "recall": recall,
+        "throughput": levels,
+        "memory": memory
+    }
+
+
+def compare(result, baseline):
+    """
+    Print per-metric changes relative to a previous result file.
+    """
+    def line(name, new, old, lower_is_better=True):
+        if not old:
+            return
+        change = (new - old) / old * 100.0
+        worse = change > 0 if lower_is_better else change < 0
+        flag = "  <-- regression" if worse and abs(change) >= 10 else ""
+        print(f"  {name:<32}{old:>12.2f}{new:>12.2f}{change:>+9.1f}%{flag}")
+
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    line(f"recall@{result['recall']['k']}", result["recall"]["recall_at_k"], baseline["recall"]["recall_at_k"], False)
+    old_levels = {level["concurrency"]: level for level in baseline["throughput"]}
+    for level in result["throughput"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        c = level["concurrency"]
+        line(f"c={c} qps", level["qps"], old["qps"], False)
+        line(f"c={c} p95 ms", level["latency"]["p95_ms"], old["latency"]["p95_ms"])
+        for stage, stats in level["stages"].items():
+            if stage in old["stages"]:
+                line(f"c={c} {stage} p50 ms", stats["p50_ms"], old["stages"][stage]["p50_ms"])
+    line("peak KiB", result["memory"]["peak_kib"], baseline["memory"]["peak_kib"])
+    line("retained blocks/query", result["memory"]["retained_blocks_per_query"],
+         baseline["memory"]["retained_blocks_per_query"])
+
+
+def print_report(result):
+    print(f"\nrecall@{result['recall']['k']}: {result['recall']['recall_at_k']:.3f}")
+    print(f"\n{'concurrency':<13}{'QPS':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for level in result["throughput"]:
+        latency = level["latency"]
+        print(f"{level['concurrency']:<13}{level['qps']:>8.1f}{latency['p50_ms']:>10.1f}"
+              f"{latency['p95_ms']:>10.1f}{latency['p99_ms']:>10.1f}")
+
+    print(f"\nStages at concurrency {result['throughput'][0]['concurrency']}:")
+    print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in result["throughput"][0]["stages"].items():
+        print(f"{stage:<16}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+    memory = result["memory"]
+    print(f"\nMemory: peak {memory['peak_kib']} KiB, {memory['retained_blocks_per_query']} retained blocks/query, "
+          f"{memory['gc_collections']} GC collections over {memory['queries']} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmark")
+    parser.add_argument("--golden", default=GOLDEN_FILE, help="Golden queries/documents JSON")
+    parser.add_argument("--distractors", type=int, default=2000, help="Synthetic chunks added to the corpus")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Queries per concurrency level")
+    parser.add_argument("--embed-ms", type=float, default=50.0, help="Injected embedding latency")
+    parser.add_argument("--search-ms", type=float, default=20.0, help="Injected vector search latency")
+    parser.add_argument("--llm-ms", type=float, default=400.0, help="Injected LLM latency")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter as a fraction of the base")
+    parser.add_argument("--no-hybrid", action="store_true", help="Disable BM25 fusion")
+    parser.add_argument("--rerank", action="store_true", help="Rerank with the local cross-encoder (needs sentence-transformers)")
+    parser.add_argument("--top-k", type=int, default=5, help="k for recall@k")
+    parser.add_argument("--output", help="Result JSON path (default: data/benchmarks/rag-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    result = run_benchmark(
+        load_golden(args.golden), distractors=args.distractors,
+        concurrency_levels=[int(c) for c in args.concurrency.split(",")], requests=args.requests,
+        embed_ms=args.embed_ms, search_ms=args.search_ms, llm_ms=args.llm_ms, jitter=args.jitter,
+        hybrid=not args.no_hybrid, rerank=args.rerank, k=args.top_k
+    )
+    print_report(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"rag-{result['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Run Query Batch: Answers a file of questions with rag_pipeline.query_batch (nightly eval, FAQ precomputation).
+
+Questions are read from a text file (one per line) or a JSON file (a list of
+strings, a list of {"query": ...} objects, or golden_queries.json's
+{"queries": [...]}). One JSON line per question is written in input order;
+questions that failed carry an 'error' and the run exits with code 1.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.rag import rag_pipeline
+from src.rag.config import BATCH_CONCURRENCY, QUERY_TIMEOUT_SECONDS
+
+
+def load_queries(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        if not path.endswith(".json"):
+            return [line.strip() for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data["queries"]
+    return [item["query"] if isinstance(item, dict) else item for item in data]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions with rag_pipeline.query_batch")
+    parser.add_argument("input", help="Questions: .txt (one per line) or .json")
+    parser.add_argument("--output", default="data/batch/answers.jsonl", help="JSONL of responses, in input order")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Queries in flight at once")
+    parser.add_argument("--timeout", type=float, default=QUERY_TIMEOUT_SECONDS, help="Latency budget per query")
+    parser.add_argument("--no-filters", action="store_true", help="Disable regex filter extraction")
+    args = parser.parse_args()
+
+    queries = load_queries(args.input)
+    print(f"Answering {len(queries)} questions (concurrency {args.concurrency})...")
+    rag_pipeline.warmup()
+
+    start = time.perf_counter()
+    responses = rag_pipeline.query_batch(queries, enable_filters=not args.no_filters,
+                                         timeout=args.timeout, concurrency=args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for response in responses:
+            f.write(json.dumps(response, default=str) + "\n")
+
+    failed = sum(1 for response in responses if response.get('error'))
+    print(f"Done: {len(responses)} answers in {elapsed:.1f}s ({len(responses) / max(elapsed, 1e-9):.1f}/s), "
+          f"{failed} with errors. Written to {args.output}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
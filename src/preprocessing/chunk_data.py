@@ -0,0 +1,310 @@
+"""
+Chunk Data: Splits cleaned documents into token-bounded, overlapping chunks.
+
+Records are streamed from the cleaned JSONL one at a time, so memory stays flat
+regardless of corpus size. Chunks are cut on word boundaries using tiktoken
+token counts, and each chunk ID is derived from the page URL and the chunk
+text, so unchanged text always maps to the same ID and downstream embedding
+can skip it.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from src.preprocessing.manifest import content_hash, copy_lines, index_jsonl
+
+ENCODING_NAME = "cl100k_base"
+
+CATEGORY_KEYWORDS = [
+    ("clio sports", "Clio Sports"),
+    ("clio health", "Clio Health"),
+    ("clio music", "Clio Music"),
+    ("clio entertainment", "Clio Entertainment"),
+    ("clio cannabis", "Clio Cannabis"),
+]
+
+_encoding = None
+_encoding_loaded = False
+
+def get_encoding():
+    """
+    Load the tiktoken encoding once per process.
+
+    Returns None when the encoding is unavailable (e.g. no network to fetch
+    the BPE file), in which case token counts fall back to an estimate.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception as e:
+            print(f"tiktoken encoding unavailable ({e}); estimating token counts.")
+            _encoding = None
+    return _encoding
+
+def word_token_counts(words: List[str]) -> List[int]:
+    """
+    Token count of each word as it appears in running text (with a leading space).
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return [max(1, (len(word) + 3) // 4) for word in words]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch([" " + word for word in words])]
+
+def split_text(text: str, chunk_size: int = 512, overlap: int = 64) -> List[Dict]:
+    """
+    Split text into word-aligned windows of at most chunk_size tokens.
+
+    Args:
+        text: Cleaned document text
+        chunk_size: Maximum tokens per chunk
+        overlap: Tokens repeated from the end of the previous chunk
+
+    Returns:
+        List of {"content", "token_count"} dicts
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    words = text.split()
+    if not words:
+        return []
+    counts = word_token_counts(words)
+
+    chunks = []
+    start = 0
+    while start < len(words):
+        end = start
+        total = 0
+        # Always take at least one word so oversized words cannot stall the loop
+        while end < len(words) and (end == start or total + counts[end] <= chunk_size):
+            total += counts[end]
+            end += 1
+
+        chunks.append({"content": " ".join(words[start:end]), "token_count": total})
+        if end == len(words):
+            break
+
+        # Step back over whole words until the overlap budget is used
+        next_start = end
+        carried = 0
+        while next_start > start + 1 and carried + counts[next_start - 1] <= overlap:
+            carried += counts[next_start - 1]
+            next_start -= 1
+        start = next_start
+
+    return chunks
+
+def detect_year(text: str) -> Optional[int]:
+    match = re.search(r'\b(199\d|20[0-2]\d)\b', text)
+    return int(match.group(0)) if match else None
+
+def detect_category(url: str, text: str) -> Optional[str]:
+    # The URL is the most reliable signal (e.g. /sports/, /clio-health/)
+    url_lower = url.lower()
+    for keyword, category in CATEGORY_KEYWORDS:
+        if keyword.split()[1] in url_lower:
+            return category
+
+    text_lower = text.lower()
+    for keyword, category in CATEGORY_KEYWORDS:
+        if keyword in text_lower:
+            return category
+    if "clio" in text_lower:
+        return "Clio Awards"
+    return None
+
+def make_chunk_id(url: str, content: str) -> str:
+    """
+    Content-addressed chunk ID: URL hash prefix + hash of the chunk text.
+    """
+    url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()[:8]
+    text_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]
+    return f"{url_hash}_{text_hash}"
+
+def chunk_record(record: Dict, chunk_size: int = 512, overlap: int = 64) -> List[Dict]:
+    """
+    Split one cleaned record into chunk records.
+
+    Args:
+        record: Cleaned document ({url, content, page_type, ...})
+        chunk_size: Maximum tokens per chunk
+        overlap: Tokens shared between consecutive chunks
+
+    Returns:
+        List of chunk dictionaries ready for embedding
+    """
+    url = record.get('url', '#')
+    pieces = split_text(record.get('content', ''), chunk_size=chunk_size, overlap=overlap)
+
+    # Identical text repeated on one page would collide on its ID; keep the first copy
+    unique = {}
+    for piece in pieces:
+        unique.setdefault(make_chunk_id(url, piece['content']), piece)
+
+    chunks = []
+    for i, (chunk_id, piece) in enumerate(unique.items()):
+        content = piece['content']
+        title = record.get('title') or (content[:100] + "...")
+        chunks.append({
+            "chunk_id": chunk_id,
+            "url": url,
+            "page_type": record.get('page_type', 'page'),
+            "chunk_index": i,
+            "total_chunks": len(unique),
+            "content": content,
+            "content_length": len(content),
+            "token_count": piece['token_count'],
+            "title": title,
+            "year": record.get('year') or detect_year(content),
+            "category": record.get('category') or detect_category(url, content)
+        })
+    return chunks
+
+def iter_records(input_file: str) -> Iterator[Dict]:
+    """
+    Stream cleaned records one at a time.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _chunk_batch(args):
+    records, chunk_size, overlap = args
+    return [chunk_record(record, chunk_size, overlap) for record in records]
+
+def iter_chunks(records: Iterator[Dict], chunk_size: int = 512, overlap: int = 64,
+                workers: int = 1, batch_size: int = 64) -> Iterator[Dict]:
+    """
+    Chunk a stream of records, optionally across a process pool.
+
+    Output order always matches input order, so runs are reproducible.
+
+    Args:
+        records: Iterator of cleaned records
+        chunk_size: Maximum tokens per chunk
+        overlap: Tokens shared between consecutive chunks
+        workers: Worker processes (1 = chunk in this process)
+        batch_size: Records sent to a worker at a time
+
+    Yields:
+        Chunk dictionaries
+    """
+    if workers <= 1:
+        for record in records:
+            yield from chunk_record(record, chunk_size, overlap)
+        return
+
+    def batches():
+        iterator = iter(records)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield (batch, chunk_size, overlap)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Submit a bounded window of batches so the input is never fully loaded
+        window = []
+        for args in batches():
+            window.append(pool.submit(_chunk_batch, args))
+            if len(window) >= workers * 2:
+                for chunks in window.pop(0).result():
+                    yield from chunks
+        for future in window:
+            for chunks in future.result():
+                yield from chunks
+
+def record_hash(record: Dict, chunk_size: int, overlap: int) -> str:
+    # Chunking settings are part of the hash so changing them re-chunks every page
+    return content_hash(f"{chunk_size}:{overlap}:{record.get('content', '')}")
+
+def chunk_file(input_file="data/cleaned/clios_clean.jsonl", output_file="data/chunks/clios_chunks.jsonl",
+               chunk_size=512, overlap=64, workers=1, manifest=None, dry_run=False):
+    """
+    Chunk the cleaned corpus into the chunk JSONL used for embedding.
+
+    Args:
+        manifest: Optional Manifest; unchanged pages keep their previous chunks
+        dry_run: Only report the delta against the manifest
+
+    Returns:
+        Dictionary of run statistics (or the delta summary for a dry run)
+    """
+    print("Starting chunking...")
+
+    if manifest is not None and dry_run:
+        current = {r.get('url', '#'): record_hash(r, chunk_size, overlap) for r in iter_records(input_file)}
+        delta = manifest.diff("chunk", current)
+        delta.report()
+        return delta.summary()
+
+    if not os.path.exists(os.path.dirname(output_file)):
+        os.makedirs(os.path.dirname(output_file))
+
+    stats = {"documents": 0, "chunks": 0, "tokens": 0, "unchanged": 0}
+    previous_hashes = manifest.hashes("chunk") if manifest is not None else {}
+    previous_lines = index_jsonl(output_file, "url") if manifest is not None else {}
+    current = {}
+    unchanged: List[str] = []
+    # Previous chunks are found by url, so only records with a url of their own can keep them
+    # (url-less "#" records and urls shared by several records are always re-chunked)
+    url_counts = Counter(record.get('url', '#') for record in iter_records(input_file)) if previous_lines else {}
+
+    def changed_records():
+        for record in iter_records(input_file):
+            url = record.get('url', '#')
+            digest = record_hash(record, chunk_size, overlap)
+            current[url] = digest
+            if (previous_hashes.get(url) == digest and url in previous_lines
+                    and url != '#' and url_counts.get(url) == 1):
+                unchanged.append(url)
+                continue
+            yield record
+
+    # Write to a temp file so readers never see a half-written chunk file
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as outfile:
+        for chunk in iter_chunks(changed_records(), chunk_size, overlap, workers):
+            if chunk['chunk_index'] == 0:
+                stats["documents"] += 1
+            outfile.write(json.dumps(chunk) + "\n")
+            stats["chunks"] += 1
+            stats["tokens"] += chunk['token_count']
+
+    # Unchanged pages keep their previous chunks (and chunk IDs) verbatim
+    if unchanged:
+        with open(output_file, 'rb') as previous, open(tmp_file, 'ab') as outfile:
+            for url in unchanged:
+                outfile.write(copy_lines(previous, previous_lines[url]))
+        stats["unchanged"] = len(unchanged)
+    os.replace(tmp_file, output_file)
+
+    if manifest is not None:
+        manifest.replace("chunk", current)
+
+    print(f"Created {stats['chunks']} chunks from {stats['documents']} documents ({stats['tokens']} tokens), "
+          f"{stats['unchanged']} documents unchanged.")
+    return stats
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Chunk the cleaned corpus into JSONL")
+    arg_parser.add_argument("--input", default="data/cleaned/clios_clean.jsonl", help="Cleaned pages JSONL")
+    arg_parser.add_argument("--output", default="data/chunks/clios_chunks.jsonl", help="Chunk JSONL to write")
+    arg_parser.add_argument("--chunk-size", type=int, default=512, help="Maximum tokens per chunk")
+    arg_parser.add_argument("--overlap", type=int, default=64, help="Tokens shared by consecutive chunks")
+    arg_parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    args = arg_parser.parse_args()
+
+    chunk_file(args.input, args.output, chunk_size=args.chunk_size, overlap=args.overlap, workers=args.workers)
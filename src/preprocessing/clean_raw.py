@@ -1,11 +1,23 @@
 """
 Clean Raw Data: Processes raw HTML files into structured JSONL format.
+
+Pages are streamed from the crawl store (or legacy files) and can be cleaned
+across a process pool. The HTML parser is selectable: BeautifulSoup's
+pure-Python `html.parser` (default), BeautifulSoup with `lxml`, or
+`selectolax`. A backend that is not installed falls back to `html.parser`.
 """
 
 import os
 import json
+import time
 from bs4 import BeautifulSoup
 import re
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from src.preprocessing.manifest import content_hash, index_jsonl, copy_lines
+from src.scraping.crawl_store import CrawlStore, STORE_NAME, iter_json_array
+
+PARSERS = ("html.parser", "lxml", "selectolax")
 
 def clean_text(text):
     # Remove extra whitespace
@@ -14,7 +26,9 @@ def clean_text(text):
 
 def extract_metadata(soup, url):
     title = soup.title.string if soup.title else "Untitled"
-    
+    return page_metadata(title, url)
+
+def page_metadata(title, url):
     # Heuristic for page type
     page_type = "page"
     if "winner" in url or "award" in url:
@@ -36,64 +50,270 @@ def extract_metadata(soup, url):
         "year": year
     }
 
-def process_files(input_dir="data/raw", output_file="data/cleaned/clios_clean.jsonl"):
+def resolve_parser(parser):
+    """
+    Return the requested parser backend, or html.parser if it is not installed.
+    """
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser '{parser}', expected one of {PARSERS}")
+    if parser == "html.parser":
+        return parser
+    try:
+        __import__("selectolax.parser" if parser == "selectolax" else parser)
+        return parser
+    except ImportError:
+        print(f"{parser} is not installed; falling back to html.parser.")
+        return "html.parser"
+
+def extract_text_selectolax(html_content):
+    from selectolax.parser import HTMLParser
+    
+    tree = HTMLParser(html_content)
+    for node in tree.css("script, style"):
+        node.decompose()
+    title_node = tree.css_first("title")
+    title = title_node.text() if title_node else "Untitled"
+    root = tree.body or tree.root
+    return (root.text(separator=" ") if root else ""), title
+
+def clean_html(html_content, url, parser="html.parser"):
+    """
+    Clean one HTML page into a record, or None if the page is too short.
+    """
+    if parser == "selectolax":
+        text, title = extract_text_selectolax(html_content)
+        cleaned_content = clean_text(text)
+        if len(cleaned_content) < 100:
+            return None  # Skip empty/short pages
+        metadata = page_metadata(title, url)
+    else:
+        soup = BeautifulSoup(html_content, parser)
+        
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+            
+        # Get text
+        text = soup.get_text()
+        cleaned_content = clean_text(text)
+        
+        if len(cleaned_content) < 100:
+            return None  # Skip empty/short pages
+            
+        metadata = extract_metadata(soup, url)
+    
+    return {
+        "url": url,
+        "content": cleaned_content,
+        "content_length": len(cleaned_content),
+        **metadata
+    }
+
+def read_page_url(input_dir, filename):
+    # Get metadata (try to find corresponding meta json)
+    meta_filename = filename.replace("page_", "meta_").replace(".html", ".json")
+    meta_path = os.path.join(input_dir, meta_filename)
+    
+    url = "#"
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as mf:
+            meta_data = json.load(mf)
+            url = meta_data.get('url', '#')
+    return url
+
+def iter_pages(input_dir):
+    """
+    Yield (name, url, html_content) for every crawled page.
+    
+    Pages are streamed from the crawl store when input_dir has one, otherwise
+    from legacy page_N.html / meta_N.json files and clios_raw.json.
+    """
+    store_path = os.path.join(input_dir, STORE_NAME)
+    if os.path.exists(store_path):
+        for record in CrawlStore(store_path).iter_records():
+            yield record['url'], record['url'], record['html']
+        return
+        
+    for filename in os.listdir(input_dir):
+        if not filename.endswith(".html"):
+            continue
+            
+        filepath = os.path.join(input_dir, filename)
+        with open(filepath, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+            
+        yield filename, read_page_url(input_dir, filename), html_content
+        
+    raw_json = os.path.join(input_dir, "clios_raw.json")
+    if os.path.exists(raw_json):
+        for page in iter_json_array(raw_json):
+            yield page['url'], page['url'], page['content']
+
+def page_key(filename, url):
+    # Pages without a known URL are tracked by filename
+    return url if url != "#" else filename
+
+def _clean_page(name, url, html_content, parser):
+    start = time.perf_counter()
+    try:
+        record, error = clean_html(html_content, url, parser), None
+    except Exception as e:
+        record, error = None, str(e)
+    return {"name": name, "url": url, "record": record, "error": error,
+            "seconds": time.perf_counter() - start, "reused": False}
+
+def _clean_batch(args):
+    pages, parser = args
+    results = []
+    for name, url, html_content in pages:
+        if html_content is None:
+            # Unchanged page: copied from the previous output by the parent
+            results.append({"name": name, "url": url, "reused": True})
+        else:
+            results.append(_clean_page(name, url, html_content, parser))
+    return results
+
+def iter_cleaned(pages, parser="html.parser", workers=1, ordered=True, batch_size=16):
+    """
+    Clean a stream of (name, url, html) pages, optionally across a process pool.
+    
+    Pages with html None are passed through as reused. With ordered=False,
+    results are yielded as soon as a batch finishes.
+    
+    Yields:
+        Result dicts {name, url, record, error, seconds, reused}
+    """
+    if workers <= 1:
+        yield from _clean_batch((pages, parser))
+        return
+        
+    def batches():
+        iterator = iter(pages)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield (batch, parser)
+            
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of batches in flight so pages are never all in memory
+        window = []
+        for args in batches():
+            window.append(pool.submit(_clean_batch, args))
+            if len(window) >= workers * 2:
+                if ordered:
+                    yield from window.pop(0).result()
+                else:
+                    done, _ = wait(window, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        window.remove(future)
+                        yield from future.result()
+        for future in window:
+            yield from future.result()
+
+def process_files(input_dir="data/raw", output_file="data/cleaned/clios_clean.jsonl", manifest=None, dry_run=False,
+                  parser="html.parser", workers=1, ordered=True, slowest=5):
+    """
+    Clean crawled HTML pages into the cleaned JSONL.
+    
+    Args:
+        input_dir: Directory holding the crawl store (or legacy page_N.html / meta_N.json files)
+        output_file: Cleaned JSONL output
+        manifest: Optional Manifest; unchanged pages are copied from the previous output
+        dry_run: Only report the delta against the manifest
+        parser: HTML parser backend ("html.parser", "lxml" or "selectolax")
+        workers: Worker processes (1 = clean in this process)
+        ordered: Keep input order in the output (False writes pages as they finish)
+        slowest: Number of slowest pages to report
+        
+    Returns:
+        Dictionary of run statistics (or the delta summary for a dry run)
+    """
     print("Starting data cleaning...")
     
+    if manifest is not None and dry_run:
+        current = {page_key(filename, url): content_hash(html) for filename, url, html in iter_pages(input_dir)}
+        delta = manifest.diff("clean", current)
+        delta.report()
+        return delta.summary()
+    
     if not os.path.exists(os.path.dirname(output_file)):
         os.makedirs(os.path.dirname(output_file))
         
+    parser = resolve_parser(parser)
+    previous_hashes = manifest.hashes("clean") if manifest is not None else {}
+    previous_lines = index_jsonl(output_file, "url") if manifest is not None else {}
+    current = {}
+    reused = set()
+    
+    def pages():
+        for filename, url, html_content in iter_pages(input_dir):
+            key = page_key(filename, url)
+            digest = content_hash(html_content)
+            current[key] = digest
+            # The previous output is indexed by url, so only a url naming exactly one earlier
+            # record is copied, and only once; url-less ("#") pages are always re-cleaned
+            spans = previous_lines.get(url)
+            if (previous_hashes.get(key) == digest and key == url and spans is not None
+                    and len(spans) == 1 and url not in reused):
+                reused.add(url)
+                yield filename, url, None
+            else:
+                yield filename, url, html_content
+        
     processed_count = 0
+    reused_count = 0
+    timings = []
+    start_time = time.time()
     
-    with open(output_file, 'w', encoding='utf-8') as outfile:
-        for filename in os.listdir(input_dir):
-            if not filename.endswith(".html"):
-                continue
-                
-            filepath = os.path.join(input_dir, filename)
-            
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
-                    
-                soup = BeautifulSoup(html_content, 'html.parser')
-                
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
+    # Write to a temp file: the previous output is still read for unchanged pages
+    tmp_file = output_file + ".tmp"
+    previous = open(output_file, 'rb') if previous_lines else None
+    try:
+        with open(tmp_file, 'wb') as outfile:
+            for result in iter_cleaned(pages(), parser, workers, ordered):
+                if result["reused"]:
+                    outfile.write(copy_lines(previous, previous_lines[result["url"]]))
+                    reused_count += 1
+                    continue
                     
-                # Get text
-                text = soup.get_text()
-                cleaned_content = clean_text(text)
-                
-                if len(cleaned_content) < 100:
-                    continue  # Skip empty/short pages
-                    
-                # Get metadata (try to find corresponding meta json)
-                meta_filename = filename.replace("page_", "meta_").replace(".html", ".json")
-                meta_path = os.path.join(input_dir, meta_filename)
-                
-                url = "#"
-                if os.path.exists(meta_path):
-                    with open(meta_path, 'r', encoding='utf-8') as mf:
-                        meta_data = json.load(mf)
-                        url = meta_data.get('url', '#')
-                
-                metadata = extract_metadata(soup, url)
-                
-                record = {
-                    "url": url,
-                    "content": cleaned_content,
-                    "content_length": len(cleaned_content),
-                    **metadata
-                }
-                
-                outfile.write(json.dumps(record) + "\n")
+                timings.append((result["seconds"], result["url"]))
+                if result["error"]:
+                    print(f"Error processing {result['name']}: {result['error']}")
+                    continue
+                if result["record"] is None:
+                    continue
+                outfile.write((json.dumps(result["record"]) + "\n").encode('utf-8'))
                 processed_count += 1
-                
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                
-    print(f"Successfully cleaned {processed_count} documents.")
+    finally:
+        if previous is not None:
+            previous.close()
+            
+    os.replace(tmp_file, output_file)
+    
+    if manifest is not None:
+        manifest.replace("clean", current)
+        
+    elapsed = max(time.time() - start_time, 1e-9)
+    print(f"Successfully cleaned {processed_count} documents ({reused_count} unchanged) "
+          f"in {elapsed:.1f}s with {parser} ({len(timings) / elapsed:.1f} pages/s).")
+    
+    timings.sort(reverse=True)
+    if timings and slowest:
+        print("Slowest pages:")
+        for seconds, url in timings[:slowest]:
+            print(f"  {seconds * 1000:.1f} ms  {url}")
+            
+    return {"cleaned": processed_count, "unchanged": reused_count, "seconds": round(elapsed, 2),
+            "slowest": [(url, round(seconds, 4)) for seconds, url in timings[:slowest]]}
 
 if __name__ == "__main__":
-    process_files()
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description="Clean crawled pages into JSONL")
+    arg_parser.add_argument("--parser", default="html.parser", choices=PARSERS, help="HTML parser backend")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    arg_parser.add_argument("--unordered", action="store_true", help="Write pages as soon as they are cleaned")
+    args = arg_parser.parse_args()
+    
+    process_files(parser=args.parser, workers=args.workers, ordered=not args.unordered)
@@ -0,0 +1,71 @@
+"""
+Ingest: Runs clean -> chunk -> embed -> upload incrementally against the manifest.
+
+Only pages and chunks whose content hash changed since the last run are
+reprocessed; removed pages are pruned from the embeddings file and deleted
+from Pinecone. Use --dry-run to print the per-stage delta without changing
+anything.
+"""
+
+import argparse
+
+from src.preprocessing.manifest import Manifest
+from src.preprocessing.clean_raw import process_files
+from src.preprocessing.chunk_data import chunk_file
+from src.rag.config import (
+    LOCAL_INDEX_MODE, EMBEDDING_STORE_DTYPE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+)
+from src.vector_db.generate_embeddings import generate_embeddings
+from src.vector_db.local_index import get_local_index
+from src.vector_db.upload_to_pinecone import upload_vectors
+
+RAW_DIR = "data/raw"
+CLEANED_FILE = "data/cleaned/clios_clean.jsonl"
+CHUNKS_FILE = "data/chunks/clios_chunks.jsonl"
+EMBEDDINGS_FILE = "data/embeddings/clios_embeddings.jsonl"
+
+
+def run_ingestion(dry_run=False, manifest_path="data/manifest.sqlite3", upload=True):
+    """
+    Run every ingestion stage, reprocessing only what changed.
+
+    Args:
+        dry_run: Report what each stage would do without writing anything
+        manifest_path: SQLite manifest shared by all stages
+        upload: Also sync the Pinecone index
+
+    Returns:
+        Dictionary of per-stage results
+    """
+    manifest = Manifest(manifest_path)
+    results = {}
+    try:
+        results["clean"] = process_files(RAW_DIR, CLEANED_FILE, manifest=manifest, dry_run=dry_run)
+        if dry_run:
+            # Later stages read the outputs of earlier ones, which a dry run does not refresh
+            print("Dry run: chunk/embed/upload deltas reflect the current files on disk.")
+        results["chunk"] = chunk_file(CLEANED_FILE, CHUNKS_FILE, manifest=manifest, dry_run=dry_run)
+
+        results["embed"] = generate_embeddings(CHUNKS_FILE, EMBEDDINGS_FILE, manifest=manifest, dry_run=dry_run)
+
+        if LOCAL_INDEX_MODE == "hnsw" and not dry_run:
+            # Apply the embed delta to the HNSW graph now rather than on the first query
+            results["hnsw"] = len(get_local_index(EMBEDDINGS_FILE, dtype=EMBEDDING_STORE_DTYPE, mode="hnsw",
+                                                  hnsw_m=HNSW_M, hnsw_ef_construction=HNSW_EF_CONSTRUCTION,
+                                                  hnsw_ef_search=HNSW_EF_SEARCH))
+
+        if upload:
+            results["upload"] = upload_vectors(EMBEDDINGS_FILE, manifest=manifest, dry_run=dry_run)
+    finally:
+        manifest.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental ingestion pipeline")
+    parser.add_argument("--dry-run", action="store_true", help="Only report new/changed/removed items per stage")
+    parser.add_argument("--no-upload", action="store_true", help="Skip the Pinecone upload stage")
+    parser.add_argument("--manifest", default="data/manifest.sqlite3", help="Manifest database path")
+    args = parser.parse_args()
+
+    run_ingestion(dry_run=args.dry_run, manifest_path=args.manifest, upload=not args.no_upload)
@@ -0,0 +1,159 @@
+"""
+Manifest: Content-hash ledger that makes every ingestion stage incremental.
+
+Each stage (clean, chunk, embed, upload) records one hash per item it has
+processed (pages keyed by URL, chunks keyed by chunk_id). Comparing the
+current inputs against the manifest yields the delta: only new or changed
+items are reprocessed, and removed items are cleaned up downstream.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+class Delta:
+    """
+    Difference between the current items of a stage and its manifest entries.
+    """
+
+    def __init__(self, stage: str, new: List[str], changed: List[str], unchanged: List[str], removed: List[str]):
+        self.stage = stage
+        self.new = new
+        self.changed = changed
+        self.unchanged = unchanged
+        self.removed = removed
+
+    @property
+    def todo(self) -> List[str]:
+        return self.new + self.changed
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "new": len(self.new),
+            "changed": len(self.changed),
+            "unchanged": len(self.unchanged),
+            "removed": len(self.removed)
+        }
+
+    def report(self) -> None:
+        s = self.summary()
+        print(f"[{self.stage}] new: {s['new']}, changed: {s['changed']}, "
+              f"unchanged: {s['unchanged']}, removed: {s['removed']}")
+
+
+class Manifest:
+    """
+    SQLite-backed manifest of (stage, key) -> content hash.
+
+    Args:
+        path: SQLite file holding the manifest
+    """
+
+    def __init__(self, path: str = "data/manifest.sqlite3"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " stage TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (stage, key))"
+        )
+        self.conn.commit()
+
+    def hashes(self, stage: str) -> Dict[str, str]:
+        rows = self.conn.execute("SELECT key, hash FROM items WHERE stage = ?", (stage,))
+        return dict(rows.fetchall())
+
+    def diff(self, stage: str, current: Dict[str, str]) -> Delta:
+        """
+        Compare the current {key: hash} items of a stage against the manifest.
+        """
+        previous = self.hashes(stage)
+        new, changed, unchanged = [], [], []
+        for key, digest in current.items():
+            if key not in previous:
+                new.append(key)
+            elif previous[key] != digest:
+                changed.append(key)
+            else:
+                unchanged.append(key)
+        removed = [key for key in previous if key not in current]
+        return Delta(stage, new, changed, unchanged, removed)
+
+    def update(self, stage: str, items: Dict[str, str]) -> None:
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO items (stage, key, hash, updated_at) VALUES (?, ?, ?, ?)",
+            [(stage, key, digest, now) for key, digest in items.items()]
+        )
+        self.conn.commit()
+
+    def remove(self, stage: str, keys: Iterable[str]) -> None:
+        self.conn.executemany("DELETE FROM items WHERE stage = ? AND key = ?", [(stage, key) for key in keys])
+        self.conn.commit()
+
+    def replace(self, stage: str, items: Dict[str, str]) -> None:
+        """
+        Make the manifest for a stage exactly equal to `items`.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM items WHERE stage = ?", (stage,))
+            now = time.time()
+            self.conn.executemany(
+                "INSERT INTO items (stage, key, hash, updated_at) VALUES (?, ?, ?, ?)",
+                [(stage, key, digest, now) for key, digest in items.items()]
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def index_jsonl(path: str, key_field: str) -> Dict[str, List[tuple]]:
+    """
+    Map each key in a JSONL file to the (offset, length) of its lines.
+
+    Used to copy the previous output for unchanged items without re-running a stage.
+    """
+    index: Dict[str, List[tuple]] = {}
+    if not os.path.exists(path):
+        return index
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                try:
+                    key = json.loads(line).get(key_field)
+                except ValueError:
+                    key = None
+                if key is not None:
+                    index.setdefault(key, []).append((offset, len(line)))
+            offset += len(line)
+    return index
+
+
+def copy_lines(source, spans: List[tuple]) -> bytes:
+    """
+    Read the given (offset, length) spans from an open binary file.
+    """
+    parts = []
+    for offset, length in spans:
+        source.seek(offset)
+        parts.append(source.read(length))
+    return b"".join(parts)
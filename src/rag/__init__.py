@@ -9,6 +9,11 @@ This package provides a complete RAG implementation including:
 - Response generation
 """
 
-from .rag_pipeline import query
+__all__ = ['query', 'query_async', 'query_batch', 'query_batch_async', 'query_stream', 'warmup']
 
-__all__ = ['query']
+def __getattr__(name):
+    # Deferred so importing a submodule (config, metrics) does not load the whole pipeline
+    if name in __all__:
+        from . import rag_pipeline
+        return getattr(rag_pipeline, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
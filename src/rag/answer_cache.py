@@ -0,0 +1,164 @@
+"""
+Answer Cache: Semantic cache that reuses answers for near-duplicate questions.
+
+Entries are keyed by the query embedding. A lookup hits when the cosine
+similarity to a cached question is above the threshold and the regex filters
+are identical, so "Who won Clio Sports 2025?" and "Clio Sports 2025 winners?"
+share an answer while "... 2024?" does not.
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _filters_key(filters: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+class AnswerCache:
+    """
+    In-memory semantic answer cache with TTL, LRU eviction and index versioning.
+
+    Args:
+        threshold: Minimum cosine similarity for a hit
+        max_entries: Maximum cached answers (least recently used are evicted)
+        ttl_seconds: Age after which an entry is ignored and dropped
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index_version: Optional[str] = None
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._groups: Dict[str, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, index_version: Optional[str]) -> None:
+        # Called with the lock held: answers built on an older index are dropped
+        if index_version is not None and index_version != self.index_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._groups.clear()
+            self.index_version = index_version
+
+    def _group_matrix(self, key: str):
+        # One normalized matrix per filter combination, rebuilt only after changes
+        group = self._groups.get(key)
+        if group is None:
+            return None, []
+        if group["matrix"] is None:
+            ids = [entry_id for entry_id in group["ids"] if entry_id in self._entries]
+            group["ids"] = ids
+            group["matrix"] = np.vstack([self._entries[i]["vector"] for i in ids]) if ids else None
+        return group["matrix"], group["ids"]
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            group = self._groups.get(entry["filters_key"])
+            if group is not None:
+                group["matrix"] = None
+
+    def lookup(self, embedding: List[float], filters: Optional[Dict[str, Any]] = None,
+               index_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a semantically equivalent question.
+
+        Args:
+            embedding: Query embedding
+            filters: Filters extracted from the query (must match exactly)
+            index_version: Current index version; a change clears the cache
+
+        Returns:
+            Copy of the cached response (with 'cache_similarity'), or None on a miss
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        vector = vector / norm
+
+        with self._lock:
+            self._check_version(index_version)
+            matrix, ids = self._group_matrix(_filters_key(filters))
+
+            if matrix is not None and matrix.shape[1] == vector.shape[0]:
+                scores = matrix @ vector
+                now = time.time()
+                for pos in np.argsort(-scores):
+                    if scores[pos] < self.threshold:
+                        break
+                    entry_id = ids[pos]
+                    entry = self._entries[entry_id]
+                    if now - entry["created_at"] > self.ttl_seconds:
+                        self._remove(entry_id)
+                        continue
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    response = copy.deepcopy(entry["response"])
+                    response["cache_similarity"] = round(float(scores[pos]), 4)
+                    return response
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding: List[float], filters: Optional[Dict[str, Any]], response: Dict[str, Any],
+              index_version: Optional[str] = None) -> None:
+        """
+        Cache a response (answer plus sources) for a question embedding.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+
+        key = _filters_key(filters)
+        with self._lock:
+            self._check_version(index_version)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "vector": vector / norm,
+                "filters_key": key,
+                "response": copy.deepcopy(response),
+                "created_at": time.time()
+            }
+            group = self._groups.setdefault(key, {"ids": [], "matrix": None})
+            group["ids"].append(entry_id)
+            group["matrix"] = None
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries)
+            }
@@ -0,0 +1,52 @@
+"""
+Async Utils: Helpers for calling the asyncio pipeline from synchronous code.
+"""
+
+import asyncio
+import threading
+from typing import Any, Coroutine
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    The process-wide event loop, running in a daemon thread (started on first use).
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="rag-event-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def run_sync(coro: Coroutine) -> Any:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Every caller (scripts, Streamlit threads, code inside another running
+    loop) submits to one long-lived loop instead of starting its own. The
+    async httpx connections behind the shared Gemini client belong to the
+    loop that opened them, so a single loop is what lets them be reused
+    across queries. The coroutine runs in a copy of the caller's context,
+    so the active metrics trace and deadline carry over.
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        # Blocking here would deadlock the loop the coroutine needs
+        coro.close()
+        raise RuntimeError("run_sync() called from the shared event loop; await the coroutine instead")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result()
+    except BaseException:
+        # KeyboardInterrupt or the caller giving up: don't leave the query running
+        future.cancel()
+        raise
@@ -2,8 +2,8 @@
 Chat Handler: Wrapper for RAG pipeline to be used by the UI.
 """
 
-from typing import Dict
-from src.rag import query
+from typing import Dict, Iterator
+from src.rag import query, query_stream
 
 def chat(user_query: str) -> Dict:
     """
@@ -30,3 +30,28 @@ def chat(user_query: str) -> Dict:
             "has_answer": False,
             "error": str(e)
         }
+
+def chat_stream(user_query: str) -> Iterator[Dict]:
+    """
+    Process a user query, streaming sources first and then the answer tokens.
+    
+    Args:
+        user_query: The user's question
+        
+    Yields:
+        Pipeline events ('sources', 'token', 'done'); errors end with a 'done' event
+    """
+    try:
+        yield from query_stream(user_query, enable_filters=True)
+        
+    except Exception as e:
+        print(f"Error in chat handler: {e}")
+        answer = "I encountered an unexpected error. Please try again."
+        yield {"type": "token", "text": answer}
+        yield {"type": "done", "response": {
+            "answer": answer,
+            "sources": [],
+            "confidence": "low",
+            "has_answer": False,
+            "error": str(e)
+        }}
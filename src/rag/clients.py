@@ -0,0 +1,247 @@
+"""
+Clients: One Gemini client and one Pinecone index handle shared by every thread.
+
+Embeddings and answers both go through the same google.genai client, whose
+httpx connection pools keep up to HTTP_POOL_SIZE connections alive, so
+concurrent queries reuse TLS connections instead of opening new ones.
+
+Every call gets a timeout. Outside a query it is the per-call default
+(GEMINI_TIMEOUT_SECONDS / PINECONE_TIMEOUT_SECONDS); inside a `deadline()`
+block it is cut down to what is left of the query's latency budget, and a
+call that starts after the budget is spent raises DeadlineExceeded without
+touching the network. The deadline lives in a ContextVar, so it follows the
+query into `asyncio.to_thread` workers like the metrics trace does.
+
+`stats()` reports calls, errors, timeouts, in-flight requests and open
+connections per API; the same numbers are exported as metrics gauges.
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from . import metrics
+from .config import (
+    GOOGLE_API_KEY, PINECONE_API_KEY, PINECONE_INDEX_NAME,
+    GEMINI_TIMEOUT_SECONDS, PINECONE_TIMEOUT_SECONDS,
+    HTTP_POOL_SIZE, HTTP_KEEPALIVE_SECONDS, validate_config
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The query's latency budget ran out before the call could start.
+    """
+
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("client_deadline", default=None)
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """
+    Absolute deadline (time.monotonic) `seconds` from now; None or 0 means no deadline.
+    """
+    return time.monotonic() + seconds if seconds else None
+
+
+@contextlib.contextmanager
+def deadline(until: Optional[float]) -> Iterator[None]:
+    """
+    Bound every client call in the block by the absolute deadline `until`.
+
+    Nested deadlines keep the earlier one; None leaves the current deadline as is.
+    """
+    current = _deadline.get()
+    if until is None or (current is not None and current <= until):
+        yield
+        return
+    token = _deadline.set(until)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """
+    The active absolute deadline (time.monotonic), or None.
+    """
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left until the active deadline (None without one; may be negative).
+    """
+    until = _deadline.get()
+    return None if until is None else until - time.monotonic()
+
+
+def call_timeout(default: float) -> float:
+    """
+    Timeout for the next call: the per-call default, capped by the remaining budget.
+
+    Raises:
+        DeadlineExceeded: If the budget is already spent
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Query latency budget exhausted")
+    return min(default, left)
+
+
+def gemini_http_options():
+    """
+    Per-request google.genai HttpOptions carrying the call timeout (the SDK takes milliseconds).
+    """
+    from google.genai import types
+    return types.HttpOptions(timeout=int(call_timeout(GEMINI_TIMEOUT_SECONDS) * 1000))
+
+
+def pinecone_timeout() -> float:
+    return call_timeout(PINECONE_TIMEOUT_SECONDS)
+
+
+def _is_timeout(error: Exception) -> bool:
+    # httpx.ReadTimeout, urllib3 ReadTimeoutError, asyncio/builtin TimeoutError
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+
+
+class CallStats:
+    """
+    Call counters for one API; safe to update from any thread.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def track(self, api: str) -> Iterator[None]:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                if _is_timeout(e):
+                    self.timeouts += 1
+            if _is_timeout(e):
+                metrics.inc("timeouts", api)
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.seconds += time.perf_counter() - start
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "avg_ms": round(self.seconds / self.calls * 1000, 1) if self.calls else 0.0
+            }
+
+
+_stats = {"gemini": CallStats(), "pinecone": CallStats()}
+
+
+def track(api: str):
+    """
+    Count one call to `api` ("gemini" or "pinecone") for the duration of the block.
+    """
+    return _stats[api].track(api)
+
+
+_lock = threading.Lock()
+_gemini_client = None
+_httpx_clients: Dict[str, Any] = {}
+_pinecone_index = None
+
+
+def get_gemini_client():
+    """
+    The process-wide google.genai client, created on first use.
+
+    The sync and async httpx clients are built here, so their pool size and
+    keep-alive are ours rather than the SDK defaults, and `stats()` can see them.
+    """
+    global _gemini_client
+    if _gemini_client is None:
+        with _lock:
+            if _gemini_client is None:
+                validate_config()
+                import httpx
+                from google import genai
+                from google.genai import types
+                limits = httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE,
+                                      keepalive_expiry=HTTP_KEEPALIVE_SECONDS)
+                timeout = httpx.Timeout(GEMINI_TIMEOUT_SECONDS)
+                _httpx_clients["sync"] = httpx.Client(limits=limits, timeout=timeout)
+                _httpx_clients["async"] = httpx.AsyncClient(limits=limits, timeout=timeout)
+                _gemini_client = genai.Client(api_key=GOOGLE_API_KEY, http_options=types.HttpOptions(
+                    timeout=int(GEMINI_TIMEOUT_SECONDS * 1000),
+                    httpx_client=_httpx_clients["sync"],
+                    httpx_async_client=_httpx_clients["async"]
+                ))
+    return _gemini_client
+
+
+def get_pinecone_index():
+    """
+    The process-wide Pinecone index handle, connected on first use.
+    """
+    global _pinecone_index
+    if _pinecone_index is None:
+        with _lock:
+            if _pinecone_index is None:
+                validate_config()
+                from pinecone import Pinecone
+                client = Pinecone(api_key=PINECONE_API_KEY, timeout=PINECONE_TIMEOUT_SECONDS,
+                                  connection_pool_maxsize=HTTP_POOL_SIZE)
+                _pinecone_index = client.Index(PINECONE_INDEX_NAME)
+    return _pinecone_index
+
+
+def _pool_stats(client) -> Dict[str, int]:
+    # httpx exposes no public pool API; read the httpcore pool behind the default transport
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return {"open": len(connections), "idle": sum(1 for c in connections if c.is_idle())}
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Call counters per API, plus open and idle connections in the Gemini pools.
+    """
+    result = {api: call_stats.snapshot() for api, call_stats in _stats.items()}
+    result["gemini"]["pool"] = {"max": HTTP_POOL_SIZE, **{kind: _pool_stats(client) for kind, client in _httpx_clients.items()}}
+    result["pinecone"]["pool"] = {"max": HTTP_POOL_SIZE, "connected": _pinecone_index is not None}
+    return result
+
+
+def _gauges() -> Dict[str, Dict[str, float]]:
+    current = stats()
+    gauges = {"client_in_flight": {api: values["in_flight"] for api, values in current.items()}}
+    gauges["http_connections_open"] = {f"gemini_{kind}": current["gemini"]["pool"][kind]["open"]
+                                       for kind in _httpx_clients}
+    return gauges
+
+
+metrics.registry.register_gauges(_gauges)
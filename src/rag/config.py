@@ -13,11 +13,117 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "clios-index")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-# Validation
-if not PINECONE_API_KEY:
-    raise ValueError("Missing PINECONE_API_KEY in .env file")
-if not GOOGLE_API_KEY:
-    raise ValueError("Missing GOOGLE_API_KEY in .env file")
+# Vector Search Backend: "pinecone" (hosted) or "local" (in-process NumPy index)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_EMBEDDINGS_FILE = os.getenv("LOCAL_EMBEDDINGS_FILE", "data/embeddings/clios_embeddings.jsonl")
+# Precision of the binary embedding store the local index reads ("float32" or "float16")
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32").lower()
+# Local search mode: "exact" (brute force), "int8" or "pq" (quantized codes, exact rescoring of a shortlist),
+# or "hnsw" (graph-based approximate search)
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact").lower()
+PQ_SUBSPACES = int(os.getenv("PQ_SUBSPACES", "96"))
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "10"))
+# HNSW graph: links per node (memory/recall) and candidate list sizes for building and querying (speed/recall)
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# Hybrid Retrieval: BM25 over the chunk file fused with vector results (reciprocal rank fusion)
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+LEXICAL_CHUNKS_FILE = os.getenv("LEXICAL_CHUNKS_FILE", "data/chunks/clios_chunks.jsonl")
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Reranking: over-fetch candidates and reorder them with a local CPU cross-encoder (sentence-transformers).
+# Off by default: enabling it downloads RERANK_MODEL from Hugging Face on first use (or at warmup)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+# Minimum score for a passage to reach the LLM. The reranker takes the model's raw logits and applies
+# the sigmoid itself, so scores are always 0-1 whatever activation the model config declares
+RERANK_THRESHOLD = float(os.getenv("RERANK_THRESHOLD", "0.05"))
+RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", "300"))
+RERANK_CACHE_ENTRIES = int(os.getenv("RERANK_CACHE_ENTRIES", "10000"))
+
+# Embedding Backend: "gemini" (remote API, rate limited) or "local" (sentence-transformers on the CPU).
+# Documents and queries always use the same backend; indexes record the embedder that built them
+# and refuse queries from a different one, so switching requires re-running generate_embeddings.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini").lower()
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+# Instruction prepended to queries (not documents); the default is the one bge models expect
+LOCAL_EMBEDDING_QUERY_PREFIX = os.getenv("LOCAL_EMBEDDING_QUERY_PREFIX",
+                                         "Represent this sentence for searching relevant passages: ")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+# "torch" or "onnx" (needs optimum[onnxruntime]); LOCAL_EMBEDDING_ONNX_FILE picks an export inside
+# the model repo, e.g. "onnx/model_qint8_avx512_vnni.onnx" for int8 dynamic quantization
+LOCAL_EMBEDDING_RUNTIME = os.getenv("LOCAL_EMBEDDING_RUNTIME", "torch").lower()
+LOCAL_EMBEDDING_ONNX_FILE = os.getenv("LOCAL_EMBEDDING_ONNX_FILE", "")
+# CPU threads for local inference; 0 keeps the runtime's default (all cores)
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))
+
+# Query Embedding Cache (in-memory LRU + SQLite store shared by all workers)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "1024"))
+EMBEDDING_CACHE_DISK_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "50000"))
+
+# Gemini Embedding Quota (token bucket shared by all processes via RATE_LIMIT_STATE_DIR)
+EMBEDDING_RPM = float(os.getenv("EMBEDDING_RPM", "15"))
+EMBEDDING_TPM = float(os.getenv("EMBEDDING_TPM", "0")) or None
+EMBEDDING_BURST = int(os.getenv("EMBEDDING_BURST", "3"))
+RATE_LIMIT_STATE_DIR = os.getenv("RATE_LIMIT_STATE_DIR", "data/cache")
+
+# Gemini LLM Quota (same token bucket scheme; 0 disables it, set to your tier's RPM for bulk jobs)
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0")) or None
+LLM_BURST = int(os.getenv("LLM_BURST", "3"))
+
+# Batch Queries: questions of one query_batch call retrieving and generating at once
+# (keep at or below HTTP_POOL_SIZE so requests do not queue for a connection)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Context Packing: token budget for the retrieved passages in the LLM prompt (tiktoken cl100k_base)
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "2000"))
+
+# Semantic Answer Cache (skips the LLM call for near-duplicate questions)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+# Bump after re-uploading to Pinecone so cached answers are invalidated
+INDEX_VERSION = os.getenv("INDEX_VERSION", "1")
+
+# Metrics: per-stage timings are always returned in the response; these add exports
+# Port serving /metrics (Prometheus text) and /metrics.json; 0 disables the endpoint
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# File receiving one JSON line per query (timings, counters, filters); empty disables it
+METRICS_LOG_FILE = os.getenv("METRICS_LOG_FILE", "")
+
+# Client Layer: one pooled Gemini client and Pinecone handle shared by all threads
+# Per-call timeouts (seconds); calls inside a query get at most what is left of QUERY_TIMEOUT_SECONDS
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+PINECONE_TIMEOUT_SECONDS = float(os.getenv("PINECONE_TIMEOUT_SECONDS", "10"))
+# End-to-end latency budget per query; 0 disables the deadline
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "45"))
+# Keep-alive connections per client (bounds concurrent requests to each API)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+
+# Validation (deferred: clients call this when first built, so imports never need credentials)
+def validate_config() -> None:
+    """
+    Raise ValueError if a backend is unknown or a required API key is missing.
+    """
+    if VECTOR_BACKEND not in ("pinecone", "local"):
+        raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}' (expected 'pinecone' or 'local')")
+    if EMBEDDING_BACKEND not in ("gemini", "local"):
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{EMBEDDING_BACKEND}' (expected 'gemini' or 'local')")
+    if LOCAL_EMBEDDING_RUNTIME not in ("torch", "onnx"):
+        raise ValueError(f"Unknown LOCAL_EMBEDDING_RUNTIME '{LOCAL_EMBEDDING_RUNTIME}' (expected 'torch' or 'onnx')")
+    if VECTOR_BACKEND == "pinecone" and not PINECONE_API_KEY:
+        raise ValueError("Missing PINECONE_API_KEY in .env file")
+    if not GOOGLE_API_KEY:
+        raise ValueError("Missing GOOGLE_API_KEY in .env file")
 
 # Constants
 EMBEDDING_MODEL = "models/text-embedding-004"
@@ -1,44 +1,166 @@
 """
 Context Builder: Formats retrieved documents into a context string for the response generator.
+
+The context is packed into a token budget (CONTEXT_MAX_TOKENS, counted with
+the same tiktoken encoding the chunker uses), so prompt size per query is
+bounded however long the retrieved chunks are:
+
+- Results from the same page are merged into one passage, in page order,
+  with the overlap between consecutive chunks removed
+- Word spans already in the context (the overlap of neighbouring chunks,
+  navigation boilerplate repeated on every page) are cut, and passages that
+  are mostly repeats are dropped
+- Passages are added in rank order; the first one that does not fit is
+  truncated on a word boundary and packing stops there
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
+from src.preprocessing.chunk_data import word_token_counts
+from . import metrics
+from .config import CONTEXT_MAX_TOKENS
+
+# Repeated word spans shorter than this are ordinary phrases, not copied text
+SHINGLE_WORDS = 8
+# Passages with less new text than this fraction count as near-duplicates
+MIN_NOVEL_FRACTION = 0.2
+# Below this many tokens a truncated passage is not worth including
+MIN_TRUNCATED_TOKENS = 48
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of `text` (tiktoken cl100k_base, or an estimate without it).
+    """
+    words = text.split()
+    return sum(word_token_counts(words)) if words else 0
 
-def build_context(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _shingles(words: List[str]) -> List[Tuple[str, ...]]:
+    return [tuple(w.lower() for w in words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+def _overlap_length(left: List[str], right: List[str]) -> int:
+    """
+    Longest suffix of `left` that is also a prefix of `right`, in words.
     """
-    Format retrieval results into a context string.
-    
+    for size in range(min(len(left), len(right)), 0, -1):
+        if left[-size:] == right[:size]:
+            return size
+    return 0
+
+def _merge_page(chunks: List[Dict[str, Any]]) -> List[str]:
+    """
+    Join the chunks of one page into a word list, dropping the overlap between neighbours.
+    """
+    # Page order when the index stored it, otherwise rank order
+    if all(chunk.get('chunk_index') is not None for chunk in chunks):
+        chunks = sorted(chunks, key=lambda chunk: chunk['chunk_index'])
+    words: List[str] = []
+    for chunk in chunks:
+        chunk_words = (chunk.get('content') or chunk.get('excerpt', '')).split()
+        overlap = _overlap_length(words, chunk_words)
+        if words and not overlap:
+            words.append("...")
+        words.extend(chunk_words[overlap:])
+    return words
+
+def _remove_seen(words: List[str], seen: Set[Tuple[str, ...]]) -> Optional[List[str]]:
+    """
+    Cut word spans already in the context; None if little new text is left.
+    """
+    shingles = _shingles(words)
+    covered = [False] * len(words)
+    for i, shingle in enumerate(shingles):
+        if shingle in seen:
+            for j in range(i, i + SHINGLE_WORDS):
+                covered[j] = True
+    seen.update(shingles)
+
+    if sum(covered) > len(words) * (1 - MIN_NOVEL_FRACTION):
+        return None
+    kept: List[str] = []
+    for word, is_covered in zip(words, covered):
+        if not is_covered:
+            kept.append(word)
+        elif kept and kept[-1] != "...":
+            kept.append("...")
+    return kept
+
+def _header(index: int, res: Dict[str, Any]) -> str:
+    part = f"[Result {index}]\n"
+    part += f"Title: {res.get('title', 'Untitled')}\n"
+
+    # Add metadata
+    meta = []
+    if res.get('year'):
+        meta.append(f"Year: {res['year']}")
+    if res.get('category'):
+        meta.append(f"Category: {res['category']}")
+    if res.get('page_type'):
+        meta.append(f"Type: {res['page_type']}")
+
+    if meta:
+        part += f"Metadata: {' | '.join(meta)}\n"
+    return part + "Content: "
+
+def _truncate(words: List[str], max_tokens: int) -> List[str]:
+    total = 0
+    for i, count in enumerate(word_token_counts(words)):
+        if total + count > max_tokens:
+            return words[:i]
+        total += count
+    return words
+
+def build_context(results: List[Dict[str, Any]], max_tokens: int = CONTEXT_MAX_TOKENS) -> Dict[str, Any]:
+    """
+    Format retrieval results into a context string of at most `max_tokens` tokens.
+
     Args:
-        results: List of retrieved documents
-        
+        results: List of retrieved documents, best first
+        max_tokens: Token budget for the whole context string
+
     Returns:
         Dictionary containing the formatted context string and metadata
+        ('token_count' of the context, 'passage_count' passages after merging,
+        'truncated' if the budget cut a passage or left some out)
     """
+    # Group by page, keeping the position of each page's best result
+    pages: Dict[str, List[Dict[str, Any]]] = {}
+    for res in results:
+        url = res.get('url')
+        pages.setdefault(url if url and url != '#' else res.get('id'), []).append(res)
+
+    seen: Set[Tuple[str, ...]] = set()
     context_parts = []
-    
-    for i, res in enumerate(results, 1):
-        # Format each result
-        part = f"[Result {i}]\n"
-        part += f"Title: {res.get('title', 'Untitled')}\n"
-        
-        # Add metadata
-        meta = []
-        if res.get('year'):
-            meta.append(f"Year: {res['year']}")
-        if res.get('category'):
-            meta.append(f"Category: {res['category']}")
-        if res.get('page_type'):
-            meta.append(f"Type: {res['page_type']}")
-            
-        if meta:
-            part += f"Metadata: {' | '.join(meta)}\n"
-            
-        part += f"Content: {res.get('excerpt', res.get('content', ''))}\n"
-        context_parts.append(part)
-        
+    used_tokens = 0
+    truncated = False
+
+    for chunks in pages.values():
+        words = _remove_seen(_merge_page(chunks), seen)
+        if not words:
+            continue
+
+        header = _header(len(context_parts) + 1, chunks[0])
+        cost = count_tokens(header)
+        available = max_tokens - used_tokens - cost
+        content_tokens = sum(word_token_counts(words))
+        if content_tokens > available:
+            truncated = True
+            if available < MIN_TRUNCATED_TOKENS:
+                break
+            words = _truncate(words, available - 1) + ["..."]
+            content_tokens = sum(word_token_counts(words))
+
+        context_parts.append(header + " ".join(words) + "\n")
+        used_tokens += cost + content_tokens
+        if truncated:
+            break
+
     context_text = "\n\n".join(context_parts)
-    
+    token_count = count_tokens(context_text)
+    metrics.inc("tokens", "context", token_count)
+
     return {
         "context_text": context_text,
-        "source_count": len(results)
+        "source_count": len(results),
+        "passage_count": len(context_parts),
+        "token_count": token_count,
+        "truncated": truncated
     }
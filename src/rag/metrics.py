@@ -0,0 +1,309 @@
+"""
+Metrics: Per-query timing spans plus process-wide counters and histograms.
+
+Each query runs inside a QueryTrace. Code anywhere below the pipeline
+(retriever, embedding client, LLM call) records spans and counters on the
+active trace through `span()` and `inc()`. No trace object is passed
+around: the active trace lives in a ContextVar, which asyncio tasks and
+`asyncio.to_thread` inherit. The finished trace goes three places:
+
+- returned in the response as 'timings' (ms per stage) and 'usage' (counters)
+- aggregated into a process-wide registry, served in the Prometheus text
+  format on METRICS_PORT
+- optionally appended as one JSON line per query to METRICS_LOG_FILE
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+PREFIX = "clio_rag"
+
+# Counter name -> label used to split it (e.g. api_calls{api="embedding"})
+COUNTERS = {
+    "api_calls": "api",
+    "retries": "api",
+    "cache_hits": "cache",
+    "cache_misses": "cache",
+    "tokens": "kind",
+    "rate_limit_wait_seconds": "api",
+    "timeouts": "api",
+}
+
+# Gauge name -> label, for values read at scrape time (see register_gauges)
+GAUGES = {
+    "client_in_flight": "api",
+    "http_connections_open": "pool",
+}
+
+# Histogram bucket upper bounds in seconds (Prometheus convention)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace: contextvars.ContextVar[Optional["QueryTrace"]] = contextvars.ContextVar("query_trace", default=None)
+
+
+class QueryTrace:
+    """
+    Timing spans and counters for one query; safe to update from worker threads.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, Tuple[float, float]] = {}
+        self.counters: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Time a block. Repeated or concurrent spans with the same name (e.g. the
+        filtered and unfiltered vector searches) report the wall-clock time from
+        the first start to the last end.
+        """
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                first, last = self.spans.get(name, (begin, end))
+                self.spans[name] = (min(first, begin), max(last, end))
+
+    def inc(self, name: str, label: str, amount: float = 1) -> None:
+        with self._lock:
+            values = self.counters.setdefault(name, {})
+            values[label] = values.get(label, 0) + amount
+
+    @contextlib.contextmanager
+    def active(self) -> Iterator["QueryTrace"]:
+        """
+        Make this the trace that `span()` and `inc()` record to within the block.
+        """
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    def timings(self) -> Dict[str, float]:
+        """
+        Milliseconds per stage, in the order the stages started.
+        """
+        with self._lock:
+            ordered = sorted(self.spans.items(), key=lambda item: item[1][0])
+            return {name: round((end - begin) * 1000, 1) for name, (begin, end) in ordered}
+
+    def usage(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(values) for name, values in self.counters.items()}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency histograms, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, str], float] = {}
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.gauge_readers: List[Callable[[], Dict[str, Dict[str, float]]]] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, label: str, amount: float = 1) -> None:
+        with self._lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.histograms.setdefault((name, stage), Histogram()).observe(seconds)
+
+    def register_gauges(self, read: Callable[[], Dict[str, Dict[str, float]]]) -> None:
+        """
+        Add a callback returning {gauge name: {label: value}}, read on every export.
+        """
+        with self._lock:
+            self.gauge_readers.append(read)
+
+    def gauges(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            readers = list(self.gauge_readers)
+        gauges: Dict[str, Dict[str, float]] = {}
+        for read in readers:
+            for name, values in read().items():
+                gauges.setdefault(name, {}).update(values)
+        return gauges
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name, values in sorted(self.gauges().items()):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            for label, value in sorted(values.items()):
+                lines.append(f'{metric}{{{GAUGES.get(name, "label")}="{label}"}} {value:g}')
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter, label), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'{metric}{{{COUNTERS.get(name, "label")}="{label}"}} {value:g}')
+
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_name, stage), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    label = f'stage="{stage}",' if stage else ""
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f'{metric}_bucket{{{label}le="{le}"}} {cumulative}')
+                    label = f'{{stage="{stage}"}}' if stage else ""
+                    lines.append(f"{metric}_sum{label} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{label} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Counters, gauges and histogram summaries as plain JSON-serializable data.
+        """
+        gauges = self.gauges()
+        with self._lock:
+            counters: Dict[str, Dict[str, float]] = {}
+            for (name, label), value in self.counters.items():
+                counters.setdefault(name, {})[label] = value
+            histograms = {f"{name}:{stage}" if stage else name: {"count": h.count, "sum": round(h.sum, 6)}
+                          for (name, stage), h in self.histograms.items()}
+            return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+registry = MetricsRegistry()
+
+_log_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a block on the active trace (no-op outside a query).
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+def inc(name: str, label: str, amount: float = 1) -> None:
+    """
+    Increment a counter on the registry and on the active trace.
+    """
+    if not amount:
+        return
+    registry.inc(name, label, amount)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.inc(name, label, amount)
+
+
+def finish(trace: QueryTrace, response: Dict[str, Any], log_file: Optional[str] = None) -> None:
+    """
+    Attach the trace to the response, feed the histograms and write the JSON log line.
+    """
+    total = trace.elapsed()
+    timings = trace.timings()
+    response['timings'] = timings
+    response['usage'] = trace.usage()
+
+    registry.inc("queries", "cache_hit" if response.get('cache_hit') else "pipeline")
+    registry.observe("query", "", total)
+    for stage, ms in timings.items():
+        registry.observe("stage", stage, ms / 1000)
+
+    if log_file:
+        record = {"ts": round(time.time(), 3), "total_ms": round(total * 1000, 1), "timings": timings,
+                  "usage": response['usage'], "cache_hit": response.get('cache_hit', False),
+                  "filters": response.get('filters_used', {})}
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _log_lock, open(log_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+
+def _handler_class():
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body, content_type = registry.render_prometheus().encode('utf-8'), "text/plain; version=0.0.4"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body, content_type = json.dumps(registry.snapshot()).encode('utf-8'), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the console
+
+    return MetricsHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port: int, host: str = "0.0.0.0"):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a daemon thread, once per process.
+
+    Returns:
+        The ThreadingHTTPServer, or None if the port is taken
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            # http.server is only imported when the endpoint is enabled
+            from http.server import ThreadingHTTPServer
+            try:
+                _server = ThreadingHTTPServer((host, port), _handler_class())
+            except OSError as e:
+                # Another worker process already serves this port
+                print(f"Metrics endpoint not started on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -1,45 +1,173 @@
 """
 RAG Pipeline: Orchestrates the entire retrieval and generation process.
+
+Every query runs under a metrics.QueryTrace: the response carries 'timings'
+(ms per stage) and 'usage' (API calls, retries, cache hits, tokens), and the
+same numbers feed the process-wide Prometheus / JSON-log metrics.
+
+Every query also runs under a deadline (QUERY_TIMEOUT_SECONDS by default):
+each embedding, Pinecone and Gemini call gets at most what is left of it, so
+a hung request degrades the answer instead of pinning the worker.
 """
 
+import asyncio
+import contextlib
 import time
-from typing import Dict, Optional
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+from src.vector_db.pinecone_utils import (
+    embed_query, embed_query_async, embed_query_batch_async, get_index_version, warmup_search
+)
+from src.vector_db.lexical_index import get_lexical_index
+from src.preprocessing.chunk_data import get_encoding
+from . import clients, metrics
+from .async_utils import run_sync
+from .answer_cache import AnswerCache
+from .config import (
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS,
+    METRICS_PORT, METRICS_LOG_FILE, HYBRID_SEARCH_ENABLED, LEXICAL_CHUNKS_FILE,
+    QUERY_TIMEOUT_SECONDS, BATCH_CONCURRENCY, validate_config
+)
 from .query_processor import extract_filters
-from .retriever import retrieve
+from .retriever import retrieve, retrieve_async
 from .context_builder import build_context
-from .response_generator import generate_response
+from .reranker import get_reranker
+from .response_generator import generate_response_async, generate_response_stream
+
+# Near-duplicate questions reuse a previous answer instead of calling the LLM
+answer_cache = None
+if ANSWER_CACHE_ENABLED:
+    answer_cache = AnswerCache(
+        threshold=ANSWER_CACHE_THRESHOLD,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=ANSWER_CACHE_TTL_SECONDS
+    )
+
+if METRICS_PORT:
+    metrics.start_http_server(METRICS_PORT)
+
+def warmup() -> Dict[str, float]:
+    """
+    Build every client and index before the first query (call once at server start).
+    
+    Importing the pipeline no longer does this work, so without warmup()
+    the first query pays for it instead.
+    
+    Raises:
+        ValueError: If the configuration is invalid (unknown backend, missing keys)
+        
+    Returns:
+        Seconds spent per component
+    """
+    validate_config()
+    # Embeddings and answers share one Gemini client, built here
+    timings = warmup_search()
+    
+    if HYBRID_SEARCH_ENABLED:
+        start = time.perf_counter()
+        try:
+            get_lexical_index(LEXICAL_CHUNKS_FILE)
+        except Exception as e:
+            print(f"Warmup of lexical_index failed: {e}")
+        timings["lexical_index"] = round(time.perf_counter() - start, 3)
+    
+    start = time.perf_counter()
+    try:
+        get_reranker()
+    except Exception as e:
+        print(f"Warmup of reranker failed: {e}")
+    timings["reranker"] = round(time.perf_counter() - start, 3)
+    
+    # The context builder counts tokens with the chunker's tiktoken encoding
+    start = time.perf_counter()
+    get_encoding()
+    timings["tokenizer"] = round(time.perf_counter() - start, 3)
+    return timings
+
+def _cached_response(query_embedding: Optional[List[float]], filters: Dict) -> Optional[Dict]:
+    if answer_cache is None or query_embedding is None:
+        return None
+    with metrics.span("answer_cache"):
+        cached = answer_cache.lookup(query_embedding, filters, index_version=get_index_version())
+    metrics.inc("cache_hits" if cached is not None else "cache_misses", "answer")
+    return cached
 
-def query(user_query: str, enable_filters: bool = True) -> Dict:
+def _cache_response(query_embedding: Optional[List[float]], filters: Dict, response: Dict) -> None:
+    # Only confident LLM answers are worth reusing
+    if answer_cache is None or query_embedding is None:
+        return
+    if not response.get('has_answer') or response.get('error'):
+        return
+    cached = {key: response[key] for key in ('answer', 'confidence', 'has_answer', 'sources') if key in response}
+    answer_cache.store(query_embedding, filters, cached, index_version=get_index_version())
+
+async def query_async(user_query: str, enable_filters: bool = True,
+                      timeout: Optional[float] = QUERY_TIMEOUT_SECONDS) -> Dict:
     """
-    Execute the full RAG pipeline for a user query.
+    Execute the full RAG pipeline for a user query on the running event loop.
+    
+    Many requests can share one loop: every network wait (rate limiter,
+    embedding, vector search, LLM) is awaited instead of blocking a thread.
     
     Args:
         user_query: The user's question
         enable_filters: Whether to use regex-based filtering
+        timeout: Latency budget in seconds shared by all API calls (None or 0: per-call timeouts only)
         
     Returns:
         Dictionary containing answer, sources, and metadata
+        ('cache_hit' is True when the answer came from the semantic cache,
+        'timings' holds ms per stage and 'usage' the API/cache/token counters)
     """
+    trace = metrics.QueryTrace()
+    with trace.active(), clients.deadline(clients.deadline_after(timeout)):
+        response = await _run_query(user_query, enable_filters)
+    metrics.finish(trace, response, METRICS_LOG_FILE)
+    return response
+
+async def _run_query(user_query: str, enable_filters: bool) -> Dict:
     start_time = time.time()
     
     # 1. Query Processing (Filter Extraction)
     # This is a regex-based operation (0 API calls)
     filters = {}
     if enable_filters:
-        filters = extract_filters(user_query)
+        with metrics.span("filters"):
+            filters = extract_filters(user_query)
     
-    # 2. Retrieval (Pinecone Search)
-    # This involves 1 API call for embedding generation
-    # The embedding function has a built-in 4s delay for rate limiting
-    retrieval_results = retrieve(user_query, filters=filters)
+    # 2. Query Embedding (1 API call, skipped for cached queries)
+    try:
+        with metrics.span("embed"):
+            query_embedding = await embed_query_async(user_query)
+    except Exception as e:
+        print(f"Error embedding query: {e}")
+        query_embedding = None
     
-    # 3. Context Building
+    return await _answer(user_query, filters, query_embedding, start_time)
+
+async def _answer(user_query: str, filters: Dict, query_embedding: Optional[List[float]], start_time: float) -> Dict:
+    # 3. Semantic Answer Cache
+    response = _cached_response(query_embedding, filters)
+    if response is not None:
+        response['cache_hit'] = True
+        response['processing_time'] = round(time.time() - start_time, 2)
+        response['filters_used'] = filters
+        return response
+    
+    # 4. Retrieval
+    # Filtered and unfiltered searches run concurrently and are merged,
+    # so an over-restrictive filter still returns results
+    with metrics.span("retrieve"):
+        retrieval_results = await retrieve_async(user_query, filters=filters, query_embedding=query_embedding)
+    
+    # 5. Context Building
     # Format the results for display
-    context_data = build_context(retrieval_results)
+    with metrics.span("context"):
+        context_data = build_context(retrieval_results)
     
-    # 4. Response Generation
-    # Direct formatting of results (0 API calls)
-    response = generate_response(user_query, context_data['context_text'], retrieval_results)
+    # 6. Response Generation
+    with metrics.span("generate"):
+        response = await generate_response_async(user_query, context_data['context_text'], retrieval_results)
     
     processing_time = round(time.time() - start_time, 2)
     
@@ -47,5 +175,202 @@ def query(user_query: str, enable_filters: bool = True) -> Dict:
     response['processing_time'] = processing_time
     response['filters_used'] = filters
     response['sources'] = retrieval_results
+    response['cache_hit'] = False
+    
+    _cache_response(query_embedding, filters, response)
     
     return response
+
+def query(user_query: str, enable_filters: bool = True,
+          timeout: Optional[float] = QUERY_TIMEOUT_SECONDS) -> Dict:
+    """
+    Execute the full RAG pipeline for a user query (synchronous wrapper around query_async).
+    
+    Args:
+        user_query: The user's question
+        enable_filters: Whether to use regex-based filtering
+        timeout: Latency budget in seconds shared by all API calls (None or 0: per-call timeouts only)
+        
+    Returns:
+        Dictionary containing answer, sources, and metadata
+    """
+    return run_sync(query_async(user_query, enable_filters=enable_filters, timeout=timeout))
+
+async def query_batch_async(user_queries: List[str], enable_filters: bool = True,
+                            timeout: Optional[float] = QUERY_TIMEOUT_SECONDS,
+                            concurrency: int = BATCH_CONCURRENCY) -> List[Dict]:
+    """
+    Execute the RAG pipeline for many queries (bulk evaluation, precomputing FAQ answers).
+    
+    Filters are extracted for every query up front and all query embeddings
+    are requested together, in as few embedder calls as the API allows. The
+    vector searches and LLM calls then run for up to `concurrency` queries at
+    a time, still going through the shared rate limiters (set LLM_RPM to pace
+    generation for large batches).
+    
+    Args:
+        user_queries: The questions, answered independently
+        enable_filters: Whether to use regex-based filtering
+        timeout: Latency budget in seconds per query, counted from the start of its retrieval
+        concurrency: Queries retrieving and generating at once
+        
+    Returns:
+        One response per query, in input order, with the same fields as query()
+        plus 'query'. A query that fails gets a response with 'error' set and
+        'has_answer' False instead of failing the whole batch. Each response's
+        'timings' and 'usage' cover its retrieval and generation; the shared
+        filter and embedding stages are only counted in the process-wide metrics.
+    """
+    filters = []
+    for user_query in user_queries:
+        try:
+            filters.append(extract_filters(user_query) if enable_filters else {})
+        except Exception as e:
+            print(f"Error extracting filters: {e}")
+            filters.append({})
+    
+    try:
+        embeddings = await embed_query_batch_async(list(user_queries))
+    except Exception as e:
+        # Retrieval falls back to lexical search, as for a single query
+        print(f"Error embedding queries: {e}")
+        embeddings = [None] * len(user_queries)
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def run(user_query: str, query_filters: Dict, query_embedding: Optional[List[float]]) -> Dict:
+        async with semaphore:
+            start_time = time.time()
+            trace = metrics.QueryTrace()
+            try:
+                with trace.active(), clients.deadline(clients.deadline_after(timeout)):
+                    response = await _answer(user_query, query_filters, query_embedding, start_time)
+            except Exception as e:
+                print(f"Error answering query '{user_query}': {e}")
+                response = {
+                    "answer": "",
+                    "confidence": "low",
+                    "has_answer": False,
+                    "error": str(e),
+                    "sources": [],
+                    "filters_used": query_filters,
+                    "cache_hit": False,
+                    "processing_time": round(time.time() - start_time, 2)
+                }
+            response['query'] = user_query
+            metrics.finish(trace, response, METRICS_LOG_FILE)
+            return response
+    
+    return list(await asyncio.gather(*(run(*item) for item in zip(user_queries, filters, embeddings))))
+
+def query_batch(user_queries: List[str], enable_filters: bool = True,
+                timeout: Optional[float] = QUERY_TIMEOUT_SECONDS,
+                concurrency: int = BATCH_CONCURRENCY) -> List[Dict]:
+    """
+    Execute the RAG pipeline for many queries (synchronous wrapper around query_batch_async).
+    
+    Args:
+        user_queries: The questions, answered independently
+        enable_filters: Whether to use regex-based filtering
+        timeout: Latency budget in seconds per query
+        concurrency: Queries retrieving and generating at once
+        
+    Returns:
+        One response per query, in input order (see query_batch_async)
+    """
+    return run_sync(query_batch_async(user_queries, enable_filters=enable_filters, timeout=timeout,
+                                      concurrency=concurrency))
+
+def _traced_events(active: Callable[[], ContextManager], events: Iterator[Dict]) -> Iterator[Dict]:
+    # The trace and deadline are only active while the generator runs, never while the caller holds an event
+    while True:
+        with active():
+            event = next(events, None)
+        if event is None:
+            return
+        yield event
+
+def query_stream(user_query: str, enable_filters: bool = True,
+                 timeout: Optional[float] = QUERY_TIMEOUT_SECONDS) -> Iterator[Dict]:
+    """
+    Execute the RAG pipeline, streaming results as soon as each stage finishes.
+    
+    Args:
+        user_query: The user's question
+        enable_filters: Whether to use regex-based filtering
+        timeout: Latency budget in seconds shared by all API calls (None or 0: per-call timeouts only)
+        
+    Yields:
+        1. {"type": "sources", "sources": [...], "filters_used": {...}} after retrieval
+        2. {"type": "token", "text": "..."} for each piece of the LLM answer
+        3. {"type": "done", "response": {...}} with the same fields as query(),
+           plus 'time_to_first_token'
+    """
+    start_time = time.time()
+    trace = metrics.QueryTrace()
+    until = clients.deadline_after(timeout)
+    
+    @contextlib.contextmanager
+    def active():
+        with trace.active(), clients.deadline(until):
+            yield
+    
+    with active():
+        filters = {}
+        if enable_filters:
+            with metrics.span("filters"):
+                filters = extract_filters(user_query)
+        
+        try:
+            with metrics.span("embed"):
+                query_embedding = embed_query(user_query)
+        except Exception as e:
+            print(f"Error embedding query: {e}")
+            query_embedding = None
+        
+        cached = _cached_response(query_embedding, filters)
+    
+    if cached is not None:
+        yield {"type": "sources", "sources": cached.get('sources', []), "filters_used": filters}
+        time_to_first_token = round(time.time() - start_time, 2)
+        yield {"type": "token", "text": cached['answer']}
+        cached['cache_hit'] = True
+        cached['processing_time'] = round(time.time() - start_time, 2)
+        cached['time_to_first_token'] = time_to_first_token
+        cached['filters_used'] = filters
+        metrics.finish(trace, cached, METRICS_LOG_FILE)
+        yield {"type": "done", "response": cached}
+        return
+    
+    with active(), metrics.span("retrieve"):
+        retrieval_results = retrieve(user_query, filters=filters, query_embedding=query_embedding)
+    
+    # Sources are shown before generation starts
+    yield {"type": "sources", "sources": retrieval_results, "filters_used": filters}
+    
+    with active(), metrics.span("context"):
+        context_data = build_context(retrieval_results)
+    
+    time_to_first_token = None
+    response = {}
+    # Includes the time the caller spends rendering each token
+    with trace.span("generate"):
+        events = generate_response_stream(user_query, context_data['context_text'], retrieval_results)
+        for event in _traced_events(active, events):
+            if event["type"] == "token":
+                if time_to_first_token is None:
+                    time_to_first_token = round(time.time() - start_time, 2)
+                yield event
+            else:
+                response = {key: value for key, value in event.items() if key != "type"}
+    
+    response['processing_time'] = round(time.time() - start_time, 2)
+    response['time_to_first_token'] = time_to_first_token
+    response['filters_used'] = filters
+    response['sources'] = retrieval_results
+    response['cache_hit'] = False
+    
+    _cache_response(query_embedding, filters, response)
+    metrics.finish(trace, response, METRICS_LOG_FILE)
+    
+    yield {"type": "done", "response": response}
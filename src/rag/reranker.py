@@ -0,0 +1,174 @@
+"""
+Reranker: Reorders over-fetched retrieval candidates with a local cross-encoder.
+
+The retriever fetches RERANK_CANDIDATES matches (instead of top_k) and this
+stage scores each (query, passage) pair with a sentence-transformers
+CrossEncoder on the CPU. All uncached pairs go through one `predict` call,
+and scores are cached per (query, chunk_id), so a repeated question skips
+inference. Matches scoring below RERANK_THRESHOLD are dropped before they
+reach the context builder (the best match is always kept).
+
+Inference must fit the stage's time budget (RERANK_TIME_BUDGET_MS, or what
+is left of the query deadline if that is less). Seconds per pair are
+tracked from previous batches, and only as many candidates as the budget
+allows are scored, in retrieval order.
+
+The model is loaded without an output activation and the reranker applies
+the sigmoid to its logits, so scores (and RERANK_THRESHOLD) stay in 0-1 for
+any single-label cross-encoder.
+
+Reranking is opt-in (RERANK_ENABLED=true) because the model is downloaded
+from Hugging Face on first use. When disabled, or without
+sentence-transformers, `get_reranker()` returns None and the retriever skips
+the over-fetch.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import clients, metrics
+from .config import (
+    RERANK_ENABLED, RERANK_MODEL, RERANK_BATCH_SIZE, RERANK_THRESHOLD,
+    RERANK_TIME_BUDGET_MS, RERANK_CACHE_ENTRIES
+)
+
+# Matches kept even when all score below the threshold, so a question never loses every source
+MIN_RESULTS = 1
+
+
+def passage_text(match: Dict[str, Any]) -> str:
+    return f"{match.get('title', '')}\n{match.get('content') or match.get('excerpt', '')}"
+
+
+class CrossEncoderReranker:
+    """
+    Cross-encoder scoring with a bounded (query, chunk_id) score cache.
+
+    Args:
+        model: Object with a sentence-transformers style `predict(pairs, batch_size=...)`
+        batch_size: Pairs per forward pass inside `predict`
+        cache_entries: Maximum cached scores (least recently used are evicted)
+        logits: The model returns raw logits; scores are passed through a sigmoid
+    """
+
+    def __init__(self, model, batch_size: int = 64, cache_entries: int = 10000, logits: bool = False):
+        self.model = model
+        self.batch_size = batch_size
+        self.cache_entries = cache_entries
+        self.logits = logits
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Seconds per pair, smoothed over previous batches (None until the first batch)
+        self.seconds_per_pair: Optional[float] = None
+
+    def _cached(self, query: str, chunk_id: str) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get((query, chunk_id))
+            if score is not None:
+                self._cache.move_to_end((query, chunk_id))
+            return score
+
+    def _store(self, query: str, chunk_id: str, score: float) -> None:
+        with self._lock:
+            self._cache[(query, chunk_id)] = score
+            self._cache.move_to_end((query, chunk_id))
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def _affordable(self, budget_seconds: float) -> int:
+        # Pairs that fit the budget; unknown cost means score a single batch to learn it
+        if budget_seconds <= 0:
+            return 0
+        if self.seconds_per_pair is None:
+            return self.batch_size
+        return int(budget_seconds / self.seconds_per_pair)
+
+    def score(self, query: str, matches: List[Dict[str, Any]], budget_seconds: float) -> List[Optional[float]]:
+        """
+        Score each match against the query; None for matches the budget left unscored.
+        """
+        scores: List[Optional[float]] = [self._cached(query, m['id']) for m in matches]
+        pending = [i for i, score in enumerate(scores) if score is None]
+        metrics.inc("cache_hits", "rerank", len(matches) - len(pending))
+        metrics.inc("cache_misses", "rerank", len(pending))
+
+        pending = pending[:max(0, self._affordable(budget_seconds))]
+        if not pending:
+            return scores
+
+        pairs = [(query, passage_text(matches[i])) for i in pending]
+        start = time.perf_counter()
+        predicted = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        per_pair = (time.perf_counter() - start) / len(pairs)
+        with self._lock:
+            previous = self.seconds_per_pair
+            self.seconds_per_pair = per_pair if previous is None else 0.7 * previous + 0.3 * per_pair
+
+        for i, value in zip(pending, predicted):
+            scores[i] = 1.0 / (1.0 + math.exp(-float(value))) if self.logits else float(value)
+            self._store(query, matches[i]['id'], scores[i])
+        return scores
+
+    def rerank(self, query: str, matches: List[Dict[str, Any]], top_k: int = 5,
+               threshold: float = RERANK_THRESHOLD,
+               time_budget_ms: float = RERANK_TIME_BUDGET_MS) -> List[Dict[str, Any]]:
+        """
+        Reorder matches by cross-encoder score and apply the threshold.
+
+        Args:
+            query: The user's question
+            matches: Over-fetched candidates, best first by retrieval score
+            top_k: Number of results to return
+            threshold: Minimum score to keep a match (the best match is always kept)
+            time_budget_ms: Inference budget, further capped by the query deadline
+
+        Returns:
+            At most top_k matches, each with a 'rerank_score' field. Without
+            budget for any inference, the first top_k matches unchanged.
+        """
+        if not matches:
+            return []
+        budget = time_budget_ms / 1000
+        left = clients.remaining()
+        if left is not None:
+            budget = min(budget, left)
+
+        with metrics.span("rerank"):
+            scores = self.score(query, matches, budget)
+            scored = [dict(match, rerank_score=round(score, 6))
+                      for match, score in zip(matches, scores) if score is not None]
+            if not scored:
+                return matches[:top_k]
+            scored.sort(key=lambda m: m['rerank_score'], reverse=True)
+            kept = [m for m in scored if m['rerank_score'] >= threshold]
+            return (kept or scored[:MIN_RESULTS])[:top_k]
+
+
+_lock = threading.Lock()
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_ready = False
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    The process-wide reranker, loading the model on first use (None if disabled or unavailable).
+    """
+    global _reranker, _reranker_ready
+    if not _reranker_ready:
+        with _lock:
+            if not _reranker_ready:
+                if RERANK_ENABLED:
+                    try:
+                        import torch
+                        from sentence_transformers import CrossEncoder
+                        # Raw logits whatever the model config declares; the sigmoid is applied in score()
+                        model = CrossEncoder(RERANK_MODEL, device="cpu", activation_fn=torch.nn.Identity())
+                        _reranker = CrossEncoderReranker(model, batch_size=RERANK_BATCH_SIZE,
+                                                         cache_entries=RERANK_CACHE_ENTRIES, logits=True)
+                    except Exception as e:
+                        print(f"Reranker unavailable ({e}); using retrieval order.")
+                _reranker_ready = True
+    return _reranker
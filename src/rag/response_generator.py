@@ -1,35 +1,27 @@
 """
 Response Generator: Uses Google Gemini LLM to generate natural conversational answers.
-"""
 
-from typing import Dict, List, Any
-import google.generativeai as genai
-from .config import GOOGLE_API_KEY, LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS
+Answers are generated through the shared google.genai client (`clients.py`),
+the same client and connection pool used for query embeddings. Each call's
+timeout is capped by what is left of the query's latency budget; a call that
+times out falls back to formatting the top source directly.
+
+With LLM_RPM set, calls also go through a token-bucket limiter (like query
+embeddings), so bulk jobs wait for quota instead of failing on 429s.
+"""
 
-# Configure Google Gemini
-genai.configure(api_key=GOOGLE_API_KEY)
+import threading
+from typing import Dict, List, Any, Iterator, Optional
+from src.vector_db.rate_limiter import RateLimiter, get_limiter, estimate_tokens
+from . import clients, metrics
+from .clients import get_gemini_client
+from .config import LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_RPM, LLM_TPM, LLM_BURST, RATE_LIMIT_STATE_DIR
 
-def generate_response(query: str, context: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+def build_prompt(query: str, context: str) -> str:
     """
-    Generate a natural conversational answer using Google Gemini LLM.
-    
-    Args:
-        query: The user's question
-        context: The formatted context string from retrieved documents
-        sources: List of source documents
-        
-    Returns:
-        Dictionary containing the LLM-generated answer
+    Build the LLM prompt from the user's question and the retrieved context.
     """
-    if not sources:
-        return {
-            "answer": "I couldn't find any relevant information in the database about that topic.",
-            "confidence": "low",
-            "has_answer": False
-        }
-    
-    # Build the prompt for the LLM
-    prompt = f"""You are a helpful assistant for the Clio Awards. Answer the user's question based on the provided context from the Clio Awards database.
+    return f"""You are a helpful assistant for the Clio Awards. Answer the user's question based on the provided context from the Clio Awards database.
 
 User Question: {query}
 
@@ -46,16 +38,111 @@ Instructions:
 
 Answer:"""
 
+def build_fallback_answer(sources: List[Dict[str, Any]]) -> str:
+    """
+    Format the top source directly, used when the LLM call fails.
+    """
+    top_result = sources[0]
+    fallback_answer = f"Based on the search results:\n\n"
+    fallback_answer += f"**{top_result['title']}**\n"
+    
+    if top_result.get('category'):
+        fallback_answer += f"Category: {top_result['category']}\n"
+    if top_result.get('year'):
+        fallback_answer += f"Year: {top_result['year']}\n"
+        
+    fallback_answer += f"\n{top_result.get('excerpt', top_result.get('content', '')[:300])}"
+    return fallback_answer
+
+NO_RESULTS_RESPONSE = {
+    "answer": "I couldn't find any relevant information in the database about that topic.",
+    "confidence": "low",
+    "has_answer": False
+}
+
+def _generation_config():
+    from google.genai import types
+    return types.GenerateContentConfig(
+        temperature=LLM_TEMPERATURE,
+        max_output_tokens=LLM_MAX_TOKENS,
+        http_options=clients.gemini_http_options()
+    )
+
+def _record_usage(response) -> None:
+    # usage_metadata is missing on some SDK versions and on failed calls
+    usage = getattr(response, "usage_metadata", None)
+    for kind, field in (("llm_prompt", "prompt_token_count"), ("llm_output", "candidates_token_count")):
+        count = getattr(usage, field, None)
+        if isinstance(count, int):
+            metrics.inc("tokens", kind, count)
+
+_lock = threading.Lock()
+_llm_limiter = None
+
+def get_llm_limiter() -> Optional[RateLimiter]:
+    """
+    Token bucket for Gemini generation calls (None when LLM_RPM is 0).
+    """
+    global _llm_limiter
+    if _llm_limiter is None and LLM_RPM > 0:
+        with _lock:
+            if _llm_limiter is None:
+                _llm_limiter = get_limiter(
+                    "gemini-llm",
+                    rpm=LLM_RPM,
+                    tpm=LLM_TPM,
+                    burst=LLM_BURST,
+                    state_dir=RATE_LIMIT_STATE_DIR
+                )
+    return _llm_limiter
+
+def _record_wait(seconds: float) -> None:
+    metrics.inc("rate_limit_wait_seconds", "llm", round(seconds, 3))
+
+def _record_retry(error: Exception) -> None:
+    metrics.inc("retries", "llm")
+
+def _generate(prompt: str):
+    with clients.track("gemini"):
+        return get_gemini_client().models.generate_content(model=LLM_MODEL, contents=prompt,
+                                                           config=_generation_config())
+
+async def _generate_async(prompt: str):
+    with clients.track("gemini"):
+        return await get_gemini_client().aio.models.generate_content(model=LLM_MODEL, contents=prompt,
+                                                                     config=_generation_config())
+
+def _limits(prompt: str) -> Dict[str, Any]:
+    return {"tokens": estimate_tokens(prompt), "on_wait": _record_wait, "on_retry": _record_retry,
+            "deadline": clients.current_deadline()}
+
+def generate_response(query: str, context: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Generate a natural conversational answer using Google Gemini LLM.
+    
+    Args:
+        query: The user's question
+        context: The formatted context string from retrieved documents
+        sources: List of source documents
+        
+    Returns:
+        Dictionary containing the LLM-generated answer
+    """
+    if not sources:
+        return dict(NO_RESULTS_RESPONSE)
+    
+    # Build the prompt for the LLM
+    prompt = build_prompt(query, context)
+
     try:
         # Call Google Gemini LLM
-        model = genai.GenerativeModel(LLM_MODEL)
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=LLM_TEMPERATURE,
-                max_output_tokens=LLM_MAX_TOKENS,
-            )
-        )
+        metrics.inc("api_calls", "llm")
+        limiter = get_llm_limiter()
+        if limiter is None:
+            response = _generate(prompt)
+        else:
+            response = limiter.call(_generate, prompt, **_limits(prompt))
+        _record_usage(response)
         
         answer = response.text.strip()
         
@@ -69,20 +156,108 @@ Answer:"""
         print(f"Error generating LLM response: {e}")
         
         # Fallback to direct formatting if LLM fails
-        top_result = sources[0]
-        fallback_answer = f"Based on the search results:\n\n"
-        fallback_answer += f"**{top_result['title']}**\n"
+        return {
+            "answer": build_fallback_answer(sources),
+            "confidence": "medium",
+            "has_answer": True,
+            "error": str(e)
+        }
+
+async def generate_response_async(query: str, context: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Asyncio variant of generate_response; the event loop stays free while Gemini responds.
+    
+    Args:
+        query: The user's question
+        context: The formatted context string from retrieved documents
+        sources: List of source documents
         
-        if top_result.get('category'):
-            fallback_answer += f"Category: {top_result['category']}\n"
-        if top_result.get('year'):
-            fallback_answer += f"Year: {top_result['year']}\n"
-            
-        fallback_answer += f"\n{top_result.get('excerpt', top_result.get('content', '')[:300])}"
+    Returns:
+        Dictionary containing the LLM-generated answer
+    """
+    if not sources:
+        return dict(NO_RESULTS_RESPONSE)
+    
+    prompt = build_prompt(query, context)
+    
+    try:
+        metrics.inc("api_calls", "llm")
+        limiter = get_llm_limiter()
+        if limiter is None:
+            response = await _generate_async(prompt)
+        else:
+            response = await limiter.call_async(_generate_async, prompt, **_limits(prompt))
+        _record_usage(response)
         
         return {
-            "answer": fallback_answer,
+            "answer": response.text.strip(),
+            "confidence": "high",
+            "has_answer": True
+        }
+        
+    except Exception as e:
+        print(f"Error generating LLM response: {e}")
+        
+        return {
+            "answer": build_fallback_answer(sources),
             "confidence": "medium",
             "has_answer": True,
             "error": str(e)
         }
+
+def generate_response_stream(query: str, context: str, sources: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the LLM answer as it is generated.
+    
+    Args:
+        query: The user's question
+        context: The formatted context string from retrieved documents
+        sources: List of source documents
+        
+    Yields:
+        {"type": "token", "text": ...} for each piece of the answer, then one
+        {"type": "done", ...} event carrying the same fields as generate_response
+    """
+    if not sources:
+        yield {"type": "token", "text": NO_RESULTS_RESPONSE["answer"]}
+        yield {"type": "done", **NO_RESULTS_RESPONSE}
+        return
+    
+    prompt = build_prompt(query, context)
+    parts = []
+    
+    try:
+        metrics.inc("api_calls", "llm")
+        limiter = get_llm_limiter()
+        if limiter is not None:
+            # A stream cannot be replayed, so only the wait for quota applies (no 429 retries)
+            _record_wait(limiter.acquire(estimate_tokens(prompt), timeout=clients.remaining()))
+        last_chunk = None
+        with clients.track("gemini"):
+            stream = get_gemini_client().models.generate_content_stream(
+                model=LLM_MODEL,
+                contents=prompt,
+                config=_generation_config()
+            )
+            for chunk in stream:
+                last_chunk = chunk
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield {"type": "token", "text": text}
+        # The last chunk carries the usage totals for the whole stream
+        _record_usage(last_chunk)
+                
+        yield {"type": "done", "answer": "".join(parts).strip(), "confidence": "high", "has_answer": True}
+        
+    except Exception as e:
+        print(f"Error streaming LLM response: {e}")
+        
+        if parts:
+            # Keep what was already shown to the user
+            answer = "".join(parts).strip()
+        else:
+            answer = build_fallback_answer(sources)
+            yield {"type": "token", "text": answer}
+            
+        yield {"type": "done", "answer": answer, "confidence": "medium", "has_answer": True, "error": str(e)}
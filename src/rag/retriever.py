@@ -1,25 +1,182 @@
 """
 Retriever: Handles the retrieval of relevant documents from the vector database.
+
+Dense (embedding) results are fused with BM25 lexical results using
+reciprocal rank fusion. The lexical index is in-process, so retrieval still
+answers with zero API calls if the embedding call or vector search fails.
+When the cross-encoder reranker is available, RERANK_CANDIDATES matches are
+fetched and fused, and the reranker picks the top_k (see reranker.py).
 """
 
-from typing import List, Dict, Any
-from src.vector_db.pinecone_utils import search_vectors
+import asyncio
+from typing import List, Dict, Any, Optional
+from src.vector_db.pinecone_utils import embed_query_async, search_by_vector, format_match
+from src.vector_db.lexical_index import get_lexical_index
+from . import metrics
+from .async_utils import run_sync
+from .config import HYBRID_SEARCH_ENABLED, LEXICAL_CHUNKS_FILE, RRF_K, RERANK_CANDIDATES
+from .reranker import get_reranker
+
+def merge_results(filtered: List[Dict[str, Any]], unfiltered: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Merge filtered and unfiltered matches.
+    
+    Filtered matches come first because they satisfy the constraints in the
+    question; unfiltered matches fill the remaining slots so an over-restrictive
+    filter never leaves the user with nothing.
+    
+    Args:
+        filtered: Matches from the filtered search
+        unfiltered: Matches from the unfiltered search
+        top_k: Number of results to return
+        
+    Returns:
+        Deduplicated list of at most top_k matches
+    """
+    merged = []
+    seen = set()
+    for match in filtered + unfiltered:
+        if match['id'] in seen:
+            continue
+        seen.add(match['id'])
+        merged.append(match)
+        if len(merged) == top_k:
+            break
+    return merged
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], top_k: int, k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists: each match scores sum(1 / (k + rank)) over the lists it appears in.
+    
+    Args:
+        result_lists: Ranked match lists (e.g. dense and lexical)
+        top_k: Number of results to return
+        k: RRF damping constant
+        
+    Returns:
+        Fused matches, each with a 'fusion_score' field
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, 1):
+            entry = fused.get(match['id'])
+            if entry is None:
+                # The first list wins for the displayed fields (dense scores stay comparable)
+                entry = dict(match, fusion_score=0.0)
+                fused[match['id']] = entry
+            entry['fusion_score'] += 1.0 / (k + rank)
+            
+    ranked = sorted(fused.values(), key=lambda m: m['fusion_score'], reverse=True)
+    for match in ranked:
+        match['fusion_score'] = round(match['fusion_score'], 6)
+    return ranked[:top_k]
+
+def lexical_search(query: str, filters: Optional[Dict[str, Any]] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+    """
+    BM25 search over the local chunk file (no API calls).
+    
+    Args:
+        query: The user's search query
+        filters: Optional dictionary of filters (year, category, etc.)
+        top_k: Number of results to return
+        
+    Returns:
+        List of matches in the same format as the vector search
+    """
+    with metrics.span("lexical_search"):
+        index = get_lexical_index(LEXICAL_CHUNKS_FILE)
+        filtered = [format_match(i, s, m) for i, s, m in index.search(query, top_k=top_k, filters=filters)]
+        if not filters:
+            return filtered
+        unfiltered = [format_match(i, s, m) for i, s, m in index.search(query, top_k=top_k)]
+        return merge_results(filtered, unfiltered, top_k)
+
+async def _dense_search(query: str, active_filters: Dict[str, Any], top_k: int,
+                        query_embedding: Optional[List[float]]) -> List[Dict[str, Any]]:
+    if query_embedding is None:
+        with metrics.span("embed"):
+            query_embedding = await embed_query_async(query)
+    
+    # The vector clients are synchronous, so each search runs on the default executor
+    searches = [asyncio.to_thread(search_by_vector, query_embedding, top_k, active_filters)]
+    if active_filters:
+        searches.append(asyncio.to_thread(search_by_vector, query_embedding, top_k, None))
+        
+    outcomes = await asyncio.gather(*searches, return_exceptions=True)
+    
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            print(f"Error in vector search: {outcome}")
+            results.append([])
+        else:
+            results.append(outcome)
+            
+    if len(results) == 1:
+        return results[0]
+    return merge_results(results[0], results[1], top_k)
 
-def retrieve(query: str, filters: Dict[str, Any] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+async def retrieve_async(query: str, filters: Dict[str, Any] = None, top_k: int = 5,
+                         query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
     """
-    Retrieve relevant documents from Pinecone based on the query and filters.
+    Retrieve relevant documents with hybrid (dense + BM25) search.
+    
+    The filtered and unfiltered vector searches and the lexical search all run
+    concurrently. If the dense path fails, the lexical results are returned alone.
+    With a reranker, more candidates are fetched and reranked down to top_k.
     
     Args:
         query: The user's search query
         filters: Optional dictionary of filters (year, category, etc.)
         top_k: Number of results to return
+        query_embedding: Precomputed query embedding (embedded here if omitted)
         
     Returns:
         List of relevant document dictionaries
     """
-    try:
-        results = search_vectors(query, top_k=top_k, filters=filters)
-        return results
-    except Exception as e:
-        print(f"Error in retrieval: {e}")
+    active_filters = {key: value for key, value in (filters or {}).items() if value}
+    # Loads the model on first use, so keep it off the event loop
+    reranker = await asyncio.to_thread(get_reranker)
+    fetch_k = max(top_k, RERANK_CANDIDATES) if reranker is not None else top_k
+    
+    tasks = [_dense_search(query, active_filters, fetch_k, query_embedding)]
+    if HYBRID_SEARCH_ENABLED:
+        tasks.append(asyncio.to_thread(lexical_search, query, active_filters, fetch_k))
+        
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    result_lists = []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            print(f"Error in retrieval: {outcome}")
+        elif outcome:
+            result_lists.append(outcome)
+            
+    if not result_lists:
         return []
+    if len(result_lists) == 1:
+        candidates = result_lists[0][:fetch_k]
+    else:
+        with metrics.span("fusion"):
+            candidates = reciprocal_rank_fusion(result_lists, fetch_k)
+    
+    if reranker is None:
+        return candidates[:top_k]
+    # CPU-bound inference runs on a worker thread
+    return await asyncio.to_thread(reranker.rerank, query, candidates, top_k)
+
+def retrieve(query: str, filters: Dict[str, Any] = None, top_k: int = 5,
+             query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    """
+    Retrieve relevant documents from the vector database based on the query and filters.
+    
+    Args:
+        query: The user's search query
+        filters: Optional dictionary of filters (year, category, etc.)
+        top_k: Number of results to return
+        query_embedding: Precomputed query embedding (embedded here if omitted)
+        
+    Returns:
+        List of relevant document dictionaries
+    """
+    return run_sync(retrieve_async(query, filters=filters, top_k=top_k, query_embedding=query_embedding))
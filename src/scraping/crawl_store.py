@@ -0,0 +1,275 @@
+"""
+Crawl Store: Append-only compressed record store for crawled pages.
+
+Every page is one independent gzip member (a JSON header line followed by the
+HTML) appended to a single data file, so the file as a whole is still a valid
+gzip stream. A sidecar `<store>.idx` JSONL maps each URL to the offset and
+length of its latest record, giving O(1) random access without scanning.
+Appends take a threading lock plus an `fcntl` file lock, so several threads
+or processes can write to one store (on Windows, without `fcntl`, only the
+threads of one process). Records written after the last index
+entry (e.g. a crash between the two writes) are recovered on open.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the thread lock alone
+    fcntl = None
+
+STORE_NAME = "crawl.store"
+
+
+def _encode(header: Dict[str, Any], html: str) -> bytes:
+    payload = (json.dumps(header) + "\n").encode('utf-8') + html.encode('utf-8')
+    return gzip.compress(payload, mtime=0)
+
+
+def _decode(payload: bytes) -> Dict[str, Any]:
+    header, _, body = payload.partition(b"\n")
+    record = json.loads(header)
+    record['html'] = body.decode('utf-8')
+    return record
+
+
+class CrawlStore:
+    """
+    URL-keyed page store backed by one compressed data file and an offset index.
+
+    Args:
+        path: Data file path; the index is written to path + ".idx"
+    """
+
+    def __init__(self, path: str = os.path.join("data/raw", STORE_NAME)):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        self.index: Dict[str, Dict[str, Any]] = {}
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with self._locked():
+            self._load_index()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.index
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self) -> None:
+        self.index = {}
+        indexed_end = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Interrupted index write; the record is recovered below
+                    self.index[entry['url']] = entry
+                    indexed_end = max(indexed_end, entry['offset'] + entry['length'])
+
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size > indexed_end:
+            self._recover(indexed_end)
+
+    def _recover(self, start: int) -> None:
+        """
+        Index complete records after `start` and drop a trailing partial record.
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+
+        entries = []
+        pos = 0
+        while pos < len(data):
+            decompressor = zlib.decompressobj(31)
+            try:
+                payload = decompressor.decompress(data[pos:])
+            except zlib.error:
+                break
+            if not decompressor.eof:
+                break
+            length = len(data) - pos - len(decompressor.unused_data)
+            header = json.loads(payload.partition(b"\n")[0])
+            entries.append({**header, "offset": start + pos, "length": length})
+            pos += length
+
+        if start + pos < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(start + pos)
+
+        if entries:
+            print(f"Recovered {len(entries)} unindexed records in {self.path}")
+            self._write_index(entries)
+
+    def _write_index(self, entries) -> None:
+        # Rewrite rather than append so an interrupted last index line is dropped
+        lines = [json.dumps(entry) + "\n" for entry in list(self.index.values()) + entries]
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.index_path)
+        for entry in entries:
+            self.index[entry['url']] = entry
+
+    def append(self, url: str, html: str, **headers) -> Dict[str, Any]:
+        """
+        Append a page; a later record for the same URL supersedes earlier ones.
+
+        Args:
+            url: Page URL
+            html: Page HTML
+            headers: Extra header fields stored in the index (etag, last_modified, ...)
+
+        Returns:
+            The index entry of the new record
+        """
+        header = {"url": url, "timestamp": time.time(), **headers}
+        frame = _encode(header, html)
+
+        with self._locked():
+            with open(self.path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(frame)
+            entry = {**header, "offset": offset, "length": len(frame)}
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+            self.index[url] = entry
+        return entry
+
+    def refresh(self) -> None:
+        """
+        Reload the index to pick up records appended by other processes.
+        """
+        with self._locked():
+            self._load_index()
+
+    def entry(self, url: str) -> Optional[Dict[str, Any]]:
+        return self.index.get(url)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Read the latest record for a URL ({url, timestamp, ..., html}), or None.
+        """
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(entry['offset'])
+            return _decode(gzip.decompress(f.read(entry['length'])))
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the latest record of every URL in file order.
+        """
+        entries = sorted(self.index.values(), key=lambda e: e['offset'])
+        with open(self.path, 'rb') as f:
+            for entry in entries:
+                f.seek(entry['offset'])
+                yield _decode(gzip.decompress(f.read(entry['length'])))
+
+
+def iter_json_array(path: str, read_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Stream the elements of a top-level JSON array without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace and separators between elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos < len(buffer):
+                if not started:
+                    if buffer[pos] != "[":
+                        raise ValueError(f"{path} does not contain a JSON array")
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    end = None
+                # An element only counts once its delimiter has been read (a number may continue)
+                if end is not None and (eof or (end < len(buffer) and buffer[end] in " \t\r\n,]")):
+                    yield item
+                    pos = end
+                    continue
+
+            if eof:
+                raise ValueError(f"Truncated JSON array in {path}")
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def import_legacy(input_dir: str = "data/raw", store: Optional[CrawlStore] = None) -> int:
+    """
+    Copy page_N.html/meta_N.json files and clios_raw.json into the store.
+
+    Returns:
+        Number of records imported
+    """
+    store = store or CrawlStore(os.path.join(input_dir, STORE_NAME))
+    count = 0
+
+    for filename in sorted(os.listdir(input_dir)):
+        if not (filename.startswith("page_") and filename.endswith(".html")):
+            continue
+        meta_path = os.path.join(input_dir, filename.replace("page_", "meta_").replace(".html", ".json"))
+        url = "#"
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                url = json.load(f).get('url', '#')
+        if url == "#":
+            url = filename  # Keep pages without a known URL distinct
+        with open(os.path.join(input_dir, filename), 'r', encoding='utf-8') as f:
+            store.append(url, f.read())
+        count += 1
+
+    raw_json = os.path.join(input_dir, "clios_raw.json")
+    if os.path.exists(raw_json):
+        for page in iter_json_array(raw_json):
+            store.append(page['url'], page['content'])
+            count += 1
+
+    print(f"Imported {count} pages into {store.path} ({len(store)} URLs).")
+    return count
+
+
+if __name__ == "__main__":
+    import_legacy()
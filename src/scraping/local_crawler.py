@@ -1,79 +1,183 @@
 """
 Local Crawler: Crawls the Clio Awards website to gather data.
+
+Pages are fetched by a small thread pool over pooled keep-alive sessions,
+with a per-host cap on concurrent requests and a minimum delay between
+request starts. Pages are appended to the compressed crawl store together
+with their ETag/Last-Modified validators, so a recrawl sends conditional
+requests and skips pages the server reports as unchanged (304).
 """
 
 import os
+import threading
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin, urlparse, urldefrag
 import time
-import json
+from src.scraping.crawl_store import CrawlStore, STORE_NAME
+
+class HostThrottle:
+    """
+    Per-host politeness: at most max_concurrency requests in flight and
+    request starts spaced at least delay seconds apart.
+    """
+
+    def __init__(self, max_concurrency=2, delay=1.0):
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_concurrency)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc
+        with self._semaphore(host):
+            # Reserve the next start time for this host, then sleep outside the lock
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+            yield
 
 class ClioCrawler:
-    def __init__(self, base_url="https://clios.com", output_dir="data/raw"):
+    def __init__(self, base_url="https://clios.com", output_dir="data/raw",
+                 workers=4, per_host_concurrency=2, delay=1.0, timeout=30):
         self.base_url = base_url
         self.output_dir = output_dir
         self.visited = set()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        
+        self.workers = workers
+        self.timeout = timeout
+        self.throttle = HostThrottle(per_host_concurrency, delay)
+        self._local = threading.local()
+
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
-            
+
+        self.store = CrawlStore(os.path.join(output_dir, STORE_NAME))
+
     def is_valid_url(self, url):
         parsed = urlparse(url)
         return bool(parsed.netloc) and parsed.netloc == urlparse(self.base_url).netloc
-        
+
+    def _session(self):
+        # One keep-alive session per worker thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def fetch(self, url):
+        """
+        GET a URL, sending the validators of its stored copy if there is one.
+        """
+        headers = {}
+        cached = self.store.entry(url)
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        with self.throttle.slot(url):
+            return self._session().get(url, headers=headers, timeout=self.timeout)
+
+    def save_page(self, url, response):
+        self.store.append(url, response.text,
+                          etag=response.headers.get('ETag'),
+                          last_modified=response.headers.get('Last-Modified'))
+        return response.text
+
+    def load_page(self, url):
+        return self.store.get(url)['html']
+
+    def extract_links(self, url, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        for link in soup.find_all('a', href=True):
+            next_url, _ = urldefrag(urljoin(url, link['href']))
+            if self.is_valid_url(next_url):
+                yield next_url
+
     def crawl(self, start_url, max_pages=50):
-        queue = [start_url]
-        count = 0
-        
+        """
+        Breadth-first crawl of up to max_pages pages from start_url.
+
+        Returns:
+            Dictionary of crawl statistics
+        """
+        frontier = deque([start_url])
+        seen = {start_url}
+        stats = {"pages": 0, "not_modified": 0, "failed": 0, "bytes": 0}
+        start_time = time.time()
+
         print(f"Starting crawl from {start_url}...")
-        
-        while queue and count < max_pages:
-            url = queue.pop(0)
-            if url in self.visited:
-                continue
-                
-            try:
-                print(f"Crawling: {url}")
-                response = requests.get(url, headers=self.headers)
-                if response.status_code != 200:
-                    print(f"Failed to fetch {url}: {response.status_code}")
-                    continue
-                    
-                self.visited.add(url)
-                
-                # Save HTML
-                filename = f"page_{count}.html"
-                with open(os.path.join(self.output_dir, filename), 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                    
-                # Save Metadata
-                meta = {
-                    'url': url,
-                    'filename': filename,
-                    'timestamp': time.time()
-                }
-                with open(os.path.join(self.output_dir, f"meta_{count}.json"), 'w', encoding='utf-8') as f:
-                    json.dump(meta, f, indent=2)
-                
-                count += 1
-                
-                # Extract links
-                soup = BeautifulSoup(response.text, 'html.parser')
-                for link in soup.find_all('a', href=True):
-                    next_url = urljoin(url, link['href'])
-                    if self.is_valid_url(next_url) and next_url not in self.visited:
-                        queue.append(next_url)
-                        
-                time.sleep(1)  # Polite delay
-                
-            except Exception as e:
-                print(f"Error crawling {url}: {e}")
-                
-        print("Crawl completed successfully.")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = {}
+            while frontier or in_flight:
+                # Never fetch more pages than the remaining budget
+                while frontier and len(in_flight) < self.workers * 2 and stats["pages"] + len(in_flight) < max_pages:
+                    url = frontier.popleft()
+                    print(f"Crawling: {url}")
+                    in_flight[pool.submit(self.fetch, url)] = url
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = in_flight.pop(future)
+                    try:
+                        response = future.result()
+                        stats["bytes"] += len(response.content)
+                        if response.status_code == 304:
+                            html = self.load_page(url)
+                            stats["not_modified"] += 1
+                        elif response.status_code == 200:
+                            html = self.save_page(url, response)
+                        else:
+                            print(f"Failed to fetch {url}: {response.status_code}")
+                            stats["failed"] += 1
+                            continue
+
+                        self.visited.add(url)
+                        stats["pages"] += 1
+
+                        # Enqueue each URL once, however many pages link to it
+                        for next_url in self.extract_links(url, html):
+                            if next_url not in seen:
+                                seen.add(next_url)
+                                frontier.append(next_url)
+
+                    except Exception as e:
+                        stats["failed"] += 1
+                        print(f"Error crawling {url}: {e}")
+
+        elapsed = max(time.time() - start_time, 1e-9)
+        stats["seconds"] = round(elapsed, 2)
+        print(f"Crawl completed: {stats['pages']} pages ({stats['not_modified']} unchanged), "
+              f"{stats['failed']} failed, {stats['bytes'] / 1e6:.2f} MB fetched "
+              f"({stats['pages'] / elapsed:.2f} pages/s)")
+        return stats
 
 if __name__ == "__main__":
     crawler = ClioCrawler()
@@ -6,6 +6,7 @@ import os
 import time
 from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
+from src.vector_db.embedders import get_embedder
 
 load_dotenv()
 
@@ -18,10 +19,12 @@ if not PINECONE_API_KEY:
 pc = Pinecone(api_key=PINECONE_API_KEY)
 
 # Index Config
-DIMENSION = 768  # For text-embedding-004
 METRIC = "cosine"
 
 def create_index():
+    # Sized for the configured embedder (768 for text-embedding-004, 384 for bge-small)
+    embedder = get_embedder()
+    dimension = embedder.dimension
     print(f"Checking if index '{PINECONE_INDEX_NAME}' exists...")
     
     existing_indexes = [i.name for i in pc.list_indexes()]
@@ -30,7 +33,7 @@ def create_index():
         print(f"Creating index '{PINECONE_INDEX_NAME}'...")
         pc.create_index(
             name=PINECONE_INDEX_NAME,
-            dimension=DIMENSION,
+            dimension=dimension,
             metric=METRIC,
             spec=ServerlessSpec(
                 cloud="aws",
@@ -47,7 +50,7 @@ def create_index():
     
     print("Index Statistics:")
     print(f"   Status: Ready")
-    print(f"   Dimension: {DIMENSION}")
+    print(f"   Dimension: {dimension} ({embedder.name})")
     print(f"   Metric: {METRIC}")
     print(f"   Total Vectors: {stats.total_vector_count}")
     print("\nPinecone index is ready for vector upload!")
@@ -0,0 +1,285 @@
+"""
+Embedders: The text-to-vector backends behind both the embedding job and query search.
+
+`generate_embeddings` (documents) and `embed_query` (queries) get their
+vectors from the same configured embedder (EMBEDDING_BACKEND):
+
+- GeminiEmbedder: remote `embed_content` calls under the shared token-bucket
+  limiter, so every query pays a network round trip and competes for quota
+- LocalEmbedder: a sentence-transformers model on the CPU. Texts are encoded
+  in batches of LOCAL_EMBEDDING_BATCH_SIZE with normalized outputs; the model
+  can run on PyTorch or ONNX Runtime (optionally an int8 quantized export),
+  with the CPU thread count pinned by LOCAL_EMBEDDING_THREADS
+
+Vectors from different embedders live in different spaces, so every record
+stores the embedder `name` in its metadata and indexes reject queries from a
+different embedder (`check_embedder`) instead of returning meaningless matches.
+"""
+
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from src.rag import clients, metrics
+from src.rag.config import (
+    EMBEDDING_BACKEND, EMBEDDING_MODEL, DIMENSION,
+    LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_QUERY_PREFIX, LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_RUNTIME, LOCAL_EMBEDDING_ONNX_FILE, LOCAL_EMBEDDING_THREADS,
+    EMBEDDING_RPM, EMBEDDING_TPM, EMBEDDING_BURST, RATE_LIMIT_STATE_DIR
+)
+from src.vector_db.rate_limiter import get_limiter, estimate_tokens
+
+# Records written before embedders were recorded all came from Gemini text-embedding-004
+LEGACY_EMBEDDER = "gemini:models/text-embedding-004"
+
+
+class EmbedderMismatch(ValueError):
+    """
+    An index was built by a different embedder than the one configured for queries.
+    """
+
+
+def embedder_name(backend: Optional[str] = None) -> str:
+    """
+    Name of the embedder for `backend` (default: EMBEDDING_BACKEND), without loading it.
+    """
+    if (backend or EMBEDDING_BACKEND) == "local":
+        return f"local:{LOCAL_EMBEDDING_MODEL}"
+    return f"gemini:{EMBEDDING_MODEL}"
+
+
+def check_embedder(recorded: Iterable[Optional[str]], expected: str, source: str) -> None:
+    """
+    Raise EmbedderMismatch unless every recorded embedder name equals `expected`.
+
+    Args:
+        recorded: Embedder names stored with the vectors (None for legacy records)
+        expected: Name of the embedder producing the query vectors
+        source: Index or file name, for the error message
+    """
+    found = {name or LEGACY_EMBEDDER for name in recorded}
+    if found and found != {expected}:
+        raise EmbedderMismatch(
+            f"{source} was built with {', '.join(sorted(found))} but queries use {expected}; "
+            f"re-run generate_embeddings with EMBEDDING_BACKEND={expected.split(':', 1)[0]} "
+            f"or switch the backend back"
+        )
+
+
+class Embedder(ABC):
+    """
+    Interface shared by the embedding backends.
+
+    `name` identifies the vector space (recorded with every document vector),
+    `remote` marks backends that are rate limited and worth calling concurrently.
+    A backend missing `embed_documents` or `embed_queries` fails when instantiated.
+    """
+
+    name = ""
+    dimension: Optional[int] = None
+    remote = False
+    # Most texts one embed call accepts (None: no limit)
+    max_batch_size: Optional[int] = None
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+    @abstractmethod
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+    async def embed_queries_async(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_queries, texts)
+
+    def warmup(self) -> None:
+        """
+        Pay one-time setup costs (connections, first inference) before the first query.
+        """
+
+
+_lock = threading.Lock()
+_embedding_limiter = None
+_embedder: Optional[Embedder] = None
+
+
+def get_embedding_limiter():
+    """
+    Token bucket shared with generate_embeddings (same key, same quota).
+    """
+    global _embedding_limiter
+    if _embedding_limiter is None:
+        with _lock:
+            if _embedding_limiter is None:
+                _embedding_limiter = get_limiter(
+                    "gemini-embedding",
+                    rpm=EMBEDDING_RPM,
+                    tpm=EMBEDDING_TPM,
+                    burst=EMBEDDING_BURST,
+                    state_dir=RATE_LIMIT_STATE_DIR
+                )
+    return _embedding_limiter
+
+
+def _record_wait(seconds: float) -> None:
+    metrics.inc("rate_limit_wait_seconds", "embedding", round(seconds, 3))
+
+
+def _record_retry(error: Exception) -> None:
+    metrics.inc("retries", "embedding")
+
+
+class GeminiEmbedder(Embedder):
+    """
+    Gemini `embed_content`, one request per batch of texts.
+
+    Args:
+        model: Gemini embedding model
+        client: google.genai client (default: the shared one from src.rag.clients)
+        limiter: Rate limiter (default: the shared gemini-embedding bucket)
+    """
+
+    dimension = DIMENSION
+    remote = True
+    max_batch_size = 100
+
+    def __init__(self, model: str = EMBEDDING_MODEL, client=None, limiter=None):
+        self.model = model
+        self.name = f"gemini:{model}"
+        self._client = client
+        self._limiter = limiter
+
+    def _config(self, task_type: str):
+        from google.genai import types
+        # The timeout is computed per attempt, after any rate limit wait
+        return types.EmbedContentConfig(task_type=task_type, http_options=clients.gemini_http_options())
+
+    def _values(self, response, texts: List[str]) -> List[List[float]]:
+        if len(response.embeddings) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(response.embeddings)}")
+        return [list(embedding.values) for embedding in response.embeddings]
+
+    def _embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        client = self._client or clients.get_gemini_client()
+        with clients.track("gemini"):
+            response = client.models.embed_content(model=self.model, contents=texts, config=self._config(task_type))
+        return self._values(response, texts)
+
+    async def _embed_async(self, texts: List[str], task_type: str) -> List[List[float]]:
+        client = self._client or clients.get_gemini_client()
+        with clients.track("gemini"):
+            response = await client.aio.models.embed_content(model=self.model, contents=texts,
+                                                             config=self._config(task_type))
+        return self._values(response, texts)
+
+    def _limited(self, texts: List[str]) -> dict:
+        tokens = sum(estimate_tokens(text) for text in texts)
+        metrics.inc("api_calls", "embedding")
+        metrics.inc("tokens", "embedding_input", tokens)
+        return {"tokens": tokens, "on_wait": _record_wait, "on_retry": _record_retry,
+                "deadline": clients.current_deadline()}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        limiter = self._limiter or get_embedding_limiter()
+        return limiter.call(self._embed, texts, "RETRIEVAL_DOCUMENT", **self._limited(texts))
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        limiter = self._limiter or get_embedding_limiter()
+        return limiter.call(self._embed, texts, "RETRIEVAL_QUERY", **self._limited(texts))
+
+    async def embed_queries_async(self, texts: List[str]) -> List[List[float]]:
+        # Waits for the limiter and the API without holding a thread
+        limiter = self._limiter or get_embedding_limiter()
+        return await limiter.call_async(self._embed_async, texts, "RETRIEVAL_QUERY", **self._limited(texts))
+
+    def warmup(self) -> None:
+        if self._client is None:
+            clients.get_gemini_client()
+        get_embedding_limiter()
+
+
+class LocalEmbedder(Embedder):
+    """
+    In-process sentence-transformers embeddings on the CPU.
+
+    Args:
+        model: Object with a sentence-transformers style `encode(texts, batch_size=...)`
+        model_name: Name recorded with the vectors (as "local:<model_name>")
+        batch_size: Texts per forward pass
+        query_prefix: Instruction prepended to queries only
+    """
+
+    def __init__(self, model, model_name: str, batch_size: int = 64, query_prefix: str = ""):
+        self.model = model
+        self.name = f"local:{model_name}"
+        self.batch_size = batch_size
+        self.query_prefix = query_prefix
+        self.dimension = model.get_sentence_embedding_dimension()
+        # One inference at a time: a forward pass already uses every configured thread
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                        convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._encode([self.query_prefix + text for text in texts])
+
+    def warmup(self) -> None:
+        # The first forward pass allocates the runtime's buffers
+        self._encode(["warmup"])
+
+
+def load_local_model(model_name: str = LOCAL_EMBEDDING_MODEL, runtime: str = LOCAL_EMBEDDING_RUNTIME,
+                     onnx_file: str = LOCAL_EMBEDDING_ONNX_FILE, threads: int = LOCAL_EMBEDDING_THREADS):
+    """
+    Load a sentence-transformers model for CPU inference.
+
+    Args:
+        model_name: Hugging Face model ID or local path
+        runtime: "torch" or "onnx"
+        onnx_file: ONNX export inside the model repo (e.g. an int8 quantized one); empty for the default
+        threads: CPU threads for inference (0 keeps the runtime default)
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if runtime == "onnx":
+        model_kwargs = {"provider": "CPUExecutionProvider"}
+        if onnx_file:
+            model_kwargs["file_name"] = onnx_file
+        if threads > 0:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            model_kwargs["session_options"] = options
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def get_embedder() -> Embedder:
+    """
+    The process-wide embedder for EMBEDDING_BACKEND, loading a local model on first use.
+    """
+    global _embedder
+    if _embedder is None:
+        with _lock:
+            if _embedder is None:
+                if EMBEDDING_BACKEND == "local":
+                    _embedder = LocalEmbedder(load_local_model(), LOCAL_EMBEDDING_MODEL,
+                                              batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+                                              query_prefix=LOCAL_EMBEDDING_QUERY_PREFIX)
+                else:
+                    _embedder = GeminiEmbedder()
+    return _embedder
@@ -0,0 +1,177 @@
+"""
+Embedding Cache: Two-tier cache for query embeddings (in-memory LRU + SQLite on disk).
+
+Keys combine the normalized query text with the embedding model and task type,
+so switching models never serves a stale vector. The SQLite store runs in WAL
+mode, which lets several Streamlit workers share it and keeps it across restarts.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a query so trivial variations (case, spacing) share a cache entry.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+def make_key(text: str, model: str, task_type: str) -> str:
+    raw = f"{model}\x00{task_type}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU in front of a persistent SQLite store.
+
+    Args:
+        db_path: SQLite file for the persistent tier (None disables it)
+        memory_entries: Maximum vectors kept in the in-memory LRU
+        disk_entries: Maximum vectors kept on disk; least recently used are evicted
+    """
+
+    def __init__(self, db_path: Optional[str] = "data/cache/embeddings.sqlite3",
+                 memory_entries: int = 1024, disk_entries: int = 50000):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " task_type TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)")
+            conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, values: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = values
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, text: str, model: str, task_type: str) -> Optional[List[float]]:
+        """
+        Look up an embedding, promoting disk hits into the memory tier.
+
+        Returns:
+            The cached embedding, or None on a miss
+        """
+        key = make_key(text, model, task_type)
+
+        with self._lock:
+            values = self._memory.get(key)
+            if values is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return values
+
+        if self.db_path:
+            conn = self._connection()
+            row = conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                values = array('f', row[0]).tolist()
+                self._remember(key, values)
+                with self._lock:
+                    self.disk_hits += 1
+                return values
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, model: str, task_type: str, values: List[float]) -> None:
+        """
+        Store an embedding in both tiers.
+        """
+        key = make_key(text, model, task_type)
+        values = list(values)
+        self._remember(key, values)
+
+        if self.db_path:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, task_type, vector, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, task_type, array('f', values).tobytes(), time.time())
+            )
+            self._evict_disk(conn)
+            conn.commit()
+
+    def _evict_disk(self, conn: sqlite3.Connection) -> None:
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.disk_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN"
+                " (SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            with self._lock:
+                self.evictions += overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            conn = self._connection()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Hit/miss counters and current size of each tier.
+        """
+        disk_size = 0
+        if self.db_path:
+            disk_size = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_size": len(self._memory),
+                "disk_size": disk_size
+            }
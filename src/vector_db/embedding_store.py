@@ -0,0 +1,302 @@
+"""
+Embedding Store: Binary, memory-mappable storage for embeddings.
+
+A store is a directory holding:
+
+    vectors.npy     (N, D) float32 or float16 matrix of the raw embedding values
+    norms.npy       (N,) float32 L2 norms, so cosine search needs no normalized copy
+    ids.npy         (N,) fixed-width unicode chunk IDs
+    meta.json       schema: count, dim, dtype and one entry per metadata column
+    col_<i>.*.npy   columnar metadata
+
+Columns with few distinct values (year, category, page_type) are dictionary
+encoded as int32 codes plus a category list, so metadata filters are plain
+array comparisons. Other columns (text, url, title) keep each value's JSON
+encoding in one uint8 buffer with int64 offsets and are decoded per row on
+demand. Every array is opened with mmap_mode='r', so opening a store takes
+milliseconds regardless of size and rows are zero-copy views.
+"""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+DTYPES = ("float32", "float16")
+
+# Columns with at most this many distinct values (and fewer than half the rows) are dictionary encoded
+MAX_CATEGORIES = 1024
+
+
+def store_path(embeddings_file: str) -> str:
+    base, _ = os.path.splitext(embeddings_file)
+    return f"{base}.embstore"
+
+
+def is_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def _encode_column(values: List[Any]) -> Dict[str, Any]:
+    encoded = [json.dumps(value) for value in values]
+    distinct = list(dict.fromkeys(encoded))
+    if len(distinct) <= MAX_CATEGORIES and len(distinct) * 2 <= len(values):
+        lookup = {value: code for code, value in enumerate(distinct)}
+        return {
+            "kind": "categorical",
+            "categories": [json.loads(value) for value in distinct],
+            "arrays": {"codes": np.fromiter((lookup[e] for e in encoded), dtype=np.int32, count=len(encoded))}
+        }
+
+    data = [e.encode('utf-8') for e in encoded]
+    offsets = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum([len(d) for d in data], out=offsets[1:])
+    return {
+        "kind": "json",
+        "arrays": {"data": np.frombuffer(b"".join(data), dtype=np.uint8), "offsets": offsets}
+    }
+
+
+def write_store(path: str, ids: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]],
+                dtype: str = "float32") -> "EmbeddingStore":
+    """
+    Write ids, vectors and metadata rows as a store directory (replacing any existing one).
+
+    Args:
+        path: Store directory
+        ids: Chunk IDs, one per row
+        vectors: (N, D) embedding matrix
+        metadata: Metadata dicts, one per row
+        dtype: Storage precision, "float32" or "float16"
+
+    Returns:
+        The written store, opened for reading
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}', expected one of {DTYPES}")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2:
+        vectors = vectors.reshape(len(ids), -1)
+    if not (len(ids) == len(vectors) == len(metadata)):
+        raise ValueError("ids, vectors and metadata must have the same length")
+
+    # Build in a temp directory and swap it in, so readers never see a partial store
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    np.save(os.path.join(tmp_path, "vectors.npy"), vectors.astype(dtype))
+    np.save(os.path.join(tmp_path, "norms.npy"), np.linalg.norm(vectors, axis=1).astype(np.float32))
+    np.save(os.path.join(tmp_path, "ids.npy"), np.asarray(ids, dtype=str) if ids else np.zeros(0, dtype="<U1"))
+
+    names = list(dict.fromkeys(key for row in metadata for key in row))
+    columns = []
+    for i, name in enumerate(names):
+        column = _encode_column([row.get(name) for row in metadata])
+        for suffix, array in column.pop("arrays").items():
+            np.save(os.path.join(tmp_path, f"col_{i}.{suffix}.npy"), array)
+        columns.append({"name": name, "file": f"col_{i}", **column})
+
+    with open(os.path.join(tmp_path, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"count": len(ids), "dim": int(vectors.shape[1]) if len(ids) else 0,
+                   "dtype": dtype, "columns": columns}, f)
+
+    if os.path.exists(path):
+        old_path = path + ".old"
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path)
+    else:
+        os.replace(tmp_path, path)
+    return EmbeddingStore(path)
+
+
+class EmbeddingStore:
+    """
+    Read-only, memory-mapped view of a store directory.
+
+    Args:
+        path: Store directory written by write_store / jsonl_to_store
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+        self.dim = schema['dim']
+        self.dtype = schema['dtype']
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode='r')
+        self.norms = np.load(os.path.join(path, "norms.npy"), mmap_mode='r')
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode='r')
+        self.columns = {column['name']: column for column in schema['columns']}
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._decoded: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _array(self, column: Dict[str, Any], suffix: str) -> np.ndarray:
+        key = f"{column['file']}.{suffix}"
+        array = self._arrays.get(key)
+        if array is None:
+            array = np.load(os.path.join(self.path, f"{key}.npy"), mmap_mode='r')
+            self._arrays[key] = array
+        return array
+
+    def value(self, name: str, row: int) -> Any:
+        column = self.columns.get(name)
+        if column is None:
+            return None
+        if column['kind'] == "categorical":
+            return column['categories'][self._array(column, "codes")[row]]
+        offsets = self._array(column, "offsets")
+        return json.loads(self._array(column, "data")[offsets[row]:offsets[row + 1]].tobytes())
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return {name: self.value(name, row) for name in self.columns}
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Decode a whole metadata column into an object array (cached).
+        """
+        decoded = self._decoded.get(name)
+        if decoded is None:
+            decoded = np.empty(len(self), dtype=object)
+            column = self.columns.get(name)
+            if column is not None and column['kind'] == "categorical":
+                categories = np.empty(len(column['categories']), dtype=object)
+                categories[:] = column['categories']
+                decoded = categories[self._array(column, "codes")]
+            elif column is not None:
+                decoded[:] = [self.value(name, row) for row in range(len(self))]
+            self._decoded[name] = decoded
+        return decoded
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """
+        Build a boolean row mask for equality filters (Pinecone `{key: value}` semantics).
+
+        Returns:
+            Boolean array, or None when no filter applies
+        """
+        if not filters:
+            return None
+
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in filters.items():
+            column = self.columns.get(name)
+            if column is not None and column['kind'] == "categorical":
+                # Compare int codes without decoding the column
+                codes = [code for code, category in enumerate(column['categories']) if category == value]
+                if not codes:
+                    mask[:] = False
+                else:
+                    mask &= self._array(column, "codes") == codes[0]
+            else:
+                mask &= self.column(name) == value
+        return mask
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield {id, values, metadata} records; values are zero-copy row views.
+        """
+        for row in range(len(self)):
+            yield {"id": str(self.ids[row]), "values": self.vectors[row], "metadata": self.metadata(row)}
+
+
+def jsonl_to_store(embeddings_file: str, path: Optional[str] = None, dtype: str = "float32") -> EmbeddingStore:
+    """
+    Convert an embeddings JSONL ({id, values, metadata} per line) into a store.
+
+    Vectors are written straight into a memory-mapped matrix, so only the
+    metadata is held in memory during the conversion.
+    """
+    path = path or store_path(embeddings_file)
+
+    count, dim = 0, 0
+    with open(embeddings_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                if count == 0:
+                    dim = len(json.loads(line)['values'])
+                count += 1
+
+    scratch = path + ".vectors.tmp.npy"
+    matrix = np.lib.format.open_memmap(scratch, mode='w+', dtype=np.float32, shape=(count, dim))
+    ids, metadata = [], []
+    with open(embeddings_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            matrix[len(ids)] = record['values']
+            ids.append(record['id'])
+            metadata.append(record.get('metadata', {}))
+
+    try:
+        return write_store(path, ids, matrix, metadata, dtype=dtype)
+    finally:
+        del matrix
+        os.remove(scratch)
+
+
+def store_to_jsonl(path: str, embeddings_file: str) -> int:
+    """
+    Write a store back out as embeddings JSONL. Returns the number of records.
+    """
+    store = EmbeddingStore(path)
+    tmp_file = embeddings_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for record in store.iter_records():
+            record['values'] = record['values'].astype(np.float32).tolist()
+            f.write(json.dumps(record) + "\n")
+    os.replace(tmp_file, embeddings_file)
+    return len(store)
+
+
+def open_store(embeddings_file: str, dtype: str = "float32") -> EmbeddingStore:
+    """
+    Open the store for an embeddings file, converting the JSONL if the store is missing or older.
+
+    A store directory may also be passed directly.
+    """
+    if is_store(embeddings_file):
+        return EmbeddingStore(embeddings_file)
+
+    path = store_path(embeddings_file)
+    meta_file = os.path.join(path, "meta.json")
+    if os.path.exists(meta_file) and (not os.path.exists(embeddings_file)
+                                      or os.path.getmtime(meta_file) >= os.path.getmtime(embeddings_file)):
+        store = EmbeddingStore(path)
+        if store.dtype == dtype:
+            return store
+
+    if not os.path.exists(embeddings_file):
+        raise FileNotFoundError(f"Embeddings file not found: {embeddings_file}")
+    return jsonl_to_store(embeddings_file, path, dtype=dtype)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert between embeddings JSONL and the binary store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_store = subparsers.add_parser("to-store", help="JSONL -> store directory")
+    to_store.add_argument("source")
+    to_store.add_argument("destination", nargs="?")
+    to_store.add_argument("--dtype", default="float32", choices=DTYPES)
+    to_jsonl = subparsers.add_parser("to-jsonl", help="Store directory -> JSONL")
+    to_jsonl.add_argument("source")
+    to_jsonl.add_argument("destination")
+    args = parser.parse_args()
+
+    if args.command == "to-store":
+        store = jsonl_to_store(args.source, args.destination, dtype=args.dtype)
+        print(f"Wrote {len(store)} vectors ({store.dtype}, {store.dim} dims) to {store.path}")
+    else:
+        print(f"Wrote {store_to_jsonl(args.source, args.destination)} records to {args.destination}")
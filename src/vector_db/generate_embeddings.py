@@ -1,74 +1,238 @@
 """
-Generate Embeddings: Creates vector embeddings for chunked data using Gemini.
+Generate Embeddings: Creates vector embeddings for chunked data with the configured embedder.
+
+Chunks are streamed from disk, embedded in batches and appended to the output
+file as each batch finishes. With Gemini (EMBEDDING_BACKEND=gemini) each batch
+is one `embed_content` call and a small worker pool keeps several in flight
+under the shared rate limiter; the local backend encodes one batch at a time,
+since each forward pass already uses every CPU thread. A restart skips every
+`chunk_id` already present in the output, so a crash only loses in-flight batches.
+
+Every record stores the embedder's name in its metadata, so the indexes built
+from the file can reject queries embedded by a different backend. Resuming
+into a file written by another embedder raises EmbedderMismatch.
 """
 
 import json
 import os
 import time
-from google import genai
-from google.genai import types
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from src.vector_db import embedders
+from src.vector_db.embedders import Embedder, check_embedder
+from src.vector_db.rate_limiter import estimate_tokens
+from src.preprocessing.manifest import content_hash
+
+# Chunks per embedder call (Gemini accepts up to 100 contents per embed_content request)
+MAX_BATCH_SIZE = 100
+
+def get_embedder() -> Embedder:
+    """
+    The process-wide embedder for EMBEDDING_BACKEND (Gemini runs on the shared client and limiter).
+    """
+    return embedders.get_embedder()
+
+def iter_chunks(input_file: str) -> Iterator[Dict]:
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def load_completed_ids(output_file: str) -> Set[str]:
+    """
+    Read the chunk IDs already embedded, repairing a partially written last line.
+    """
+    completed = set()
+    if not os.path.exists(output_file):
+        return completed
+
+    valid_bytes = 0
+    with open(output_file, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Interrupted write
+            try:
+                completed.add(json.loads(line)['id'])
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(line)
+
+    if valid_bytes != os.path.getsize(output_file):
+        with open(output_file, 'r+b') as f:
+            f.truncate(valid_bytes)
+
+    return completed
+
+def chunk_hash(chunk: Dict) -> str:
+    # Metadata is part of the hash: a retitled page needs its stored records refreshed
+    return content_hash(json.dumps(chunk, sort_keys=True))
+
+def prune_output(output_file: str, keep: Set[str]) -> int:
+    """
+    Drop embedded records whose ID is not in keep. Returns the number removed.
+    """
+    if not os.path.exists(output_file):
+        return 0
+
+    removed = 0
+    tmp_file = output_file + ".tmp"
+    with open(output_file, 'r', encoding='utf-8') as src, open(tmp_file, 'w', encoding='utf-8') as dst:
+        for line in src:
+            if json.loads(line)['id'] in keep:
+                dst.write(line)
+            else:
+                removed += 1
+    if removed:
+        os.replace(tmp_file, output_file)
+    else:
+        os.remove(tmp_file)
+    return removed
+
+def first_embedder(output_file: str) -> Optional[str]:
+    """
+    Embedder recorded in the first record of output_file (None if empty or legacy).
+    """
+    if not os.path.exists(output_file):
+        return None
+    with open(output_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            return json.loads(line).get('metadata', {}).get('embedder')
+    return None
+
+def build_record(chunk: Dict, embedding: List[float], embedder: str) -> Dict:
+    return {
+        "id": chunk['chunk_id'],
+        "values": embedding,
+        "metadata": {
+            "text": chunk['content'],
+            "url": chunk['url'],
+            "title": chunk['title'],
+            "year": chunk['year'],
+            "category": chunk['category'],
+            "page_type": chunk['page_type'],
+            "chunk_index": chunk.get('chunk_index'),
+            "embedder": embedder
+        }
+    }
 
-load_dotenv()
+def embed_batch(chunks: List[Dict], embedder: Embedder) -> List[Dict]:
+    """
+    Embed a batch of chunks with a single embedder call.
+    """
+    vectors = embedder.embed_documents([chunk['content'] for chunk in chunks])
+    return [build_record(chunk, values, embedder.name) for chunk, values in zip(chunks, vectors)]
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("Missing GOOGLE_API_KEY in .env file")
+def generate_embeddings(input_file="data/chunks/clios_chunks.jsonl", output_file="data/embeddings/clios_embeddings.jsonl",
+                        batch_size=MAX_BATCH_SIZE, workers=4, manifest=None, dry_run=False):
+    """
+    Embed every chunk not yet present in output_file.
 
-client = genai.Client(api_key=GOOGLE_API_KEY)
-EMBEDDING_MODEL = "models/text-embedding-004"
+    Args:
+        input_file: Chunk JSONL produced by chunk_data.py
+        output_file: Embeddings JSONL (appended to; only rewritten to prune stale records)
+        batch_size: Chunks per embedder call (capped at the embedder's max_batch_size)
+        workers: Concurrent Gemini requests in flight (the local backend runs one batch at a time)
+        manifest: Optional Manifest; records of removed or changed chunks are pruned first
+        dry_run: Only report the delta against the manifest
 
-def generate_embeddings(input_file="data/chunks/clios_chunks.jsonl", output_file="data/embeddings/clios_embeddings.jsonl"):
+    Returns:
+        Dictionary of run statistics (or the delta summary for a dry run)
+    """
     print("Starting embedding generation...")
-    
+
+    current = {}
+    if manifest is not None:
+        current = {chunk['chunk_id']: chunk_hash(chunk) for chunk in iter_chunks(input_file)}
+        delta = manifest.diff("embed", current)
+        if dry_run:
+            delta.report()
+            return delta.summary()
+
     if not os.path.exists(os.path.dirname(output_file)):
         os.makedirs(os.path.dirname(output_file))
-        
-    chunks = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            chunks.append(json.loads(line))
-            
-    print(f"Loaded {len(chunks)} chunks.")
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for i, chunk in enumerate(chunks):
-            try:
-                # Rate limiting: 15 RPM = 1 request every 4 seconds
-                time.sleep(4)
-                
-                response = client.models.embed_content(
-                    model=EMBEDDING_MODEL,
-                    contents=chunk['content'],
-                    config=types.EmbedContentConfig(
-                        task_type="RETRIEVAL_DOCUMENT"
-                    )
-                )
-                
-                embedding = response.embeddings[0].values
-                
-                record = {
-                    "id": chunk['chunk_id'],
-                    "values": embedding,
-                    "metadata": {
-                        "text": chunk['content'],
-                        "url": chunk['url'],
-                        "title": chunk['title'],
-                        "year": chunk['year'],
-                        "category": chunk['category'],
-                        "page_type": chunk['page_type']
-                    }
-                }
-                
-                f.write(json.dumps(record) + "\n")
-                
-                if (i + 1) % 10 == 0:
-                    print(f"Processed {i + 1}/{len(chunks)} chunks...")
-                    
-            except Exception as e:
-                print(f"Error processing chunk {i}: {e}")
-                
+
+    embedder = get_embedder()
+    if not embedder.remote:
+        workers = 1
+    batch_size = max(1, min(batch_size, embedder.max_batch_size or batch_size))
+    completed = load_completed_ids(output_file)
+    if completed:
+        check_embedder([first_embedder(output_file)], embedder.name, output_file)
+
+    pruned = 0
+    if manifest is not None:
+        # Keep records that are still current and whose chunk did not change since embedding
+        changed = set(delta.changed)
+        keep = {chunk_id for chunk_id in completed if chunk_id in current and chunk_id not in changed}
+        pruned = prune_output(output_file, keep)
+        if pruned:
+            print(f"Pruned {pruned} stale embeddings.")
+        completed = keep
+
+    if completed:
+        print(f"Resuming: {len(completed)} chunks already embedded.")
+
+    pending = (chunk for chunk in iter_chunks(input_file) if chunk['chunk_id'] not in completed)
+
+    stats = {"embedded": 0, "failed": 0, "skipped": len(completed), "pruned": pruned, "tokens": 0}
+    start_time = time.time()
+
+    def report(final=False):
+        elapsed = max(time.time() - start_time, 1e-9)
+        label = "Done" if final else "Progress"
+        print(f"{label}: {stats['embedded']} chunks embedded, {stats['failed']} failed "
+              f"({stats['embedded'] / elapsed:.1f} chunks/s, {stats['tokens'] / elapsed:.0f} tokens/s)")
+
+    with open(output_file, 'a', encoding='utf-8') as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        batches = batched(pending, batch_size)
+
+        def submit_next():
+            batch = next(batches, None)
+            if batch is not None:
+                in_flight[pool.submit(embed_batch, batch, embedder)] = batch
+            return batch is not None
+
+        # Keep a bounded window of requests in flight so memory stays flat
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    records = future.result()
+                except Exception as e:
+                    stats["failed"] += len(batch)
+                    print(f"Error processing batch starting at {batch[0]['chunk_id']}: {e}")
+                else:
+                    # Checkpoint: each finished batch is durable before the next one lands
+                    f.write("".join(json.dumps(record) + "\n" for record in records))
+                    f.flush()
+                    stats["embedded"] += len(records)
+                    stats["tokens"] += sum(estimate_tokens(chunk['content']) for chunk in batch)
+                    report()
+                submit_next()
+
+    report(final=True)
+    if manifest is not None:
+        # Only chunks that actually landed in the output are recorded
+        manifest.replace("embed", {chunk_id: current[chunk_id]
+                                   for chunk_id in load_completed_ids(output_file) if chunk_id in current})
+    stats["seconds"] = round(time.time() - start_time, 2)
     print("Embedding generation complete!")
+    return stats
 
 if __name__ == "__main__":
     generate_embeddings()
@@ -0,0 +1,456 @@
+"""
+HNSW Index: Graph-based approximate nearest-neighbour search for the local backend.
+
+A hierarchical navigable small world graph over the normalized embeddings
+(Malkov & Yashunin). Layer 0 links live in one fixed-width int32 matrix
+(2 * M slots per node, padded with -1). The sparse upper layers are kept as
+per-level dicts. Everything is persisted as .npy files in a `<name>.hnsw/`
+directory next to the embedding store, and opened with mmap_mode='r'.
+
+The graph is keyed by chunk ID and synced against the store on load. New
+chunks are inserted, and removed chunks are tombstoned: they are still
+traversed but never returned. The graph is rebuilt once too many nodes are
+tombstoned, and whenever its own copy of the vectors no longer matches the
+store: meta.json records the store's embedder, and a spread sample of graph
+vectors is compared with the store's rows (re-embedding keeps the chunk IDs
+but moves every vector).
+
+Filtered search runs the graph walk with a filter-aware result set, so
+disallowed nodes still route the search but are never returned. The search
+breadth grows as the filter gets narrower. Very selective filters (few
+matching rows) skip the graph and score the matching rows exactly, so
+recall does not collapse.
+"""
+
+import heapq
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.vector_db.embedding_store import EmbeddingStore
+
+# Rebuild the graph from scratch once this share of its nodes are tombstones
+MAX_DELETED_FRACTION = 0.5
+# Graph vectors compared with the store's on load to detect re-embedded chunks
+FINGERPRINT_SAMPLE = 256
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+class HNSWGraph:
+    """
+    HNSW graph over unit vectors; similarity is the dot product.
+
+    Args:
+        dim: Vector dimension
+        M: Links per node on upper layers (2 * M on layer 0)
+        ef_construction: Candidate list size while inserting
+        seed: Seed for level assignment
+    """
+
+    def __init__(self, dim: int, M: int = 16, ef_construction: int = 100, seed: int = 0):
+        self.dim = dim
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.level_mult = 1.0 / np.log(max(M, 2))
+        self.rng = np.random.default_rng(seed)
+
+        self.count = 0
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.links0 = np.full((0, self.M0), -1, dtype=np.int32)
+        self.levels = np.zeros(0, dtype=np.int8)
+        self.deleted = np.zeros(0, dtype=bool)
+        self.upper: Dict[int, Dict[int, np.ndarray]] = {}
+        self.ids: List[str] = []
+        self.id_to_node: Dict[str, int] = {}
+        self.entry = -1
+        self.max_level = -1
+        # Embedder(s) recorded in the store the graph was built from
+        self.embedder = ""
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def deleted_count(self) -> int:
+        return int(self.deleted[:self.count].sum())
+
+    # Storage
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.vectors)
+        if size <= capacity and not isinstance(self.vectors, np.memmap):
+            return
+        capacity = max(size, 2 * capacity, 1024)
+
+        def grow(array, fill):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            return grown
+
+        # Also turns read-only memory maps into writable arrays on the first mutation
+        self.vectors = grow(self.vectors, 0)
+        self.links0 = grow(self.links0, -1)
+        self.levels = grow(self.levels, 0)
+        self.deleted = grow(self.deleted, False)
+
+    def _neighbors(self, node: int, level: int) -> np.ndarray:
+        if level == 0:
+            row = self.links0[node]
+            return row[row >= 0]
+        return self.upper.get(level, {}).get(node, _EMPTY)
+
+    def _set_neighbors(self, node: int, level: int, neighbors: List[int]) -> None:
+        if level == 0:
+            self.links0[node] = -1
+            self.links0[node, :len(neighbors)] = neighbors
+        else:
+            self.upper.setdefault(level, {})[node] = np.asarray(neighbors, dtype=np.int32)
+
+    # Search
+
+    def search_layer(self, query: np.ndarray, entry_points: List[int], ef: int, level: int,
+                     allowed: Optional[np.ndarray] = None) -> List[Tuple[float, int]]:
+        """
+        Best-first search of one layer.
+
+        Nodes outside `allowed` are expanded (they keep the graph connected)
+        but never enter the result set.
+
+        Returns:
+            Up to ef (distance, node) pairs sorted by ascending distance (-similarity)
+        """
+        visited = set(entry_points)
+        distances = (-(self.vectors[entry_points] @ query)).tolist()
+        candidates = list(zip(distances, entry_points))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates if allowed is None or allowed[n]]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if len(results) >= ef and distance > -results[0][0]:
+                break
+            fresh = [n for n in self._neighbors(node, level).tolist() if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            worst = -results[0][0] if results else np.inf
+            for d, n in zip((-(self.vectors[fresh] @ query)).tolist(), fresh):
+                if len(results) < ef or d < worst:
+                    heapq.heappush(candidates, (d, n))
+                    if allowed is None or allowed[n]:
+                        heapq.heappush(results, (-d, n))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+                        worst = -results[0][0]
+
+        return sorted((-d, n) for d, n in results)
+
+    def _descend(self, query: np.ndarray, target_level: int) -> List[int]:
+        # Greedy walk through the layers above target_level
+        entry = [self.entry]
+        for level in range(self.max_level, target_level, -1):
+            entry = [self.search_layer(query, entry, 1, level)[0][1]]
+        return entry
+
+    def search(self, query: np.ndarray, top_k: int, ef: int,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Returns:
+            Up to top_k (node, similarity) pairs, best first
+        """
+        if self.entry < 0:
+            return []
+        found = self.search_layer(query, self._descend(query, 0), max(ef, top_k), 0, allowed)
+        return [(node, -distance) for distance, node in found[:top_k]]
+
+    # Mutation
+
+    def _select(self, candidates: List[Tuple[float, int]], limit: int) -> List[int]:
+        """
+        Neighbour selection heuristic: prefer candidates that are closer to the
+        new node than to any neighbour already picked, then fill up with the rest.
+        """
+        selected, pruned = [], []
+        for distance, node in sorted(candidates):
+            if len(selected) >= limit:
+                break
+            if selected and np.any(-(self.vectors[selected] @ self.vectors[node]) <= distance):
+                pruned.append(node)
+            else:
+                selected.append(node)
+        return selected + pruned[:limit - len(selected)]
+
+    def _link(self, node: int, neighbor: int, level: int) -> None:
+        existing = self._neighbors(neighbor, level).tolist()
+        limit = self.M0 if level == 0 else self.M
+        if len(existing) < limit:
+            self._set_neighbors(neighbor, level, existing + [node])
+            return
+        pool = existing + [node]
+        distances = (-(self.vectors[pool] @ self.vectors[neighbor])).tolist()
+        self._set_neighbors(neighbor, level, self._select(list(zip(distances, pool)), limit))
+
+    def insert(self, chunk_id: str, vector: np.ndarray) -> int:
+        """
+        Add a vector (or revive a tombstoned one). Returns its node number.
+        """
+        node = self.id_to_node.get(chunk_id)
+        if node is not None:
+            self._reserve(self.count)
+            self.deleted[node] = False
+            return node
+
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+
+        node = self.count
+        self._reserve(node + 1)
+        self.vectors[node] = vector
+        level = int(-np.log(max(self.rng.random(), 1e-12)) * self.level_mult)
+        self.levels[node] = min(level, 127)
+        self.count += 1
+        self.ids.append(chunk_id)
+        self.id_to_node[chunk_id] = node
+
+        if self.entry < 0:
+            for upper_level in range(1, level + 1):
+                self._set_neighbors(node, upper_level, [])
+            self.entry, self.max_level = node, level
+            return node
+
+        entry = self._descend(vector, level)
+        for current in range(min(level, self.max_level), -1, -1):
+            found = self.search_layer(vector, entry, self.ef_construction, current)
+            neighbors = self._select(found, self.M)
+            self._set_neighbors(node, current, neighbors)
+            for neighbor in neighbors:
+                self._link(node, neighbor, current)
+            entry = [n for _, n in found]
+
+        for upper_level in range(self.max_level + 1, level + 1):
+            self._set_neighbors(node, upper_level, [])
+        if level > self.max_level:
+            self.entry, self.max_level = node, level
+        return node
+
+    def delete(self, chunk_id: str) -> bool:
+        """
+        Tombstone a vector; it stays in the graph for routing but is never returned.
+        """
+        node = self.id_to_node.get(chunk_id)
+        if node is None:
+            return False
+        self._reserve(self.count)
+        self.deleted[node] = True
+        return True
+
+    # Persistence
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        count = self.count
+        np.save(os.path.join(tmp_path, "vectors.npy"), np.asarray(self.vectors[:count]))
+        np.save(os.path.join(tmp_path, "links0.npy"), np.asarray(self.links0[:count]))
+        np.save(os.path.join(tmp_path, "levels.npy"), np.asarray(self.levels[:count]))
+        np.save(os.path.join(tmp_path, "deleted.npy"), np.asarray(self.deleted[:count]))
+        np.save(os.path.join(tmp_path, "ids.npy"), np.asarray(self.ids, dtype=str) if self.ids
+                else np.zeros(0, dtype="<U1"))
+
+        upper = {}
+        for level, links in self.upper.items():
+            nodes = np.fromiter(links, dtype=np.int32, count=len(links))
+            padded = np.full((len(nodes), self.M), -1, dtype=np.int32)
+            for i, node in enumerate(nodes):
+                padded[i, :len(links[node])] = links[node]
+            upper[f"nodes_{level}"], upper[f"links_{level}"] = nodes, padded
+        np.savez(os.path.join(tmp_path, "upper.npz"), **upper)
+
+        with open(os.path.join(tmp_path, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump({"dim": self.dim, "M": self.M, "ef_construction": self.ef_construction,
+                       "count": count, "entry": self.entry, "max_level": self.max_level,
+                       "embedder": self.embedder}, f)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HNSWGraph":
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        graph = cls(meta['dim'], meta['M'], meta['ef_construction'])
+        graph.count = meta['count']
+        graph.entry = meta['entry']
+        graph.max_level = meta['max_level']
+        graph.embedder = meta.get('embedder', "")
+        graph.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode='r')
+        graph.links0 = np.load(os.path.join(path, "links0.npy"), mmap_mode='r')
+        graph.levels = np.load(os.path.join(path, "levels.npy"))
+        graph.deleted = np.load(os.path.join(path, "deleted.npy"))
+        graph.ids = [str(chunk_id) for chunk_id in np.load(os.path.join(path, "ids.npy"))]
+        graph.id_to_node = {chunk_id: node for node, chunk_id in enumerate(graph.ids)}
+        with np.load(os.path.join(path, "upper.npz")) as upper:
+            for key in upper.files:
+                if key.startswith("nodes_"):
+                    level = int(key[len("nodes_"):])
+                    links = upper[f"links_{level}"]
+                    graph.upper[level] = {int(node): row[row >= 0] for node, row in zip(upper[key], links)}
+        return graph
+
+
+def hnsw_path(store: EmbeddingStore) -> str:
+    base = store.path[:-len(".embstore")] if store.path.endswith(".embstore") else store.path
+    return base + ".hnsw"
+
+
+def store_embedder(store: EmbeddingStore) -> str:
+    """
+    Embedder names recorded in the store, comma-separated ("" for legacy stores).
+    """
+    return ",".join(sorted({name for name in store.column("embedder") if name}))
+
+
+def vectors_match(graph: HNSWGraph, store: EmbeddingStore, sample: int = FINGERPRINT_SAMPLE) -> bool:
+    """
+    Whether a spread sample of the graph's vectors equals the store's (normalized) rows.
+    """
+    rows = {str(chunk_id): row for row, chunk_id in enumerate(store.ids)}
+    pairs = [(node, rows[chunk_id]) for node, chunk_id in enumerate(graph.ids)
+             if chunk_id in rows and not graph.deleted[node]]
+    if not pairs:
+        return True
+    picked = [pairs[i] for i in np.linspace(0, len(pairs) - 1, min(sample, len(pairs))).astype(int)]
+    nodes, store_rows = (np.array(column) for column in zip(*picked))
+    expected = np.asarray(store.vectors[store_rows], dtype=np.float32)
+    expected /= np.where(store.norms[store_rows] == 0, 1.0, store.norms[store_rows])[:, None]
+    # Loose tolerance: float16 stores round the vectors the graph copied
+    return bool(np.allclose(np.asarray(graph.vectors[nodes]), expected, atol=1e-2))
+
+
+class HNSWVectorIndex:
+    """
+    Local search through an HNSW graph kept in sync with an embedding store.
+
+    Args:
+        store: Embedding store (source of IDs, metadata and filter masks)
+        graph: HNSW graph over the store's vectors
+        ef_search: Result list size during search (higher = better recall, slower)
+        brute_force_limit: Filters matching at most this many rows are scored exactly
+        min_filter_fraction: Filters matching a smaller share of rows are scored exactly
+    """
+
+    def __init__(self, store: EmbeddingStore, graph: HNSWGraph, ef_search: int = 64,
+                 brute_force_limit: int = 2000, min_filter_fraction: float = 0.05):
+        self.store = store
+        self.graph = graph
+        self.ids = store.ids
+        self.ef_search = ef_search
+        self.brute_force_limit = brute_force_limit
+        self.min_filter_fraction = min_filter_fraction
+
+        rows = {str(chunk_id): row for row, chunk_id in enumerate(store.ids)}
+        # Store row of every graph node (-1 for nodes no longer in the store)
+        self.node_rows = np.fromiter((rows.get(chunk_id, -1) for chunk_id in graph.ids),
+                                     dtype=np.int64, count=len(graph))
+        self.live = (self.node_rows >= 0) & ~np.asarray(graph.deleted[:len(graph)])
+        self._norms = np.where(store.norms == 0, 1.0, store.norms).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, store: EmbeddingStore, M: int = 16, ef_construction: int = 100, ef_search: int = 64,
+             path: Optional[str] = None) -> "HNSWVectorIndex":
+        """
+        Open the persisted graph and apply inserts/deletes so it matches the store.
+        """
+        path = path or hnsw_path(store)
+        embedder = store_embedder(store)
+        graph = None
+        if os.path.exists(os.path.join(path, "meta.json")):
+            graph = HNSWGraph.load(path)
+            if graph.M != M or graph.dim != store.dim:
+                graph = None  # Parameters changed; rebuild
+            elif graph.embedder != embedder or not vectors_match(graph, store):
+                print("Embeddings changed since the HNSW graph was built; rebuilding it...")
+                graph = None
+
+        current = [str(chunk_id) for chunk_id in store.ids]
+        if graph is not None and len(graph) and graph.deleted_count / len(graph) > MAX_DELETED_FRACTION:
+            graph = None
+
+        changed = graph is None
+        if graph is None:
+            graph = HNSWGraph(store.dim, M, ef_construction)
+            graph.embedder = embedder
+        graph.ef_construction = ef_construction
+
+        current_set = set(current)
+        for chunk_id, node in list(graph.id_to_node.items()):
+            if chunk_id not in current_set and not graph.deleted[node]:
+                changed = graph.delete(chunk_id) or changed
+
+        added = [row for row, chunk_id in enumerate(current)
+                 if chunk_id not in graph.id_to_node or graph.deleted[graph.id_to_node[chunk_id]]]
+        if added:
+            print(f"Inserting {len(added)} vectors into the HNSW graph...")
+            for row in added:
+                graph.insert(current[row], store.vectors[row])
+            changed = True
+
+        if changed:
+            graph.save(path)
+        return cls(store, graph, ef_search)
+
+    def query(self, vector: List[float], top_k: int = 5,
+              filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Find the top_k most similar vectors, optionally restricted by metadata.
+
+        Returns:
+            List of (id, score, metadata) tuples sorted by descending score
+        """
+        if len(self) == 0 or top_k <= 0:
+            return []
+
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+
+        mask = self.store.filter_mask(filters)
+        ef = max(self.ef_search, top_k)
+        if mask is None:
+            allowed = self.live
+        else:
+            matching = int(mask.sum())
+            if matching == 0:
+                return []
+            fraction = matching / len(self)
+            if matching <= self.brute_force_limit or fraction < self.min_filter_fraction:
+                return self._exact(q, np.flatnonzero(mask), top_k)
+            # Widen the search in proportion to how much of the graph the filter hides
+            ef = min(len(self.graph), int(ef / fraction))
+            allowed = self.live & np.append(mask, False)[self.node_rows]
+
+        hits = self.graph.search(q, top_k, ef, allowed)
+        rows = [int(self.node_rows[node]) for node, _ in hits]
+        return [(str(self.ids[row]), float(score), self.store.metadata(row))
+                for row, (_, score) in zip(rows, hits)]
+
+    def _exact(self, q: np.ndarray, rows: np.ndarray, top_k: int) -> List[Tuple[str, float, Dict[str, Any]]]:
+        scores = (np.asarray(self.store.vectors[rows], dtype=np.float32) @ q) / self._norms[rows]
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(str(self.ids[rows[t]]), float(scores[t]), self.store.metadata(rows[t])) for t in top]
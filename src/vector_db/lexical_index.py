@@ -0,0 +1,229 @@
+"""
+Lexical Index: In-process BM25 inverted index over the chunk file.
+
+Complements dense retrieval for exact-name lookups (agencies, campaign titles)
+and keeps search working with zero API calls when Gemini is unavailable.
+Posting lists are stored as flat NumPy arrays (uint32 doc IDs, uint16 term
+frequencies, int64 offsets per term) and persisted next to the chunk file as
+`<name>.bm25.npz` plus a `<name>.bm25.meta.json` sidecar.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were
+what when where which who whom why will with do does did about can i me my you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _cache_paths(chunks_file: str) -> Tuple[str, str]:
+    base, _ = os.path.splitext(chunks_file)
+    return f"{base}.bm25.npz", f"{base}.bm25.meta.json"
+
+
+def _is_fresh(cache_file: str, source_file: str) -> bool:
+    if not os.path.exists(cache_file):
+        return False
+    if not os.path.exists(source_file):
+        return True
+    return os.path.getmtime(cache_file) >= os.path.getmtime(source_file)
+
+
+class LexicalIndex:
+    """
+    BM25 (Okapi) scoring over compact posting lists.
+
+    Args:
+        vocab: Term -> term ID
+        offsets: Posting list boundaries, postings of term t are [offsets[t], offsets[t + 1])
+        doc_ids: Concatenated posting lists (document row numbers)
+        term_freqs: Term frequency for each posting
+        doc_lengths: Token count per document
+        ids: Chunk IDs, one per document row
+        metadata: Chunk metadata, one per document row
+    """
+
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray,
+                 term_freqs: np.ndarray, doc_lengths: np.ndarray, ids: List[str],
+                 metadata: List[Dict[str, Any]], k1: float = 1.2, b: float = 0.75):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.ids = ids
+        self.metadata = metadata
+        self.k1 = k1
+        self.b = b
+
+        n_docs = len(ids)
+        self.avg_doc_length = float(doc_lengths.mean()) if n_docs else 0.0
+        doc_freqs = np.diff(offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        # Per-document BM25 length normalization, computed once
+        if n_docs:
+            self._norm = (k1 * (1.0 - b + b * doc_lengths / max(self.avg_doc_length, 1e-9))).astype(np.float32)
+        else:
+            self._norm = np.zeros(0, dtype=np.float32)
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, chunks_file: str) -> "LexicalIndex":
+        """
+        Tokenize the chunk file, build posting lists and persist them.
+
+        Args:
+            chunks_file: Chunk JSONL produced by chunk_data.py
+
+        Returns:
+            LexicalIndex ready for searching
+        """
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        ids, metadata, lengths = [], [], []
+
+        with open(chunks_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                row = len(ids)
+                # Titles are short and name-heavy, so they are indexed with the body
+                tokens = tokenize(f"{chunk.get('title', '')} {chunk.get('content', '')}")
+                for term, tf in Counter(tokens).items():
+                    postings[term].append((row, tf))
+                ids.append(chunk['chunk_id'])
+                metadata.append({key: value for key, value in chunk.items() if key != 'chunk_id'})
+                lengths.append(len(tokens))
+
+        terms = sorted(postings)
+        vocab = {term: i for i, term in enumerate(terms)}
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+
+        doc_ids = np.empty(offsets[-1], dtype=np.uint32)
+        term_freqs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            plist = postings[term]
+            doc_ids[offsets[i]:offsets[i + 1]] = [row for row, _ in plist]
+            term_freqs[offsets[i]:offsets[i + 1]] = [min(tf, 65535) for _, tf in plist]
+
+        doc_lengths = np.asarray(lengths, dtype=np.uint32)
+        index = cls(vocab, offsets, doc_ids, term_freqs, doc_lengths, ids, metadata)
+        index.save(chunks_file)
+        return index
+
+    def save(self, chunks_file: str) -> None:
+        arrays_path, meta_path = _cache_paths(chunks_file)
+
+        # Write to temp files first so concurrent readers never see a partial index
+        tmp_arrays = arrays_path + ".tmp.npz"
+        np.savez(tmp_arrays, offsets=self.offsets, doc_ids=self.doc_ids,
+                 term_freqs=self.term_freqs, doc_lengths=self.doc_lengths)
+        os.replace(tmp_arrays, arrays_path)
+
+        tmp_meta = meta_path + ".tmp"
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump({"terms": sorted(self.vocab, key=self.vocab.get), "ids": self.ids,
+                       "metadata": self.metadata}, f)
+        os.replace(tmp_meta, meta_path)
+
+    @classmethod
+    def load(cls, chunks_file: str) -> "LexicalIndex":
+        """
+        Load the persisted index, rebuilding it if the chunk file is newer.
+        """
+        arrays_path, meta_path = _cache_paths(chunks_file)
+
+        if not (_is_fresh(arrays_path, chunks_file) and _is_fresh(meta_path, chunks_file)):
+            if not os.path.exists(chunks_file):
+                raise FileNotFoundError(f"Chunks file not found: {chunks_file}")
+            return cls.build(chunks_file)
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        with np.load(arrays_path) as arrays:
+            return cls(
+                {term: i for i, term in enumerate(sidecar['terms'])},
+                arrays['offsets'], arrays['doc_ids'], arrays['term_freqs'], arrays['doc_lengths'],
+                sidecar['ids'], sidecar['metadata']
+            )
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            column = np.empty(len(self.metadata), dtype=object)
+            column[:] = [m.get(key) for m in self.metadata]
+            self._columns[key] = column
+        return column
+
+    def search(self, query: str, top_k: int = 5,
+               filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Rank chunks by BM25 score against the query terms.
+
+        Args:
+            query: Free-text query
+            top_k: Number of results to return
+            filters: Metadata equality filters (year, category, etc.)
+
+        Returns:
+            List of (id, score, metadata) tuples sorted by descending score
+        """
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            rows = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end].astype(np.float32)
+            scores[rows] += self.idf[t] * tf * (self.k1 + 1.0) / (tf + self._norm[rows])
+
+        if filters:
+            for key, value in filters.items():
+                scores[self._column(key) != value] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return []
+
+        k = min(top_k, candidates.size)
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[r], float(scores[r]), self.metadata[r]) for r in top]
+
+
+_index_lock = threading.Lock()
+_indexes: Dict[str, LexicalIndex] = {}
+
+
+def get_lexical_index(chunks_file: str) -> LexicalIndex:
+    """
+    Return the process-wide lexical index for a chunk file, loading it on first use.
+    """
+    index = _indexes.get(chunks_file)
+    if index is None:
+        with _index_lock:
+            index = _indexes.get(chunks_file)
+            if index is None:
+                index = LexicalIndex.load(chunks_file)
+                _indexes[chunks_file] = index
+    return index
@@ -0,0 +1,179 @@
+"""
+Local Index: In-process vector search over the generated embeddings using NumPy.
+
+The embeddings JSONL is converted once into a binary embedding store (see
+embedding_store.py): a memory-mapped vector matrix with precomputed norms,
+IDs and columnar metadata. Later loads open the store in milliseconds
+instead of re-parsing the JSON float lists.
+
+The process-wide index is reloaded whenever the file's mtime or size
+changes (the same fingerprint get_index_version uses for the answer cache),
+so a long-running app searches the re-ingested data without a restart.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.vector_db.embedding_store import EmbeddingStore, is_store, jsonl_to_store, open_store
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalVectorIndex:
+    """
+    Brute-force cosine similarity index over a memory-mapped embedding store.
+
+    Raw vectors are scored with one matrix-vector product and divided by the
+    stored row norms, followed by an `argpartition` top-k.
+    """
+
+    def __init__(self, store: EmbeddingStore):
+        self.store = store
+        self.vectors = store.vectors
+        self.ids = store.ids
+        # Zero vectors score 0 instead of dividing by zero
+        self._norms = np.where(store.norms == 0, 1.0, store.norms).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, embeddings_file: str, dtype: str = "float32") -> "LocalVectorIndex":
+        """
+        Convert the embeddings JSONL into a store and open it.
+
+        Args:
+            embeddings_file: Path to a JSONL file of {id, values, metadata} records
+            dtype: Stored vector precision ("float32" or "float16")
+
+        Returns:
+            LocalVectorIndex backed by a memory-mapped matrix
+        """
+        return cls(jsonl_to_store(embeddings_file, dtype=dtype))
+
+    @classmethod
+    def load(cls, embeddings_file: str, dtype: str = "float32") -> "LocalVectorIndex":
+        """
+        Load the index, rebuilding the store if the JSONL is newer.
+
+        Args:
+            embeddings_file: Path to the embeddings JSONL file (or a store directory)
+            dtype: Stored vector precision used when (re)building the store
+
+        Returns:
+            LocalVectorIndex ready for querying
+        """
+        return cls(open_store(embeddings_file, dtype=dtype))
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """
+        Build a boolean row mask for equality filters (Pinecone `{key: value}` semantics).
+
+        Returns:
+            Boolean array, or None when no filter applies
+        """
+        return self.store.filter_mask(filters)
+
+    def query(self, vector: List[float], top_k: int = 5,
+              filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Find the top_k most similar vectors, optionally restricted by metadata.
+
+        Args:
+            vector: Query embedding
+            top_k: Number of results to return
+            filters: Metadata equality filters (year, category, etc.)
+
+        Returns:
+            List of (id, score, metadata) tuples sorted by descending score
+        """
+        if len(self.ids) == 0 or top_k <= 0:
+            return []
+
+        q = _normalize(np.asarray(vector, dtype=np.float32))
+
+        mask = self.filter_mask(filters)
+        if mask is None:
+            candidates = None
+            scores = (self.vectors @ q) / self._norms
+        else:
+            candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return []
+            scores = (self.vectors[candidates] @ q) / self._norms[candidates]
+
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        rows = top if candidates is None else candidates[top]
+        return [(str(self.ids[r]), float(scores[t]), self.store.metadata(r)) for r, t in zip(rows, top)]
+
+
+INDEX_MODES = ("exact", "int8", "pq", "hnsw")
+
+_index_lock = threading.Lock()
+# (embeddings_file, mode) -> (file version, index)
+_indexes: Dict[Tuple[str, str], Tuple[Optional[Tuple[int, int]], Any]] = {}
+
+
+def file_version(embeddings_file: str) -> Optional[Tuple[int, int]]:
+    """
+    (mtime_ns, size) of an embeddings file, or of a store's meta.json; None if missing.
+    """
+    path = os.path.join(embeddings_file, "meta.json") if is_store(embeddings_file) else embeddings_file
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_local_index(embeddings_file: str, dtype: str = "float32", mode: str = "exact",
+                    pq_subspaces: int = 96, rescore_factor: int = 10, hnsw_m: int = 16,
+                    hnsw_ef_construction: int = 100, hnsw_ef_search: int = 64, embedder: Optional[str] = None):
+    """
+    Return the process-wide index for an embeddings file, loading it on first use
+    and reloading it once the file has been rewritten.
+
+    Args:
+        embeddings_file: Embeddings JSONL or store directory
+        dtype: Stored vector precision
+        mode: "exact" (brute force), "int8" or "pq" (quantized codes + exact rescoring),
+            or "hnsw" (graph-based approximate search)
+        pq_subspaces: PQ subspaces (must divide the embedding dimension)
+        rescore_factor: Quantized shortlist size as a multiple of top_k
+        hnsw_m: HNSW links per node
+        hnsw_ef_construction: HNSW candidate list size while inserting
+        hnsw_ef_search: HNSW candidate list size while querying
+        embedder: Name of the embedder producing query vectors; loading raises
+            EmbedderMismatch if the stored vectors came from a different one
+    """
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown local index mode '{mode}', expected one of {INDEX_MODES}")
+    key = (embeddings_file, mode)
+    version = file_version(embeddings_file)
+    entry = _indexes.get(key)
+    if entry is None or entry[0] != version:
+        with _index_lock:
+            entry = _indexes.get(key)
+            if entry is None or entry[0] != version:
+                index = LocalVectorIndex.load(embeddings_file, dtype=dtype)
+                if embedder is not None and len(index):
+                    from src.vector_db.embedders import check_embedder
+                    check_embedder(set(index.store.column("embedder")), embedder, embeddings_file)
+                if mode == "hnsw":
+                    from src.vector_db.hnsw_index import HNSWVectorIndex
+                    index = HNSWVectorIndex.load(index.store, hnsw_m, hnsw_ef_construction, hnsw_ef_search)
+                elif mode != "exact":
+                    from src.vector_db.quantized_index import QuantizedVectorIndex
+                    index = QuantizedVectorIndex.load(index.store, mode, pq_subspaces, rescore_factor)
+                entry = _indexes[key] = (version, index)
+    return entry[1]
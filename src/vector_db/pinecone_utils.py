@@ -1,27 +1,75 @@
 """
 Pinecone Utils: Handles vector database interactions and embedding generation.
+
+The Pinecone index handle and the Gemini client come from the shared client
+layer (`src.rag.clients`), which applies the per-call timeouts and the
+query's deadline. Query vectors come from the configured embedder
+(`src.vector_db.embedders`), and both index backends check that the
+vectors they hold were built by that same embedder. Clients, the embedder
+and the embedding cache are built on first use, so importing this module is
+cheap and needs no credentials. Call `warmup_search()` at server start to
+build them ahead of the first query.
 """
 
+import asyncio
 import os
+import threading
 import time
-from typing import List, Dict, Any
-from pinecone import Pinecone
-from google import genai
-from google.genai import types
-from src.rag.config import PINECONE_API_KEY, PINECONE_INDEX_NAME, GOOGLE_API_KEY
+from typing import List, Dict, Any, Optional
+from src.rag.config import (
+    PINECONE_INDEX_NAME, VECTOR_BACKEND, LOCAL_EMBEDDINGS_FILE, EMBEDDING_STORE_DTYPE,
+    LOCAL_INDEX_MODE, PQ_SUBSPACES, RESCORE_FACTOR, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH,
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MEMORY_ENTRIES, EMBEDDING_CACHE_DISK_ENTRIES,
+    INDEX_VERSION
+)
+from src.rag import clients, metrics
+from src.rag.clients import get_gemini_client, get_pinecone_index
+from src.vector_db.local_index import get_local_index
+from src.vector_db.embedding_cache import EmbeddingCache
+from src.vector_db.embedders import get_embedder, embedder_name, check_embedder
+
+_lock = threading.Lock()
+_embedding_cache = None
+_embedding_cache_ready = False
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Query embedding cache (None when disabled); repeat queries skip the API call.
+    """
+    global _embedding_cache, _embedding_cache_ready
+    if not _embedding_cache_ready:
+        with _lock:
+            if not _embedding_cache_ready:
+                if EMBEDDING_CACHE_ENABLED:
+                    _embedding_cache = EmbeddingCache(
+                        db_path=EMBEDDING_CACHE_PATH,
+                        memory_entries=EMBEDDING_CACHE_MEMORY_ENTRIES,
+                        disk_entries=EMBEDDING_CACHE_DISK_ENTRIES
+                    )
+                _embedding_cache_ready = True
+    return _embedding_cache
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
+def _cached_embedding(query_text: str, name: str) -> Optional[List[float]]:
+    # Keyed by embedder name, so switching backends never serves a vector from the other space
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is None:
+        return None
+    cached = embedding_cache.get(query_text, name, "RETRIEVAL_QUERY")
+    metrics.inc("cache_hits" if cached is not None else "cache_misses", "embedding")
+    return cached
 
-# Initialize Gemini
-client = genai.Client(api_key=GOOGLE_API_KEY)
-EMBEDDING_MODEL = "models/text-embedding-004"
+def _store_embedding(query_text: str, name: str, values: List[float]) -> None:
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        embedding_cache.put(query_text, name, "RETRIEVAL_QUERY", values)
 
 def embed_query(query_text: str) -> List[float]:
     """
-    Generate embedding for a query using Gemini.
-    Includes strict rate limiting (4s delay) to stay under 15 RPM.
+    Generate embedding for a query with the configured embedder.
+    Gemini calls go through the shared token-bucket limiter, which only waits
+    when the RPM/TPM budget is exhausted; the local backend embeds on the CPU.
+    Cached queries skip both.
     
     Args:
         query_text: The text to embed
@@ -29,63 +77,195 @@ def embed_query(query_text: str) -> List[float]:
     Returns:
         List of floats representing the embedding
     """
-    # Enforce rate limit: 15 RPM = 1 request every 4 seconds
-    # We sleep BEFORE the call to be safe
-    time.sleep(4)
+    embedder = get_embedder()
+    cached = _cached_embedding(query_text, embedder.name)
+    if cached is not None:
+        return cached
     
-    response = client.models.embed_content(
-        model=EMBEDDING_MODEL,
-        contents=query_text,
-        config=types.EmbedContentConfig(
-            task_type="RETRIEVAL_QUERY"  # Use QUERY for search queries
-        )
-    )
+    values = embedder.embed_queries([query_text])[0]
+    _store_embedding(query_text, embedder.name, values)
+    return values
+
+async def embed_query_async(query_text: str) -> List[float]:
+    """
+    Asyncio variant of embed_query: waits for the rate limiter and the
+    Gemini call without holding a thread (local inference runs in a worker thread).
     
-    return response.embeddings[0].values
+    Args:
+        query_text: The text to embed
+        
+    Returns:
+        List of floats representing the embedding
+    """
+    embedder = await asyncio.to_thread(get_embedder)
+    cached = _cached_embedding(query_text, embedder.name)
+    if cached is not None:
+        return cached
+    
+    values = (await embedder.embed_queries_async([query_text]))[0]
+    _store_embedding(query_text, embedder.name, values)
+    return values
 
-def search_vectors(query_text: str, top_k: int = 5, filters: Dict = None) -> List[Dict]:
+async def embed_query_batch_async(query_texts: List[str]) -> List[Optional[List[float]]]:
     """
-    Search Pinecone index for similar vectors.
+    Embed many queries with as few embedder calls as possible.
+    
+    Cached and repeated queries are only looked up once; the rest are sent in
+    batches of the embedder's `max_batch_size` (100 texts per Gemini request),
+    concurrently, with the rate limiter spacing the requests out.
     
     Args:
-        query_text: The user's query
+        query_texts: The texts to embed
+        
+    Returns:
+        One embedding per text, in order; None for texts whose batch failed
+    """
+    embedder = await asyncio.to_thread(get_embedder)
+    unique = list(dict.fromkeys(query_texts))
+    vectors = {}
+    for text in unique:
+        cached = _cached_embedding(text, embedder.name)
+        if cached is not None:
+            vectors[text] = cached
+    
+    pending = [text for text in unique if text not in vectors]
+    size = embedder.max_batch_size or max(1, len(pending))
+    
+    async def embed(batch: List[str]) -> None:
+        try:
+            values = await embedder.embed_queries_async(batch)
+        except Exception as e:
+            print(f"Error embedding a batch of {len(batch)} queries: {e}")
+            return
+        for text, embedding in zip(batch, values):
+            vectors[text] = embedding
+            _store_embedding(text, embedder.name, embedding)
+    
+    await asyncio.gather(*(embed(pending[i:i + size]) for i in range(0, len(pending), size)))
+    return [vectors.get(text) for text in query_texts]
+
+def get_index_version() -> str:
+    """
+    Identify the current contents of the vector index, for cache invalidation.
+    
+    The local backend derives it from the embeddings file, so regenerating
+    embeddings changes it automatically; Pinecone uses INDEX_VERSION.
+    """
+    if VECTOR_BACKEND == "local":
+        try:
+            stat = os.stat(LOCAL_EMBEDDINGS_FILE)
+            return f"local:{stat.st_mtime_ns}:{stat.st_size}"
+        except OSError:
+            return "local:missing"
+    return f"pinecone:{PINECONE_INDEX_NAME}:{INDEX_VERSION}"
+
+def _local_index():
+    return get_local_index(LOCAL_EMBEDDINGS_FILE, dtype=EMBEDDING_STORE_DTYPE, mode=LOCAL_INDEX_MODE,
+                           pq_subspaces=PQ_SUBSPACES, rescore_factor=RESCORE_FACTOR, hnsw_m=HNSW_M,
+                           hnsw_ef_construction=HNSW_EF_CONSTRUCTION, hnsw_ef_search=HNSW_EF_SEARCH,
+                           embedder=embedder_name())
+
+def format_match(match_id: str, score: float, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a raw index match into the result dict used by the RAG pipeline.
+    """
+    # generate_embeddings stores the chunk text under 'text'
+    content = metadata.get('content') or metadata.get('text', '')
+    return {
+        'id': match_id,
+        'score': score,
+        'title': metadata.get('title', 'Untitled'),
+        'url': metadata.get('url', '#'),
+        'content': content,
+        'excerpt': content[:300] + "...",
+        'year': int(metadata.get('year', 0)) if metadata.get('year') else None,
+        'category': metadata.get('category'),
+        'page_type': metadata.get('page_type'),
+        # Lets the context builder put chunks of one page back in order
+        'chunk_index': metadata.get('chunk_index')
+    }
+
+def search_by_vector(query_embedding: List[float], top_k: int = 5, filters: Dict = None) -> List[Dict]:
+    """
+    Search the configured vector backend with a precomputed embedding.
+    
+    Args:
+        query_embedding: The query vector
         top_k: Number of results to return
         filters: Metadata filters (year, category, etc.)
         
     Returns:
         List of matches with metadata
     """
-    # Generate embedding
-    query_embedding = embed_query(query_text)
-    
-    # Prepare filters for Pinecone
-    pinecone_filter = {}
+    # Drop empty filter values (same semantics for both backends)
+    metadata_filter = {}
     if filters:
         for key, value in filters.items():
             if value:
-                pinecone_filter[key] = value
+                metadata_filter[key] = value
                 
-    # Execute search
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        include_metadata=True,
-        filter=pinecone_filter if pinecone_filter else None
-    )
+    with metrics.span("vector_search"):
+        if VECTOR_BACKEND == "local":
+            hits = _local_index().query(query_embedding, top_k=top_k, filters=metadata_filter)
+            return [format_match(match_id, score, metadata) for match_id, score, metadata in hits]
+                    
+        # Execute search
+        metrics.inc("api_calls", "pinecone")
+        with clients.track("pinecone"):
+            results = get_pinecone_index().query(
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=True,
+                filter=metadata_filter if metadata_filter else None,
+                timeout=clients.pinecone_timeout()
+            )
+        
+        # Pinecone has no index-level metadata: every vector carries the name of its embedder
+        check_embedder(((match.metadata or {}).get('embedder') for match in results.matches),
+                       embedder_name(), f"Pinecone index '{PINECONE_INDEX_NAME}'")
+        return [format_match(match.id, match.score, match.metadata or {}) for match in results.matches]
+
+def search_vectors(query_text: str, top_k: int = 5, filters: Dict = None) -> List[Dict]:
+    """
+    Embed the query and search the configured vector backend (Pinecone or local).
     
-    # Format results
-    matches = []
-    for match in results.matches:
-        matches.append({
-            'id': match.id,
-            'score': match.score,
-            'title': match.metadata.get('title', 'Untitled'),
-            'url': match.metadata.get('url', '#'),
-            'content': match.metadata.get('content', ''),
-            'excerpt': match.metadata.get('content', '')[:300] + "...",
-            'year': int(match.metadata.get('year', 0)) if match.metadata.get('year') else None,
-            'category': match.metadata.get('category'),
-            'page_type': match.metadata.get('page_type')
-        })
+    Args:
+        query_text: The user's query
+        top_k: Number of results to return
+        filters: Metadata filters (year, category, etc.)
         
-    return matches
+    Returns:
+        List of matches with metadata
+    """
+    # Generate embedding
+    query_embedding = embed_query(query_text)
+    
+    return search_by_vector(query_embedding, top_k=top_k, filters=filters)
+
+def warmup_search() -> Dict[str, float]:
+    """
+    Build the search-side clients before the first query.
+
+    Returns:
+        Seconds spent per component
+    """
+    timings = {}
+    
+    def step(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            print(f"Warmup of {name} failed: {e}")
+        timings[name] = round(time.perf_counter() - start, 3)
+    
+    # Answers always need the Gemini client, even with local embeddings
+    step("gemini_client", get_gemini_client)
+    step("embedder", lambda: get_embedder().warmup())
+    step("embedding_cache", get_embedding_cache)
+    if VECTOR_BACKEND == "local":
+        step("local_index", _local_index)
+    else:
+        # One cheap request opens the HTTPS connection pool
+        step("pinecone", lambda: get_pinecone_index().describe_index_stats())
+    return timings
@@ -0,0 +1,262 @@
+"""
+Quantized Index: Compressed local vector search with full-precision rescoring.
+
+Two quantizers are trained on the L2-normalized vectors of an embedding store:
+
+- ScalarQuantizer (int8): one byte per dimension, using a per-dimension offset and scale
+- ProductQuantizer (PQ): the vector is split into m subspaces, and each is coded
+  as one byte that indexes a 256-entry k-means codebook
+
+Only the codes need to stay in RAM (D or m bytes per vector instead of 4 * D).
+A query scores every code approximately and keeps a shortlist of
+top_k * rescore_factor candidates. It then rescores the shortlist exactly
+against the memory-mapped float vectors of the store. Codes and codebooks are
+saved inside the store directory, so a rebuilt store always drops stale codes.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.vector_db.embedding_store import EmbeddingStore
+
+MODES = ("int8", "pq")
+
+# Rows scored per block; small blocks keep the temporary float32 copy of the codes in cache
+BLOCK_ROWS = 4096
+
+
+def _normalized_rows(store: EmbeddingStore, rows: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(store.vectors[rows], dtype=np.float32)
+    norms = np.asarray(store.norms[rows], dtype=np.float32)
+    norms[norms == 0] = 1.0
+    return vectors / norms[:, None]
+
+
+def _iter_blocks(count: int, block_rows: int = BLOCK_ROWS):
+    for start in range(0, count, block_rows):
+        yield np.arange(start, min(start + block_rows, count))
+
+
+def _sample_rows(count: int, sample_size: int, seed: int) -> np.ndarray:
+    if count <= sample_size:
+        return np.arange(count)
+    return np.sort(np.random.default_rng(seed).choice(count, sample_size, replace=False))
+
+
+class ScalarQuantizer:
+    """
+    int8 codes: x ~= offset + scale * (code + 128), fitted per dimension.
+    """
+
+    kind = "int8"
+
+    def __init__(self, offset: np.ndarray, scale: np.ndarray):
+        self.offset = offset.astype(np.float32)
+        self.scale = scale.astype(np.float32)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        return cls(low, scale)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        levels = np.rint((vectors - self.offset) / self.scale)
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # q . x ~= q . offset + sum_d q_d * scale_d * (code_d + 128)
+        weights = query * self.scale
+        bias = float(query @ self.offset) + 128.0 * float(weights.sum())
+        return codes.astype(np.float32) @ weights + bias
+
+    def save(self, path: str) -> None:
+        np.savez(path, offset=self.offset, scale=self.scale)
+
+    @classmethod
+    def load(cls, path: str) -> "ScalarQuantizer":
+        with np.load(path) as params:
+            return cls(params['offset'], params['scale'])
+
+
+class ProductQuantizer:
+    """
+    PQ codes: one uint8 centroid index per subspace, scored with per-query lookup tables.
+    """
+
+    kind = "pq"
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = codebooks.astype(np.float32)  # (m, ks, dsub)
+        self.m, self.ks, self.dsub = codebooks.shape
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, m: int = 96, iterations: int = 10, seed: int = 0) -> "ProductQuantizer":
+        dim = vectors.shape[1]
+        if dim % m:
+            raise ValueError(f"Dimension {dim} is not divisible by {m} subspaces")
+        dsub = dim // m
+        ks = min(256, len(vectors))
+        rng = np.random.default_rng(seed)
+
+        codebooks = np.empty((m, ks, dsub), dtype=np.float32)
+        for j in range(m):
+            sub = vectors[:, j * dsub:(j + 1) * dsub]
+            centroids = sub[rng.choice(len(sub), ks, replace=False)].copy()
+            for _ in range(iterations):
+                assign = cls._assign(sub, centroids)
+                counts = np.bincount(assign, minlength=ks)
+                sums = np.stack([np.bincount(assign, weights=sub[:, d], minlength=ks) for d in range(dsub)], axis=1)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+                # Re-seed empty clusters with random points
+                empty = np.flatnonzero(~filled)
+                if empty.size:
+                    centroids[empty] = sub[rng.choice(len(sub), empty.size)]
+            codebooks[j] = centroids
+        return cls(codebooks)
+
+    @staticmethod
+    def _assign(sub: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (centroids ** 2).sum(axis=1)[None, :] - 2.0 * sub @ centroids.T
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = self._assign(vectors[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Asymmetric distance: table[j, c] = q_j . centroid_jc, summed over subspaces
+        table = np.einsum('mkd,md->mk', self.codebooks, query.reshape(self.m, self.dsub))
+        # Flatten so each code becomes a single gather into the (m * ks) table
+        flat_codes = codes.astype(np.intp) + np.arange(self.m) * self.ks
+        return table.ravel()[flat_codes].sum(axis=1, dtype=np.float32)
+
+    def save(self, path: str) -> None:
+        np.savez(path, codebooks=self.codebooks)
+
+    @classmethod
+    def load(cls, path: str) -> "ProductQuantizer":
+        with np.load(path) as params:
+            return cls(params['codebooks'])
+
+
+class QuantizedVectorIndex:
+    """
+    Approximate search over quantized codes plus exact rescoring of a shortlist.
+
+    Args:
+        store: Embedding store holding the full-precision vectors
+        quantizer: Trained ScalarQuantizer or ProductQuantizer
+        codes: (N, D) int8 or (N, m) uint8 codes
+        rescore_factor: Shortlist size as a multiple of top_k
+    """
+
+    def __init__(self, store: EmbeddingStore, quantizer, codes: np.ndarray, rescore_factor: int = 10):
+        self.store = store
+        self.ids = store.ids
+        self.quantizer = quantizer
+        self.codes = codes
+        self.rescore_factor = rescore_factor
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return self.codes.shape[1] * self.codes.dtype.itemsize if len(self.codes) else 0
+
+    @classmethod
+    def build(cls, store: EmbeddingStore, mode: str = "int8", pq_subspaces: int = 96,
+              train_size: int = 10000, rescore_factor: int = 10, seed: int = 0) -> "QuantizedVectorIndex":
+        """
+        Train the quantizer on a sample, encode every vector and persist both in the store.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown quantization mode '{mode}', expected one of {MODES}")
+        code_path, params_path = cls._paths(store, mode, pq_subspaces)
+
+        sample = _normalized_rows(store, _sample_rows(len(store), train_size, seed))
+        if mode == "int8":
+            quantizer = ScalarQuantizer.train(sample)
+            codes = np.lib.format.open_memmap(code_path + ".tmp.npy", mode='w+', dtype=np.int8,
+                                              shape=(len(store), store.dim))
+        else:
+            quantizer = ProductQuantizer.train(sample, m=pq_subspaces, seed=seed)
+            codes = np.lib.format.open_memmap(code_path + ".tmp.npy", mode='w+', dtype=np.uint8,
+                                              shape=(len(store), quantizer.m))
+
+        for rows in _iter_blocks(len(store)):
+            codes[rows] = quantizer.encode(_normalized_rows(store, rows))
+        codes.flush()
+        del codes
+
+        quantizer.save(params_path + ".tmp.npz")
+        os.replace(params_path + ".tmp.npz", params_path)
+        os.replace(code_path + ".tmp.npy", code_path)
+        return cls(store, quantizer, np.load(code_path), rescore_factor)
+
+    @classmethod
+    def load(cls, store: EmbeddingStore, mode: str = "int8", pq_subspaces: int = 96,
+             rescore_factor: int = 10) -> "QuantizedVectorIndex":
+        """
+        Load persisted codes (into RAM) and codebooks, training them on first use.
+        """
+        code_path, params_path = cls._paths(store, mode, pq_subspaces)
+        if not (os.path.exists(code_path) and os.path.exists(params_path)):
+            return cls.build(store, mode, pq_subspaces, rescore_factor=rescore_factor)
+        quantizer = (ScalarQuantizer if mode == "int8" else ProductQuantizer).load(params_path)
+        return cls(store, quantizer, np.load(code_path), rescore_factor)
+
+    @staticmethod
+    def _paths(store: EmbeddingStore, mode: str, pq_subspaces: int) -> Tuple[str, str]:
+        name = "sq8" if mode == "int8" else f"pq{pq_subspaces}"
+        return os.path.join(store.path, f"{name}.codes.npy"), os.path.join(store.path, f"{name}.params.npz")
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        return self.store.filter_mask(filters)
+
+    def approximate_scores(self, query: np.ndarray, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        # Unfiltered queries slice the codes (views); filtered ones gather only the candidate rows
+        codes = self.codes if candidates is None else self.codes[candidates]
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = codes[start:start + BLOCK_ROWS]
+            scores[start:start + len(block)] = self.quantizer.score(block, query)
+        return scores
+
+    def query(self, vector: List[float], top_k: int = 5,
+              filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Find the top_k most similar vectors, optionally restricted by metadata.
+
+        Returns:
+            List of (id, score, metadata) tuples sorted by descending exact score
+        """
+        if len(self) == 0 or top_k <= 0:
+            return []
+
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+
+        mask = self.filter_mask(filters)
+        candidates = None if mask is None else np.flatnonzero(mask)
+        if candidates is not None and candidates.size == 0:
+            return []
+
+        approx = self.approximate_scores(q, candidates)
+        shortlist_size = min(len(approx), top_k * self.rescore_factor)
+        shortlist = np.argpartition(-approx, shortlist_size - 1)[:shortlist_size]
+        rows = np.sort(shortlist if candidates is None else candidates[shortlist])
+
+        # Exact cosine on the shortlist only, read from the memory-mapped store
+        exact = _normalized_rows(self.store, rows) @ q
+        k = min(top_k, len(rows))
+        top = np.argpartition(-exact, k - 1)[:k]
+        top = top[np.argsort(-exact[top])]
+        return [(str(self.ids[rows[t]]), float(exact[t]), self.store.metadata(rows[t])) for t in top]
@@ -0,0 +1,322 @@
+"""
+Rate Limiter: Token-bucket limiter for Gemini API quotas (requests and tokens per minute).
+
+Callers only wait when the bucket is actually empty, instead of sleeping a
+fixed 4 seconds before every request. When a `state_file` is given, the bucket
+state lives in that file under an exclusive `fcntl` lock, so every process on
+the machine (Streamlit workers, the batch embedding job) draws from one budget.
+A 429 response halves the allowed rate; successful calls slowly restore it.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process bucket
+    fcntl = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate for TPM accounting (~4 characters per token).
+    """
+    return max(1, len(text) // 4)
+
+
+# Quota errors as the SDKs print them ("429 RESOURCE_EXHAUSTED ...", "(429) Reason: Too Many Requests",
+# "HTTP 429"); a bare 429 elsewhere in a message (an ID, a count) does not count
+_RATE_LIMIT_MESSAGE = re.compile(
+    r"^\W*429\b|\b(?:HTTP|status|code)\W{0,3}429\b|\bRESOURCE_EXHAUSTED\b|\bToo Many Requests\b",
+    re.IGNORECASE
+)
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """
+    Detect quota errors from the Google / Pinecone SDKs without importing them.
+    """
+    for attr in ("code", "status_code", "status"):
+        if getattr(exc, attr, None) in (429, "429", "RESOURCE_EXHAUSTED"):
+            return True
+    return bool(_RATE_LIMIT_MESSAGE.search(str(exc)))
+
+
+class RateLimiter:
+    """
+    Token buckets for requests per minute (RPM) and tokens per minute (TPM).
+
+    Args:
+        rpm: Allowed requests per minute
+        tpm: Allowed tokens per minute (None disables token accounting)
+        burst: Requests that may be sent back-to-back when the bucket is full
+        state_file: Optional JSON file holding the bucket state shared across processes
+        min_rate_factor: Lower bound for the adaptive rate after repeated 429s
+    """
+
+    def __init__(self, rpm: float, tpm: Optional[float] = None, burst: int = 1,
+                 state_file: Optional[str] = None, min_rate_factor: float = 0.125):
+        self.rpm = float(rpm)
+        self.tpm = float(tpm) if tpm else None
+        self.burst = max(1, int(burst))
+        self.state_file = state_file if fcntl is not None else None
+        self.min_rate_factor = min_rate_factor
+
+        self._lock = threading.Lock()
+        self._state = self._initial_state()
+
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.rate_limited = 0
+
+        if self.state_file:
+            directory = os.path.dirname(self.state_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+
+    def _initial_state(self) -> Dict[str, float]:
+        now = time.time()
+        return {
+            "requests": float(self.burst),
+            "tokens": self.tpm or 0.0,
+            "updated": now,
+            "rate_factor": 1.0,
+            "blocked_until": 0.0
+        }
+
+    # --- State handling (process-local or file-backed) ---
+
+    def _with_state(self, update: Callable[[Dict[str, float]], Any]) -> Any:
+        with self._lock:
+            if not self.state_file:
+                return update(self._state)
+
+            with open(self.state_file + ".lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    state = self._read_state()
+                    result = update(state)
+                    self._write_state(state)
+                    return result
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_state(self) -> Dict[str, float]:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            # Clamp in case another process was configured with a larger burst
+            state["requests"] = min(state["requests"], float(self.burst))
+            return state
+        except (OSError, ValueError, KeyError):
+            return self._initial_state()
+
+    def _write_state(self, state: Dict[str, float]) -> None:
+        tmp = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_file)
+
+    def _refill(self, state: Dict[str, float], now: float) -> None:
+        elapsed = max(0.0, now - state["updated"])
+        factor = state["rate_factor"]
+        state["requests"] = min(float(self.burst), state["requests"] + elapsed * self.rpm / 60.0 * factor)
+        if self.tpm:
+            state["tokens"] = min(self.tpm, state["tokens"] + elapsed * self.tpm / 60.0 * factor)
+        state["updated"] = now
+
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        Take one request (and `tokens` tokens) if available.
+
+        Returns:
+            0.0 on success, otherwise the seconds to wait before retrying
+        """
+        def update(state):
+            now = time.time()
+            self._refill(state, now)
+
+            if state["blocked_until"] > now:
+                return state["blocked_until"] - now
+
+            needed_tokens = min(float(tokens), self.tpm) if self.tpm else 0.0
+            factor = state["rate_factor"]
+
+            wait = 0.0
+            if state["requests"] < 1.0:
+                wait = max(wait, (1.0 - state["requests"]) * 60.0 / (self.rpm * factor))
+            if self.tpm and state["tokens"] < needed_tokens:
+                wait = max(wait, (needed_tokens - state["tokens"]) * 60.0 / (self.tpm * factor))
+            if wait > 0:
+                return wait
+
+            state["requests"] -= 1.0
+            if self.tpm:
+                state["tokens"] -= needed_tokens
+            return 0.0
+
+        return self._with_state(update)
+
+    # --- Public API ---
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> float:
+        """
+        Block until a request with `tokens` tokens fits in the budget.
+
+        Raises:
+            TimeoutError: If the budget will not allow the request within `timeout` seconds
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                self._record(waited)
+                return waited
+            self._check_timeout(waited + wait, timeout)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens: int = 1, timeout: Optional[float] = None) -> float:
+        """
+        Asyncio variant of `acquire` that yields to the event loop while waiting.
+        """
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                self._record(waited)
+                return waited
+            self._check_timeout(waited + wait, timeout)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    @staticmethod
+    def _check_timeout(needed: float, timeout: Optional[float]) -> None:
+        # Fail up front instead of sleeping past the caller's deadline
+        if timeout is not None and needed > timeout:
+            raise TimeoutError(f"Rate limit wait of {needed:.1f}s exceeds the {max(0.0, timeout):.1f}s left")
+
+    def _record(self, waited: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            self.waited_seconds += waited
+
+    def report_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Record a 429: halve the allowed rate and pause all callers.
+        """
+        def update(state):
+            state["rate_factor"] = max(self.min_rate_factor, state["rate_factor"] * 0.5)
+            pause = retry_after if retry_after is not None else 60.0 / (self.rpm * state["rate_factor"])
+            state["blocked_until"] = max(state["blocked_until"], time.time() + pause)
+            state["requests"] = 0.0
+
+        self._with_state(update)
+        with self._lock:
+            self.rate_limited += 1
+
+    def report_success(self) -> None:
+        """
+        Record a successful call: recover the rate additively towards the configured quota.
+        """
+        def update(state):
+            if state["rate_factor"] < 1.0:
+                state["rate_factor"] = min(1.0, round(state["rate_factor"] + 0.1, 6))
+
+        self._with_state(update)
+
+    def call(self, fn: Callable, *args, tokens: int = 1, max_retries: int = 3,
+             on_wait: Optional[Callable[[float], None]] = None,
+             on_retry: Optional[Callable[[Exception], None]] = None,
+             deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run `fn` under the limiter, backing off and retrying on 429 responses.
+
+        `on_wait(seconds)` is called after each wait for budget and
+        `on_retry(error)` before each retry (both optional, for metrics).
+        With a `deadline` (time.monotonic), waits that would run past it
+        raise TimeoutError instead.
+        """
+        for attempt in range(max_retries + 1):
+            waited = self.acquire(tokens, timeout=self._time_left(deadline))
+            if on_wait is not None and waited:
+                on_wait(waited)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    raise
+                self.report_rate_limited()
+                if on_retry is not None:
+                    on_retry(e)
+                time.sleep(random.uniform(0, 0.5))
+                continue
+            self.report_success()
+            return result
+
+    async def call_async(self, fn: Callable, *args, tokens: int = 1, max_retries: int = 3,
+                         on_wait: Optional[Callable[[float], None]] = None,
+                         on_retry: Optional[Callable[[Exception], None]] = None,
+                         deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Asyncio variant of `call`; `fn` must be a coroutine function.
+        """
+        for attempt in range(max_retries + 1):
+            waited = await self.acquire_async(tokens, timeout=self._time_left(deadline))
+            if on_wait is not None and waited:
+                on_wait(waited)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    raise
+                self.report_rate_limited()
+                if on_retry is not None:
+                    on_retry(e)
+                await asyncio.sleep(random.uniform(0, 0.5))
+                continue
+            self.report_success()
+            return result
+
+    @staticmethod
+    def _time_left(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.monotonic()
+
+    def stats(self) -> Dict[str, float]:
+        state = self._with_state(lambda s: dict(s))
+        with self._lock:
+            return {
+                "acquired": self.acquired,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "rate_limited": self.rate_limited,
+                "rate_factor": state["rate_factor"]
+            }
+
+
+_registry_lock = threading.Lock()
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_limiter(name: str, rpm: float, tpm: Optional[float] = None, burst: int = 1,
+                state_dir: Optional[str] = None) -> RateLimiter:
+    """
+    Return the process-wide limiter for a named quota, creating it on first use.
+
+    Limiters with the same name and `state_dir` share one budget across processes.
+    """
+    with _registry_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            state_file = os.path.join(state_dir, f"ratelimit_{name}.json") if state_dir else None
+            limiter = RateLimiter(rpm=rpm, tpm=tpm, burst=burst, state_file=state_file)
+            _limiters[name] = limiter
+        return limiter
@@ -1,45 +1,225 @@
 """
 Upload to Pinecone: Uploads generated embeddings to the Pinecone index.
+
+Vectors are streamed from the embeddings JSONL and packed into batches by
+serialized size (and count), so every request stays under Pinecone's limits.
+A small thread pool keeps a bounded window of upserts in flight. Failed
+upserts are retried with exponential backoff and jitter. Batches that still
+fail are appended to a dead-letter JSONL, which can be replayed with
+`replay_dead_letters`.
+
+Requests go through the shared Pinecone handle in src.rag.clients, and every
+upsert and delete carries its per-call timeout, so a hung request fails (and
+is retried) instead of blocking an upload worker.
 """
 
 import json
 import os
+import random
 import time
-from pinecone import Pinecone
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+from src.preprocessing.manifest import content_hash
+from src.rag import clients
+from src.rag.config import PINECONE_INDEX_NAME
 
-load_dotenv()
+# Pinecone rejects upsert requests over 2 MB or 1000 vectors; keep some headroom
+MAX_REQUEST_BYTES = int(1.8 * 1024 * 1024)
+MAX_BATCH_VECTORS = 1000
 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "clios-index")
+# Pinecone accepts up to 1000 IDs per delete request
+DELETE_BATCH_SIZE = 1000
 
-if not PINECONE_API_KEY:
-    raise ValueError("Missing PINECONE_API_KEY in .env file")
+DEAD_LETTER_FILE = "data/embeddings/failed_upserts.jsonl"
 
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
+def iter_vectors(input_file: str, ids: Optional[Set[str]] = None) -> Iterator[tuple]:
+    """
+    Stream (vector, serialized size) pairs, optionally only for the given IDs.
+    """
+    with open(input_file, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            vector = json.loads(line)
+            if ids is None or vector['id'] in ids:
+                yield vector, len(line)
 
-def upload_vectors(input_file="data/embeddings/clios_embeddings.jsonl", batch_size=100):
-    print(f"Uploading vectors from {input_file} to index '{PINECONE_INDEX_NAME}'...")
-    
-    vectors = []
-    with open(input_file, 'r', encoding='utf-8') as f:
+def pack_batches(vectors: Iterable[tuple], max_bytes: int = MAX_REQUEST_BYTES,
+                 max_vectors: int = MAX_BATCH_VECTORS) -> Iterator[List[Dict]]:
+    """
+    Group (vector, size) pairs into batches bounded by total size and count.
+    """
+    batch, batch_bytes = [], 0
+    for vector, size in vectors:
+        if batch and (batch_bytes + size > max_bytes or len(batch) >= max_vectors):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+def upsert_with_retry(batch: List[Dict], retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0) -> None:
+    """
+    Upsert one batch, retrying failures with exponential backoff and full jitter.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with clients.track("pinecone"):
+                clients.get_pinecone_index().upsert(vectors=batch, timeout=clients.pinecone_timeout())
+            return
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            print(f"Upsert of {len(batch)} vectors failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def write_dead_letters(batch: List[Dict], dead_letter_file: str) -> None:
+    directory = os.path.dirname(dead_letter_file)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    with open(dead_letter_file, 'a', encoding='utf-8') as f:
+        f.write("".join(json.dumps(vector) + "\n" for vector in batch))
+
+def upsert_batches(batches: Iterable[List[Dict]], workers: int = 4, retries: int = 5,
+                   dead_letter_file: str = DEAD_LETTER_FILE,
+                   on_success: Optional[Callable[[List[Dict]], None]] = None) -> Dict[str, int]:
+    """
+    Upsert batches concurrently with a bounded window of requests in flight.
+
+    on_success is called in the calling thread for every batch that landed.
+
+    Returns:
+        Dictionary of run statistics
+    """
+    stats = {"uploaded": 0, "failed": 0, "batches": 0, "bytes": 0}
+    start_time = time.time()
+    batches = iter(batches)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+
+        def submit_next():
+            batch = next(batches, None)
+            if batch is not None:
+                in_flight[pool.submit(upsert_with_retry, batch, retries)] = batch
+            return batch is not None
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    stats["failed"] += len(batch)
+                    write_dead_letters(batch, dead_letter_file)
+                    print(f"Error uploading batch starting at {batch[0]['id']}: {e} "
+                          f"(written to {dead_letter_file})")
+                else:
+                    stats["uploaded"] += len(batch)
+                    stats["batches"] += 1
+                    if on_success is not None:
+                        on_success(batch)
+                    elapsed = max(time.time() - start_time, 1e-9)
+                    print(f"Uploaded {stats['uploaded']} vectors ({stats['uploaded'] / elapsed:.0f} vectors/s)")
+                submit_next()
+
+    stats["seconds"] = round(time.time() - start_time, 2)
+    return stats
+
+def upload_changed(input_file, manifest, batch_size=MAX_BATCH_VECTORS, dry_run=False, workers=4,
+                   max_batch_bytes=MAX_REQUEST_BYTES, dead_letter_file=DEAD_LETTER_FILE):
+    """
+    Upsert only new/changed vectors and delete vectors that no longer exist.
+
+    Each vector is tracked in the manifest by the hash of its embeddings line,
+    and the manifest is updated after every successful batch, so an interrupted
+    upload resumes where it stopped.
+    """
+    current = {}
+    with open(input_file, 'rb') as f:
         for line in f:
-            vectors.append(json.loads(line))
-            
-    print(f"Loaded {len(vectors)} vectors.")
-    
-    # Batch upload
-    for i in range(0, len(vectors), batch_size):
-        batch = vectors[i:i + batch_size]
+            if line.strip():
+                current[json.loads(line)['id']] = content_hash(line.strip())
+
+    delta = manifest.diff("upload", current)
+    delta.report()
+    if dry_run:
+        return delta.summary()
+
+    stats = {"uploaded": 0, "failed": 0}
+    todo = set(delta.todo)
+    if todo:
+        stats = upsert_batches(
+            pack_batches(iter_vectors(input_file, todo), max_batch_bytes, batch_size),
+            workers=workers,
+            dead_letter_file=dead_letter_file,
+            on_success=lambda batch: manifest.update("upload", {v['id']: current[v['id']] for v in batch})
+        )
+
+    deleted = 0
+    for i in range(0, len(delta.removed), DELETE_BATCH_SIZE):
+        ids = delta.removed[i:i + DELETE_BATCH_SIZE]
         try:
-            index.upsert(vectors=batch)
-            print(f"Uploaded batch {i // batch_size + 1}/{(len(vectors) + batch_size - 1) // batch_size}")
-            time.sleep(1)  # Rate limit protection
+            with clients.track("pinecone"):
+                clients.get_pinecone_index().delete(ids=ids, timeout=clients.pinecone_timeout())
+            manifest.remove("upload", ids)
+            deleted += len(ids)
         except Exception as e:
-            print(f"Error uploading batch starting at {i}: {e}")
-            
-    print("Upload complete!")
+            print(f"Error deleting vectors starting at {ids[0]}: {e}")
+
+    print(f"Upload complete! {stats['uploaded']} upserted, {stats['failed']} failed, {deleted} deleted, "
+          f"{len(delta.unchanged)} unchanged.")
+    return {"uploaded": stats["uploaded"], "failed": stats["failed"], "deleted": deleted,
+            "unchanged": len(delta.unchanged)}
+
+def upload_vectors(input_file="data/embeddings/clios_embeddings.jsonl", batch_size=MAX_BATCH_VECTORS, manifest=None,
+                   dry_run=False, workers=4, max_batch_bytes=MAX_REQUEST_BYTES, dead_letter_file=DEAD_LETTER_FILE):
+    """
+    Upload embeddings to Pinecone.
+
+    Args:
+        input_file: Embeddings JSONL
+        batch_size: Maximum vectors per upsert request
+        manifest: Optional Manifest; only new/changed vectors are upserted and removed ones deleted
+        dry_run: Only report the delta against the manifest
+        workers: Upsert requests in flight
+        max_batch_bytes: Maximum serialized size of one upsert request
+        dead_letter_file: JSONL that receives vectors from batches that failed every retry
+
+    Returns:
+        Dictionary of run statistics
+    """
+    if manifest is not None:
+        print(f"Syncing vectors from {input_file} to index '{PINECONE_INDEX_NAME}'...")
+        return upload_changed(input_file, manifest, batch_size, dry_run, workers, max_batch_bytes, dead_letter_file)
+
+    print(f"Uploading vectors from {input_file} to index '{PINECONE_INDEX_NAME}'...")
+    stats = upsert_batches(pack_batches(iter_vectors(input_file), max_batch_bytes, batch_size),
+                           workers=workers, dead_letter_file=dead_letter_file)
+    print(f"Upload complete! {stats['uploaded']} upserted in {stats['batches']} batches, "
+          f"{stats['failed']} failed ({stats['seconds']}s).")
+    return stats
+
+def replay_dead_letters(dead_letter_file=DEAD_LETTER_FILE, workers=4):
+    """
+    Retry every vector in the dead-letter file; vectors that fail again are kept in it.
+    """
+    if not os.path.exists(dead_letter_file):
+        print("No dead-letter file to replay.")
+        return {"uploaded": 0, "failed": 0}
+
+    replay_file = dead_letter_file + ".replay"
+    os.replace(dead_letter_file, replay_file)
+    stats = upload_vectors(replay_file, workers=workers, dead_letter_file=dead_letter_file)
+    os.remove(replay_file)
+    return stats
 
 if __name__ == "__main__":
     upload_vectors()
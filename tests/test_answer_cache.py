@@ -0,0 +1,88 @@
+"""
+Answer Cache Tests: Verifies the semantic answer cache and its pipeline integration (offline).
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.rag import rag_pipeline, retriever, response_generator
+from src.rag.answer_cache import AnswerCache
+
+RESPONSE = {"answer": "Nike won.", "confidence": "high", "has_answer": True, "sources": [{"id": "a"}]}
+FILTERS = {"year": 2025, "category": "Clio Sports"}
+
+
+def test_near_duplicate_hits_and_filters_must_match():
+    cache = AnswerCache(threshold=0.95)
+    cache.store([1.0, 0.0, 0.0], FILTERS, RESPONSE)
+
+    hit = cache.lookup([0.99, 0.05, 0.0], FILTERS)
+    assert hit["answer"] == "Nike won."
+    assert hit["sources"] == [{"id": "a"}]
+    assert hit["cache_similarity"] > 0.95
+
+    assert cache.lookup([0.0, 1.0, 0.0], FILTERS) is None
+    assert cache.lookup([1.0, 0.0, 0.0], {"year": 2024, "category": "Clio Sports"}) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_ttl_lru_and_index_version():
+    cache = AnswerCache(max_entries=2, ttl_seconds=0.05)
+    cache.store([1.0, 0.0], {}, RESPONSE, index_version="v1")
+    cache.store([0.0, 1.0], {}, RESPONSE, index_version="v1")
+    cache.store([0.7, 0.7], {}, RESPONSE, index_version="v1")
+    assert cache.stats()["size"] == 2
+    assert cache.lookup([1.0, 0.0], {}, index_version="v1") is None  # evicted
+
+    assert cache.lookup([0.0, 1.0], {}, index_version="v1") is not None
+    assert cache.lookup([0.0, 1.0], {}, index_version="v2") is None  # re-indexed
+    assert cache.stats()["invalidations"] == 1
+
+    cache.store([0.0, 1.0], {}, RESPONSE, index_version="v2")
+    time.sleep(0.06)
+    assert cache.lookup([0.0, 1.0], {}, index_version="v2") is None  # expired
+
+
+def test_pipeline_flags_cache_hits_and_skips_llm(monkeypatch):
+    llm_calls = []
+
+    class FakeModels:
+        async def generate_content(self, model, contents, config=None):
+            llm_calls.append(contents)
+            return SimpleNamespace(text="Nike won Grand Clio.")
+
+    async def fake_embed(text):
+        return [1.0, 0.02] if "winner" in text else [1.0, 0.0]
+
+    source = {'id': 'a', 'score': 0.9, 'title': 'Winners', 'url': '#', 'content': 'Nike',
+              'excerpt': 'Nike', 'year': 2025, 'category': 'Clio Sports', 'page_type': 'winners'}
+
+    monkeypatch.setattr(rag_pipeline, "answer_cache", AnswerCache(threshold=0.95))
+    monkeypatch.setattr(rag_pipeline, "embed_query_async", fake_embed)
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", False)
+    monkeypatch.setattr(retriever, "get_reranker", lambda: None)
+    monkeypatch.setattr(retriever, "search_by_vector", lambda embedding, top_k=5, filters=None: [source])
+    monkeypatch.setattr(response_generator, "get_gemini_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=FakeModels())))
+
+    first = asyncio.run(rag_pipeline.query_async("Who won Clio Sports 2025?"))
+    second = asyncio.run(rag_pipeline.query_async("Clio Sports 2025 winners - who won?"))
+
+    assert first["cache_hit"] is False
+    assert second["cache_hit"] is True
+    assert second["answer"] == first["answer"]
+    assert second["sources"] == first["sources"]
+    assert len(llm_calls) == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
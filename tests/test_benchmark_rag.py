@@ -0,0 +1,55 @@
+"""
+RAG Benchmark Tests: Verifies the offline benchmark harness and its stub backends (offline).
+"""
+
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import benchmark_rag
+from src.rag import rag_pipeline, retriever
+
+
+def test_hash_embedding_is_deterministic():
+    first = benchmark_rag.hash_embed("Grand Clio Sports winners", 64)
+    assert (first == benchmark_rag.hash_embed("grand clio sports winners", 64)).all()
+    assert abs(float(first @ first) - 1.0) < 1e-6
+
+
+def test_benchmark_reports_stages_throughput_memory_and_recall():
+    golden = benchmark_rag.load_golden()
+    result = benchmark_rag.run_benchmark(golden, distractors=50, concurrency_levels=(1, 4), requests=8,
+                                         embed_ms=1, search_ms=1, llm_ms=2, jitter=0.5)
+
+    assert [level["concurrency"] for level in result["throughput"]] == [1, 4]
+    level = result["throughput"][0]
+    assert level["latency"]["count"] == 8
+    assert {"filters", "embed", "retrieve", "vector_search", "lexical_search", "context", "generate"} <= set(level["stages"])
+    assert level["latency"]["p50_ms"] <= level["latency"]["p95_ms"] <= level["latency"]["p99_ms"]
+    assert result["memory"]["peak_kib"] > 0
+    assert result["recall"]["recall_at_k"] >= 0.8
+    assert len(result["recall"]["queries"]) == len(golden["queries"])
+    json.dumps(result)  # Result must be serializable as written
+
+
+def test_stubs_are_removed_afterwards():
+    original_search = retriever.search_by_vector
+    original_client = benchmark_rag.response_generator.get_gemini_client
+    corpus = benchmark_rag.build_corpus(benchmark_rag.load_golden()["documents"], 5)
+    latency = benchmark_rag.Latency(0)
+
+    with benchmark_rag.stubbed_pipeline(corpus, latency, latency, latency):
+        response = rag_pipeline.query("Who won the Grand Clio in Clio Sports 2024?")
+        assert response["sources"][0]["id"] == "golden_sports_2024_winners"
+        assert response["answer"].startswith("Stub answer")
+
+    assert retriever.search_by_vector is original_search
+    assert benchmark_rag.response_generator.get_gemini_client is original_client
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
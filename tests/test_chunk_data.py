@@ -0,0 +1,77 @@
+"""
+Chunker Tests: Verifies token-bounded splitting, overlap and content-addressed IDs (offline).
+"""
+
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.preprocessing import chunk_data
+
+TEXT = " ".join(f"word{i}" for i in range(600))
+
+
+def test_chunks_respect_token_budget_and_overlap():
+    chunks = chunk_data.split_text(TEXT, chunk_size=100, overlap=20)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["token_count"] <= 100
+        assert sum(chunk_data.word_token_counts(chunk["content"].split())) == chunk["token_count"]
+
+    # Consecutive chunks share their boundary words
+    first, second = chunks[0]["content"].split(), chunks[1]["content"].split()
+    assert second[0] in first
+    assert first[-1] in second
+
+    # Every word is covered
+    covered = set(word for chunk in chunks for word in chunk["content"].split())
+    assert covered == set(TEXT.split())
+
+
+def test_chunk_ids_are_content_addressed():
+    record = {"url": "https://clios.com/sports/", "content": TEXT, "page_type": "winners"}
+    ids = [c["chunk_id"] for c in chunk_data.chunk_record(record, chunk_size=100, overlap=20)]
+    assert ids == [c["chunk_id"] for c in chunk_data.chunk_record(record, chunk_size=100, overlap=20)]
+    assert len(set(ids)) == len(ids)
+
+    # Editing the end of the page leaves the earlier chunk IDs unchanged
+    edited = dict(record, content=TEXT + " a brand new paragraph at the end")
+    edited_ids = [c["chunk_id"] for c in chunk_data.chunk_record(edited, chunk_size=100, overlap=20)]
+    assert edited_ids[:-1] == ids[:-1]
+    assert edited_ids[-1] != ids[-1]
+
+
+def test_chunk_metadata():
+    record = {"url": "https://clios.com/sports/winners", "content": "Grand Clio Sports 2025 winner Nike.",
+              "page_type": "winners"}
+    chunk = chunk_data.chunk_record(record)[0]
+
+    assert chunk["year"] == 2025
+    assert chunk["category"] == "Clio Sports"
+    assert chunk["chunk_index"] == 0 and chunk["total_chunks"] == 1
+
+
+def test_process_pool_matches_serial(tmp_path):
+    input_file = str(tmp_path / "clean.jsonl")
+    with open(input_file, 'w', encoding='utf-8') as f:
+        for i in range(20):
+            f.write(json.dumps({"url": f"https://clios.com/{i}", "content": TEXT[: 200 * (i + 1)],
+                                "page_type": "page"}) + "\n")
+
+    serial = chunk_data.chunk_file(input_file, str(tmp_path / "a" / "chunks.jsonl"), chunk_size=80, overlap=10)
+    pooled = chunk_data.chunk_file(input_file, str(tmp_path / "b" / "chunks.jsonl"), chunk_size=80, overlap=10,
+                                   workers=2)
+
+    assert serial == pooled
+    assert serial["documents"] == 20
+    with open(str(tmp_path / "a" / "chunks.jsonl"), 'rb') as a, open(str(tmp_path / "b" / "chunks.jsonl"), 'rb') as b:
+        assert a.read() == b.read()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,94 @@
+"""
+Cleaning Tests: Verifies parallel, streaming HTML cleaning in clean_raw (offline).
+"""
+
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.preprocessing import clean_raw
+from src.preprocessing.manifest import Manifest
+from src.scraping.crawl_store import CrawlStore, STORE_NAME, iter_json_array
+
+BODY = "The Clio Awards honor bold creative work in advertising and design. " * 3
+
+
+def make_store(raw_dir, count):
+    store = CrawlStore(os.path.join(raw_dir, STORE_NAME))
+    for i in range(count):
+        store.append(f"https://clios.com/winners/{i}",
+                     f"<html><title>Winners 20{10 + i}</title><script>var x = {i};</script>"
+                     f"<body><p>{BODY}</p><p>Page {i}</p></body></html>")
+    store.append("https://clios.com/empty", "<html><body>tiny</body></html>")
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_clean_html_extracts_text_and_metadata():
+    record = clean_raw.clean_html(f"<html><title>Jury 2024</title><style>p{{}}</style><body>{BODY}</body></html>",
+                                  "https://clios.com/jury")
+    assert record["year"] == 2024
+    assert record["page_type"] == "jury"
+    assert "p{}" not in record["content"]
+    assert clean_raw.clean_html("<p>short</p>", "#") is None
+
+
+def test_process_pool_matches_serial_output(tmp_path):
+    raw = str(tmp_path / "raw")
+    make_store(raw, 40)
+    serial, parallel, unordered = (str(tmp_path / "out" / name) for name in ("s.jsonl", "p.jsonl", "u.jsonl"))
+
+    stats = clean_raw.process_files(raw, serial, slowest=3)
+    clean_raw.process_files(raw, parallel, workers=3)
+    clean_raw.process_files(raw, unordered, workers=3, ordered=False)
+
+    assert stats["cleaned"] == 40
+    assert len(stats["slowest"]) == 3
+    assert read_jsonl(parallel) == read_jsonl(serial)
+    assert sorted(r["url"] for r in read_jsonl(unordered)) == sorted(r["url"] for r in read_jsonl(serial))
+
+
+def test_rerun_with_manifest_keeps_one_record_per_page(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    # Legacy pages without meta files all have url "#"
+    for i in range(3):
+        (raw / f"page_{i}.html").write_text(f"<html><body><p>{BODY}</p><p>Page {i}</p></body></html>",
+                                            encoding='utf-8')
+    (raw / "page_3.html").write_text(f"<html><body><p>{BODY}</p><p>Winners</p></body></html>", encoding='utf-8')
+    (raw / "meta_3.json").write_text(json.dumps({"url": "https://clios.com/winners"}), encoding='utf-8')
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    output = str(tmp_path / "out" / "clean.jsonl")
+
+    for _ in range(3):
+        stats = clean_raw.process_files(str(raw), output, manifest=manifest)
+        assert len(read_jsonl(output)) == 4
+
+    # Only the page with a real url is copied; url-less pages are cleaned again
+    assert stats == dict(stats, cleaned=3, unchanged=1)
+    assert sorted(r["url"] for r in read_jsonl(output)) == ["#", "#", "#", "https://clios.com/winners"]
+
+
+def test_missing_parser_backend_falls_back():
+    assert clean_raw.resolve_parser("html.parser") == "html.parser"
+    assert clean_raw.resolve_parser("selectolax") in ("selectolax", "html.parser")
+
+
+def test_raw_json_streams_in_small_reads(tmp_path):
+    path = str(tmp_path / "clios_raw.json")
+    pages = [{"url": f"https://clios.com/{i}", "content": BODY, "score": i * 1.5} for i in range(20)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(pages, f, indent=2)
+
+    assert list(iter_json_array(path, read_size=7)) == pages
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,117 @@
+"""
+Client Layer Tests: Verifies deadlines, per-call timeouts, the shared clients and their stats (offline).
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.rag import clients, config, metrics, rag_pipeline, retriever, response_generator
+from src.rag.async_utils import get_loop, run_sync
+
+SOURCE = {'id': 'a', 'score': 0.9, 'title': 'Clio Sports Winners', 'url': '#', 'content': 'Nike won.',
+          'excerpt': 'Nike won.', 'year': 2025, 'category': 'Clio Sports', 'page_type': 'winners'}
+
+
+class HungModels:
+    """
+    Gemini stand-in that never answers, but honours the per-request timeout like the SDK does.
+    """
+
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.wait_for(asyncio.sleep(30), config.http_options.timeout / 1000)
+
+
+def test_deadline_caps_call_timeouts():
+    assert clients.call_timeout(30.0) == 30.0
+
+    with clients.deadline(clients.deadline_after(2.0)):
+        assert 1.9 < clients.call_timeout(30.0) <= 2.0
+        # Nested deadlines never extend the outer one
+        with clients.deadline(clients.deadline_after(60.0)):
+            assert clients.call_timeout(30.0) <= 2.0
+
+    with clients.deadline(time.monotonic() - 1):
+        with pytest.raises(clients.DeadlineExceeded):
+            clients.gemini_http_options()
+
+
+def test_hung_llm_call_falls_back_within_the_budget(monkeypatch):
+    async def fake_embed(text):
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(rag_pipeline, "embed_query_async", fake_embed)
+    monkeypatch.setattr(rag_pipeline, "answer_cache", None)
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", False)
+    monkeypatch.setattr(retriever, "get_reranker", lambda: None)
+    monkeypatch.setattr(retriever, "search_by_vector", lambda embedding, top_k=5, filters=None: [SOURCE])
+    monkeypatch.setattr(response_generator, "get_gemini_client",
+                        lambda: SimpleNamespace(aio=SimpleNamespace(models=HungModels())))
+    timeouts_before = clients.stats()["gemini"]["timeouts"]
+
+    start = time.time()
+    response = rag_pipeline.query("Who won Clio Sports 2025?", timeout=0.3)
+
+    assert time.time() - start < 2.0
+    assert response["confidence"] == "medium"
+    assert "Clio Sports Winners" in response["answer"]
+    assert response["usage"]["timeouts"]["gemini"] == 1
+    assert clients.stats()["gemini"]["timeouts"] == timeouts_before + 1
+
+
+def test_gemini_client_is_shared_across_threads(monkeypatch):
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(config, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(clients, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(clients, "_gemini_client", None)
+    monkeypatch.setattr(clients, "_httpx_clients", {})
+
+    built = []
+    threads = [threading.Thread(target=lambda: built.append(clients.get_gemini_client())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in built}) == 1
+    pool = clients.stats()["gemini"]["pool"]
+    assert pool["max"] == config.HTTP_POOL_SIZE
+    assert pool["sync"] == {"open": 0, "idle": 0}
+    assert 'clio_rag_http_connections_open{pool="gemini_sync"} 0' in metrics.registry.render_prometheus()
+
+
+def test_run_sync_uses_one_loop_and_keeps_context():
+    request_id = contextvars.ContextVar("request_id", default=None)
+
+    async def probe():
+        return asyncio.get_running_loop(), request_id.get()
+
+    def worker(value, out):
+        request_id.set(value)
+        out.append(run_sync(probe()))
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(i, results)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {loop for loop, _ in results} == {get_loop()}
+    assert sorted(value for _, value in results) == [0, 1, 2, 3]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
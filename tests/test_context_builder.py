@@ -0,0 +1,67 @@
+"""
+Context Builder Tests: Verifies token-budgeted packing, page merging and dedup (offline).
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.preprocessing import chunk_data
+from src.rag.context_builder import build_context, count_tokens
+
+NAV = "Latest stories from Muse See all stories (opens in a new window) Read More"
+
+
+def make_result(chunk_id, url, content, chunk_index=None, title="Clio Sports Winners"):
+    return {'id': chunk_id, 'score': 0.5, 'title': title, 'url': url, 'content': content,
+            'excerpt': content[:300] + "...", 'year': 2025, 'category': 'Clio Sports',
+            'page_type': 'winners', 'chunk_index': chunk_index}
+
+
+def page_chunks(url, words=300, chunk_size=120, overlap=20):
+    pieces = chunk_data.split_text(" ".join(f"{url[-1]}w{i}" for i in range(words)), chunk_size, overlap)
+    return [make_result(f"{url}_{i}", url, piece["content"], chunk_index=i) for i, piece in enumerate(pieces)]
+
+
+def test_chunks_of_one_page_merge_in_order_without_overlap():
+    chunks = page_chunks("https://clios.com/a")
+    assert len(chunks) >= 3
+    context = build_context(chunks[1:] + chunks[:1], max_tokens=10000)
+
+    assert context["passage_count"] == 1
+    assert context["context_text"].count("[Result ") == 1
+    content = context["context_text"].split("Content: ", 1)[1].split()
+    assert content == [f"aw{i}" for i in range(300)]
+
+
+def test_repeated_boilerplate_and_duplicates_are_dropped():
+    first = make_result("x", "https://clios.com/x", f"{NAV} Nike won Grand Clio Sports with Winning Isn't for Everyone.")
+    second = make_result("y", "https://clios.com/y", f"{NAV} Adidas took Gold for the You Got This campaign film.")
+    duplicate = make_result("z", "https://clios.com/z", first['content'], title="Mirror")
+
+    context = build_context([first, second, duplicate], max_tokens=10000)
+    text = context["context_text"]
+
+    assert text.count("See all stories") == 1
+    assert "Adidas took Gold" in text
+    assert "Mirror" not in text
+    assert context["passage_count"] == 2
+
+
+def test_context_stays_within_budget():
+    results = page_chunks("https://clios.com/a") + page_chunks("https://clios.com/b") + page_chunks("https://clios.com/c")
+
+    context = build_context(results, max_tokens=400)
+
+    assert context["token_count"] <= 400
+    assert context["token_count"] == count_tokens(context["context_text"])
+    assert context["truncated"] is True
+    assert context["context_text"].rstrip().endswith("...")
+    assert build_context(results, max_tokens=10000)["truncated"] is False
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
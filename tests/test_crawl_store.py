@@ -0,0 +1,104 @@
+"""
+Crawl Store Tests: Verifies random access, streaming, concurrent appends and crash recovery (offline).
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scraping import crawl_store
+from src.scraping.crawl_store import CrawlStore, STORE_NAME, import_legacy
+from src.preprocessing.clean_raw import process_files
+
+BODY = "The Clio Awards honor bold creative work in advertising and design. " * 3
+
+
+def test_random_access_and_latest_record_wins(tmp_path):
+    store = CrawlStore(str(tmp_path / STORE_NAME))
+    store.append("https://clios.com/a", "<p>old</p>", etag='"v1"')
+    store.append("https://clios.com/b", "<p>b</p>")
+    store.append("https://clios.com/a", "<p>new</p>", etag='"v2"')
+
+    assert len(store) == 2
+    assert store.get("https://clios.com/a")["html"] == "<p>new</p>"
+    assert store.entry("https://clios.com/a")["etag"] == '"v2"'
+    assert store.get("https://clios.com/missing") is None
+    assert [r["url"] for r in store.iter_records()] == ["https://clios.com/b", "https://clios.com/a"]
+
+    # The data file is a plain concatenated gzip stream
+    with gzip.open(store.path, 'rb') as f:
+        assert f.read().count(b'"url"') == 3
+
+    reopened = CrawlStore(store.path)
+    assert reopened.get("https://clios.com/b")["html"] == "<p>b</p>"
+
+
+@pytest.mark.parametrize("file_lock", [True, False])
+def test_concurrent_appends(tmp_path, monkeypatch, file_lock):
+    if not file_lock:
+        # Windows has no fcntl: the thread lock alone serializes appends
+        monkeypatch.setattr(crawl_store, "fcntl", None)
+    store = CrawlStore(str(tmp_path / STORE_NAME))
+
+    def writer(n):
+        for i in range(25):
+            store.append(f"https://clios.com/{n}/{i}", f"<p>{n}-{i}</p>" * 20)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    reopened = CrawlStore(store.path)
+    assert len(reopened) == 100
+    assert all(r["html"].startswith("<p>") for r in reopened.iter_records())
+
+
+def test_recovers_unindexed_and_partial_records(tmp_path):
+    path = str(tmp_path / STORE_NAME)
+    store = CrawlStore(path)
+    store.append("https://clios.com/a", "<p>a</p>")
+    store.append("https://clios.com/b", "<p>b</p>")
+
+    # Simulate a crash: last index line lost, then a half-written record
+    with open(store.index_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(store.index_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:1])
+    size = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(gzip.compress(b'{"url": "https://clios.com/c"}\n<p>c</p>')[:10])
+
+    recovered = CrawlStore(path)
+    assert sorted(recovered.index) == ["https://clios.com/a", "https://clios.com/b"]
+    assert os.path.getsize(path) == size
+    assert recovered.append("https://clios.com/c", "<p>c</p>")["offset"] == size
+
+
+def test_cleaner_reads_from_store(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "page_0.html").write_text(f"<html><title>Home</title><body>{BODY}</body></html>")
+    (raw / "meta_0.json").write_text(json.dumps({"url": "https://clios.com"}))
+    (raw / "clios_raw.json").write_text(json.dumps([{"url": "https://clios.com/jury", "content": BODY}]))
+
+    assert import_legacy(str(raw)) == 2
+    output = str(tmp_path / "cleaned" / "clean.jsonl")
+    process_files(str(raw), output)
+
+    with open(output, 'r', encoding='utf-8') as f:
+        urls = [json.loads(line)["url"] for line in f]
+    assert urls == ["https://clios.com", "https://clios.com/jury"]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,144 @@
+"""
+Embedder Tests: Verifies the local embedding backend and the embedder recorded with every index (offline).
+"""
+
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.vector_db import embedders, pinecone_utils
+from src.vector_db import generate_embeddings as job
+from src.vector_db.embedders import Embedder, EmbedderMismatch, GeminiEmbedder, LocalEmbedder, LEGACY_EMBEDDER
+from src.vector_db.embedding_cache import EmbeddingCache
+from src.vector_db.local_index import get_local_index
+
+
+class FakeSentenceModel:
+    """
+    sentence-transformers stand-in: three features per text, L2-normalized.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, convert_to_numpy=True,
+               show_progress_bar=False):
+        self.calls.append(list(texts))
+        vectors = np.array([[len(text), text.count("a") + 1, 1.0] for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def use_local_embedder(monkeypatch):
+    model = FakeSentenceModel()
+    embedder = LocalEmbedder(model, "fake-model", query_prefix="query: ")
+    monkeypatch.setattr(embedders, "_embedder", embedder)
+    monkeypatch.setattr(embedders, "EMBEDDING_BACKEND", "local")
+    monkeypatch.setattr(embedders, "LOCAL_EMBEDDING_MODEL", "fake-model")
+    # The local backend never touches the Gemini quota
+    monkeypatch.setattr(embedders, "get_embedding_limiter", lambda: pytest.fail("rate limiter used"))
+    return model
+
+
+def write_chunks(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "chunk_id": f"c{i}", "content": "a" * (i + 1), "url": "https://clios.com",
+                "title": "Clios", "year": 2025, "category": "Clio Awards", "page_type": "home"
+            }) + "\n")
+
+
+def test_local_embedder_serves_queries_without_the_api(tmp_path, monkeypatch):
+    model = use_local_embedder(monkeypatch)
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(pinecone_utils, "get_embedding_cache", lambda: cache)
+
+    first = pinecone_utils.embed_query("Who won?")
+    assert pinecone_utils.embed_query("who  won?") == pytest.approx(first)
+    assert asyncio.run(pinecone_utils.embed_query_async("Best film")) == pytest.approx(
+        model.encode(["query: Best film"])[0].tolist())
+
+    assert model.calls[:2] == [["query: Who won?"], ["query: Best film"]]
+    assert np.linalg.norm(first) == pytest.approx(1.0)
+    # Cached under the embedder's name, never shared with Gemini vectors
+    assert cache.get("Who won?", "local:fake-model", "RETRIEVAL_QUERY") is not None
+    assert cache.get("Who won?", LEGACY_EMBEDDER, "RETRIEVAL_QUERY") is None
+
+
+def test_job_records_embedder_and_refuses_to_mix(tmp_path, monkeypatch):
+    model = use_local_embedder(monkeypatch)
+    chunks, output = str(tmp_path / "chunks.jsonl"), str(tmp_path / "emb.jsonl")
+    write_chunks(chunks, 5)
+
+    stats = job.generate_embeddings(chunks, output, batch_size=2, workers=4)
+
+    assert stats["embedded"] == 5
+    assert [len(call) for call in model.calls] == [2, 2, 1]
+    with open(output, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert {record['metadata']['embedder'] for record in records} == {"local:fake-model"}
+    assert all(len(record['values']) == 3 for record in records)
+
+    # Resuming with Gemini would put two vector spaces in one file
+    write_chunks(chunks, 8)
+    monkeypatch.setattr(embedders, "_embedder", GeminiEmbedder(client=SimpleNamespace(models=None)))
+    with pytest.raises(EmbedderMismatch, match="local:fake-model"):
+        job.generate_embeddings(chunks, output)
+
+
+def test_incomplete_backend_fails_when_instantiated():
+    class QueryOnlyEmbedder(Embedder):
+        def embed_queries(self, texts):
+            return [[1.0] for _ in texts]
+
+    with pytest.raises(TypeError, match="embed_documents"):
+        QueryOnlyEmbedder()
+
+
+def test_indexes_reject_vectors_from_another_embedder(tmp_path, monkeypatch):
+    def write_records(path, embedder):
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(4):
+                metadata = {"text": f"chunk {i}", "title": "Clios"}
+                if embedder:
+                    metadata["embedder"] = embedder
+                f.write(json.dumps({"id": f"c{i}", "values": [1.0, float(i), 0.5], "metadata": metadata}) + "\n")
+
+    local_file, legacy_file = str(tmp_path / "local.jsonl"), str(tmp_path / "legacy.jsonl")
+    write_records(local_file, "local:fake-model")
+    write_records(legacy_file, None)
+
+    with pytest.raises(EmbedderMismatch):
+        get_local_index(local_file, embedder=LEGACY_EMBEDDER)
+    assert len(get_local_index(local_file, embedder="local:fake-model")) == 4
+    # Files from before embedders were recorded count as Gemini text-embedding-004
+    with pytest.raises(EmbedderMismatch):
+        get_local_index(legacy_file, embedder="local:fake-model")
+    assert len(get_local_index(legacy_file, embedder=LEGACY_EMBEDDER)) == 4
+
+    match = SimpleNamespace(id="c0", score=0.9, metadata={"text": "chunk 0", "embedder": "local:fake-model"})
+    fake_index = SimpleNamespace(query=lambda **kwargs: SimpleNamespace(matches=[match]))
+    monkeypatch.setattr(pinecone_utils, "VECTOR_BACKEND", "pinecone")
+    monkeypatch.setattr(pinecone_utils, "get_pinecone_index", lambda: fake_index)
+    with pytest.raises(EmbedderMismatch, match="Pinecone index"):
+        pinecone_utils.search_by_vector([1.0, 0.0, 0.0])
+    monkeypatch.setattr(embedders, "EMBEDDING_BACKEND", "local")
+    monkeypatch.setattr(embedders, "LOCAL_EMBEDDING_MODEL", "fake-model")
+    assert [m['id'] for m in pinecone_utils.search_by_vector([1.0, 0.0, 0.0])] == ["c0"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
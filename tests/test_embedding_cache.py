@@ -0,0 +1,65 @@
+"""
+Embedding Cache Tests: Verifies the two-tier query embedding cache.
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_db.embedding_cache import EmbeddingCache
+
+MODEL = "models/text-embedding-004"
+
+
+def test_normalized_queries_share_an_entry(tmp_path):
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.sqlite3"))
+    cache.put("Who won Clio Sports 2025?", MODEL, "RETRIEVAL_QUERY", [0.5, 0.25])
+
+    assert cache.get("  who won   clio sports 2025? ", MODEL, "RETRIEVAL_QUERY") == [0.5, 0.25]
+    assert cache.get("Who won Clio Sports 2025?", MODEL, "RETRIEVAL_DOCUMENT") is None
+    assert cache.get("Who won Clio Sports 2025?", "models/other", "RETRIEVAL_QUERY") is None
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(db_path=db_path).put("jury members", MODEL, "RETRIEVAL_QUERY", [1.0, 2.0, 3.0])
+
+    restarted = EmbeddingCache(db_path=db_path)
+    assert restarted.get("jury members", MODEL, "RETRIEVAL_QUERY") == [1.0, 2.0, 3.0]
+    assert restarted.stats()["disk_hits"] == 1
+
+    # The disk hit is promoted into memory
+    restarted.get("jury members", MODEL, "RETRIEVAL_QUERY")
+    assert restarted.stats()["memory_hits"] == 1
+
+
+def test_size_based_eviction(tmp_path):
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.sqlite3"), memory_entries=2, disk_entries=3)
+    for i in range(5):
+        cache.put(f"query {i}", MODEL, "RETRIEVAL_QUERY", [float(i)])
+
+    stats = cache.stats()
+    assert stats["memory_size"] == 2
+    assert stats["disk_size"] == 3
+    assert cache.get("query 4", MODEL, "RETRIEVAL_QUERY") == [4.0]
+    assert cache.get("query 0", MODEL, "RETRIEVAL_QUERY") is None
+
+
+def test_memory_only_cache():
+    cache = EmbeddingCache(db_path=None, memory_entries=1)
+    cache.put("a", MODEL, "RETRIEVAL_QUERY", [1.0])
+    cache.put("b", MODEL, "RETRIEVAL_QUERY", [2.0])
+
+    assert cache.get("a", MODEL, "RETRIEVAL_QUERY") is None
+    assert cache.get("b", MODEL, "RETRIEVAL_QUERY") == [2.0]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
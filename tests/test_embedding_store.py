@@ -0,0 +1,99 @@
+"""
+Embedding Store Tests: Verifies the binary store, its converters and memory-mapped reads (offline).
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_db.embedding_store import (
+    EmbeddingStore, jsonl_to_store, store_to_jsonl, open_store, write_store
+)
+from src.vector_db.local_index import LocalVectorIndex
+
+
+def write_embeddings(path, count=40, dim=16, seed=1):
+    rng = np.random.default_rng(seed)
+    records = []
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            record = {
+                "id": f"chunk_{i}",
+                "values": rng.normal(size=dim).astype(np.float32).tolist(),
+                "metadata": {"text": f"Chunk {i} – café", "year": 2025 if i % 2 else None,
+                             "category": "Clio Sports" if i % 4 == 0 else "Clio Music"}
+            }
+            records.append(record)
+            f.write(json.dumps(record) + "\n")
+    return records
+
+
+def test_round_trip_through_jsonl(tmp_path):
+    source, restored = str(tmp_path / "emb.jsonl"), str(tmp_path / "restored.jsonl")
+    records = write_embeddings(source)
+
+    store = jsonl_to_store(source)
+    assert store.path == str(tmp_path / "emb.embstore")
+    assert store_to_jsonl(store.path, restored) == 40
+
+    with open(restored, 'r', encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == records
+
+
+def test_reads_are_memory_mapped_views(tmp_path):
+    source = str(tmp_path / "emb.jsonl")
+    write_embeddings(source)
+    jsonl_to_store(source)
+
+    store = EmbeddingStore(str(tmp_path / "emb.embstore"))
+    assert isinstance(store.vectors, np.memmap)
+    record = next(store.iter_records())
+    assert np.shares_memory(record["values"], store.vectors)
+    assert store.ids.dtype.kind == "U"
+
+    # Few distinct values -> dictionary encoded; per-row text -> JSON offsets
+    assert store.columns["category"]["kind"] == "categorical"
+    assert store.columns["text"]["kind"] == "json"
+    assert store.metadata(3) == {"text": "Chunk 3 – café", "year": 2025, "category": "Clio Music"}
+
+
+def test_filters_on_encoded_columns(tmp_path):
+    source = str(tmp_path / "emb.jsonl")
+    records = write_embeddings(source)
+    store = open_store(source)
+
+    mask = store.filter_mask({"year": 2025, "category": "Clio Music"})
+    expected = [r["metadata"]["year"] == 2025 and r["metadata"]["category"] == "Clio Music" for r in records]
+    assert mask.tolist() == expected
+    assert not store.filter_mask({"category": "Clio Health"}).any()
+    assert not store.filter_mask({"missing": 1}).any()
+
+
+def test_float16_store_keeps_ranking(tmp_path):
+    source = str(tmp_path / "emb.jsonl")
+    records = write_embeddings(source)
+
+    index = LocalVectorIndex.load(source, dtype="float16")
+    assert index.vectors.dtype == np.float16
+    hits = index.query(records[9]["values"], top_k=3)
+    assert hits[0][0] == "chunk_9"
+    assert abs(hits[0][1] - 1.0) < 1e-2
+
+    # Asking for the other precision rebuilds the store
+    assert LocalVectorIndex.load(source).vectors.dtype == np.float32
+
+
+def test_empty_store(tmp_path):
+    store = write_store(str(tmp_path / "empty.embstore"), [], np.zeros((0, 4)), [])
+    assert len(store) == 0
+    assert list(store.iter_records()) == []
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -4,6 +4,12 @@ Verify Embeddings: Checks if embeddings were generated correctly.
 
 import json
 import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_db.embedding_store import open_store
 
 def verify_embeddings(file_path="data/embeddings/clios_embeddings.jsonl"):
     print(f"Checking embeddings in {file_path}...")
@@ -12,27 +18,27 @@ def verify_embeddings(file_path="data/embeddings/clios_embeddings.jsonl"):
         print(f"File not found: {file_path}")
         return
         
-    vectors = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            vectors.append(json.loads(line))
+    # Reads the memory-mapped binary store (converted from the JSONL on first use)
+    store = open_store(file_path)
             
-    if not vectors:
+    if not len(store):
         print("No vectors found.")
         return
         
-    print(f"Total vectors: {len(vectors)}")
-    print(f"First vector ID: {vectors[0]['id']}")
-    print(f"Embedding dimensions: {len(vectors[0]['values'])}")
-    print(f"Metadata keys: {list(vectors[0]['metadata'].keys())}")
+    first = next(store.iter_records())
+    print(f"Total vectors: {len(store)}")
+    print(f"First vector ID: {first['id']}")
+    print(f"Embedding dimensions: {store.dim}")
+    print(f"Metadata keys: {list(first['metadata'].keys())}")
     
-    print(f"\nSample vector record:")
-    print(json.dumps(vectors[0], indent=2)[:500] + "...")
+    first['values'] = first['values'][:8].tolist()
+    print(f"\nSample vector record (first 8 values):")
+    print(json.dumps(first, indent=2)[:500] + "...")
     
-    if len(vectors[0]['values']) == 768:
-        print(f"\nAll {len(vectors)} vectors ready for Pinecone upload!")
+    if store.dim == 768:
+        print(f"\nAll {len(store)} vectors ready for Pinecone upload!")
     else:
-        print(f"\nWarning: Dimension mismatch. Expected 768, got {len(vectors[0]['values'])}")
+        print(f"\nWarning: Dimension mismatch. Expected 768, got {store.dim}")
 
 if __name__ == "__main__":
     verify_embeddings()
@@ -0,0 +1,87 @@
+"""
+Embedding Job Tests: Verifies batching and resume behaviour of generate_embeddings (offline).
+"""
+
+import json
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.vector_db import embedders
+from src.vector_db import generate_embeddings as job
+from src.vector_db.embedders import GeminiEmbedder
+from src.vector_db.rate_limiter import RateLimiter
+
+
+class FakeModels:
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def embed_content(self, model, contents, config):
+        with self._lock:
+            self.requests.append(list(contents))
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=[float(len(text)), 1.0]) for text in contents])
+
+
+def write_chunks(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "chunk_id": f"c{i}", "content": "x" * (i + 1), "url": "https://clios.com",
+                "title": "Clios", "year": 2025, "category": "Clio Awards", "page_type": "home"
+            }) + "\n")
+
+
+def setup_fakes(monkeypatch):
+    models = FakeModels()
+    embedder = GeminiEmbedder(client=SimpleNamespace(models=models), limiter=RateLimiter(rpm=1e6, burst=100))
+    monkeypatch.setattr(embedders, "_embedder", embedder)
+    return models
+
+
+def read_ids(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)['id'] for line in f]
+
+
+def test_batches_many_contents_per_request(tmp_path, monkeypatch):
+    models = setup_fakes(monkeypatch)
+    chunks, output = str(tmp_path / "chunks.jsonl"), str(tmp_path / "out" / "emb.jsonl")
+    write_chunks(chunks, 25)
+
+    stats = job.generate_embeddings(chunks, output, batch_size=10, workers=3)
+
+    assert stats["embedded"] == 25
+    assert sorted(len(r) for r in models.requests) == [5, 10, 10]
+    assert sorted(read_ids(output)) == sorted(f"c{i}" for i in range(25))
+
+
+def test_resume_skips_completed_and_repairs_partial_line(tmp_path, monkeypatch):
+    models = setup_fakes(monkeypatch)
+    chunks, output = str(tmp_path / "chunks.jsonl"), str(tmp_path / "emb.jsonl")
+    write_chunks(chunks, 6)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"id": "c0", "values": [1.0], "metadata": {}}) + "\n")
+        f.write(json.dumps({"id": "c1", "values": [1.0], "metadata": {}}) + "\n")
+        f.write('{"id": "c2", "values": [0.')  # crash mid-write
+
+    stats = job.generate_embeddings(chunks, output, batch_size=2, workers=2)
+
+    assert stats["skipped"] == 2
+    assert stats["embedded"] == 4
+    requested = [text for request in models.requests for text in request]
+    assert len(requested) == 4
+    assert sorted(read_ids(output)) == [f"c{i}" for i in range(6)]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
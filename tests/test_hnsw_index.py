@@ -0,0 +1,121 @@
+"""
+HNSW Index Tests: Verifies graph recall, filtered search, incremental sync and persistence (offline).
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_db.embedding_store import write_store
+from src.vector_db.hnsw_index import HNSWGraph, HNSWVectorIndex
+from src.vector_db.local_index import LocalVectorIndex, get_local_index
+
+
+def make_vectors(count=800, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(16, dim))
+    return (centers[rng.integers(16, size=count)] + 0.4 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def make_store(path, vectors, prefix="c"):
+    metadata = [{"year": 2015 + i % 10, "category": "Clio Sports" if i % 4 == 0 else "Clio Music",
+                 "page_type": "winner" if i % 50 == 0 else "entry"} for i in range(len(vectors))]
+    return write_store(path, [f"{prefix}{i}" for i in range(len(vectors))], vectors, metadata)
+
+
+def recall_at_k(index, exact, queries, k=10, filters=None):
+    hits = [len({h[0] for h in index.query(q, k, filters)} & {h[0] for h in exact.query(q, k, filters)}) / k
+            for q in queries]
+    return float(np.mean(hits))
+
+
+def test_recall_against_exact(tmp_path):
+    vectors = make_vectors()
+    store = make_store(str(tmp_path / "emb.embstore"), vectors)
+    index = HNSWVectorIndex.load(store, M=8, ef_construction=64, ef_search=64)
+    exact = LocalVectorIndex(store)
+
+    assert recall_at_k(index, exact, vectors[:30] + 0.05) >= 0.95
+    top = index.query(vectors[7], top_k=1)[0]
+    assert top[0] == "c7" and abs(top[1] - 1.0) < 1e-5
+    assert top[2]["year"] == 2022
+
+
+def test_filtered_search_keeps_recall(tmp_path):
+    vectors = make_vectors()
+    store = make_store(str(tmp_path / "emb.embstore"), vectors)
+    index = HNSWVectorIndex.load(store, M=8, ef_construction=64, ef_search=32, path=str(tmp_path / "g.hnsw"))
+    index.brute_force_limit = 0  # Force the graph walk for the broad filter
+    exact = LocalVectorIndex(store)
+    queries = vectors[:20] + 0.05
+
+    broad = {"category": "Clio Music"}
+    assert recall_at_k(index, exact, queries, k=5, filters=broad) >= 0.9
+    hits = index.query(queries[0], top_k=5, filters=broad)
+    assert len(hits) == 5 and all(meta["category"] == "Clio Music" for _, _, meta in hits)
+
+    # 16 matching rows out of 800: answered exactly instead of by a starved graph walk
+    index.min_filter_fraction = 0.05
+    selective = {"page_type": "winner", "year": 2015}
+    assert recall_at_k(index, exact, queries, k=5, filters=selective) == 1.0
+    assert index.query(queries[0], filters={"year": 1990}) == []
+
+
+def test_incremental_inserts_and_deletes(tmp_path):
+    vectors = make_vectors(count=400)
+    path = str(tmp_path / "emb.embstore")
+    HNSWVectorIndex.load(make_store(path, vectors[:300]), M=8, ef_construction=64)
+
+    # Rows 0-49 removed, rows 300-399 added by a later ingestion run
+    ids = [f"c{i}" for i in range(50, 400)]
+    store = write_store(path, ids, vectors[50:], [{"year": 2024}] * len(ids))
+    index = HNSWVectorIndex.load(store, M=8, ef_construction=64)
+
+    assert len(index.graph) == 400 and index.graph.deleted_count == 50
+    assert index.query(vectors[350], top_k=1)[0][0] == "c350"
+    assert all(hit[0] not in {f"c{i}" for i in range(50)} for hit in index.query(vectors[10], top_k=20))
+    assert index.query(vectors[10], top_k=1)[0][2] == {"year": 2024}
+
+
+def test_reembedded_store_rebuilds_the_graph(tmp_path):
+    path = str(tmp_path / "emb.embstore")
+    ids = [f"c{i}" for i in range(300)]
+    old, new = make_vectors(count=300, seed=0), make_vectors(count=300, seed=1)
+    HNSWVectorIndex.load(write_store(path, ids, old, [{"embedder": "local:a"}] * 300), M=8, ef_construction=64)
+
+    # Same IDs and dimension, new vectors from the same embedder name
+    index = HNSWVectorIndex.load(write_store(path, ids, new, [{"embedder": "local:a"}] * 300),
+                                 M=8, ef_construction=64)
+    assert np.allclose(index.graph.vectors[index.graph.id_to_node["c5"]], new[5] / np.linalg.norm(new[5]))
+    assert index.query(new[5], top_k=1)[0][0] == "c5"
+
+    # Same vectors recorded under another embedder
+    index = HNSWVectorIndex.load(write_store(path, ids, new, [{"embedder": "local:b"}] * 300),
+                                 M=8, ef_construction=64)
+    assert HNSWGraph.load(str(tmp_path / "emb.hnsw")).embedder == "local:b"
+    assert index.graph.deleted_count == 0 and len(index.graph) == 300
+
+
+def test_graph_persists_and_loads_memory_mapped(tmp_path):
+    vectors = make_vectors(count=300)
+    store = make_store(str(tmp_path / "emb.embstore"), vectors)
+    built = get_local_index(store.path, mode="hnsw", hnsw_m=8, hnsw_ef_construction=64)
+    assert os.path.exists(str(tmp_path / "emb.hnsw" / "links0.npy"))
+
+    graph = HNSWGraph.load(str(tmp_path / "emb.hnsw"))
+    assert isinstance(graph.links0, np.memmap)
+    loaded = HNSWVectorIndex(store, graph, ef_search=built.ef_search)
+    assert loaded.query(vectors[3], top_k=5) == built.query(vectors[3], top_k=5)
+
+    # Mutating a loaded graph copies the mapped arrays instead of writing through them
+    graph.insert("extra", vectors[0] + 1.0)
+    assert not isinstance(graph.links0, np.memmap) and len(graph) == 301
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,87 @@
+"""
+Lazy Import Tests: Verifies src.rag imports fast without credentials and builds clients on demand (offline).
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_python(code, **env_overrides):
+    # Empty values win over a developer's .env (load_dotenv never overrides the environment)
+    env = dict(os.environ, GOOGLE_API_KEY="", PINECONE_API_KEY="")
+    env.update(env_overrides)
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_needs_no_keys_and_loads_no_sdks():
+    loaded = run_python(
+        "import json, sys\n"
+        "import src.rag.rag_pipeline\n"
+        "print(json.dumps([m for m in ('google.genai', 'google.generativeai', 'pinecone') if m in sys.modules]))"
+    )
+    assert loaded == []
+
+
+def test_missing_keys_raise_when_a_client_is_built():
+    outcome = run_python(
+        "import json\n"
+        "from src.rag import clients\n"
+        "try:\n"
+        "    clients.get_gemini_client()\n"
+        "    print(json.dumps('built'))\n"
+        "except ValueError as e:\n"
+        "    print(json.dumps(str(e)))",
+        VECTOR_BACKEND="local"
+    )
+    assert "GOOGLE_API_KEY" in outcome
+
+
+def test_warmup_builds_clients(monkeypatch):
+    from src.rag import rag_pipeline
+
+    monkeypatch.setattr(rag_pipeline, "validate_config", lambda: None)
+    monkeypatch.setattr(rag_pipeline, "warmup_search", lambda: {"gemini_client": 0.1})
+    monkeypatch.setattr(rag_pipeline, "get_encoding", lambda: None)
+    monkeypatch.setattr(rag_pipeline, "get_reranker", lambda: None)
+    monkeypatch.setattr(rag_pipeline, "HYBRID_SEARCH_ENABLED", False)
+
+    assert set(rag_pipeline.warmup()) == {"gemini_client", "reranker", "tokenizer"}
+
+
+def test_warmup_survives_a_reranker_that_fails_to_load(monkeypatch):
+    from src.rag import rag_pipeline
+
+    def broken():
+        raise OSError("model download failed")
+
+    monkeypatch.setattr(rag_pipeline, "validate_config", lambda: None)
+    monkeypatch.setattr(rag_pipeline, "warmup_search", lambda: {})
+    monkeypatch.setattr(rag_pipeline, "get_encoding", lambda: None)
+    monkeypatch.setattr(rag_pipeline, "get_reranker", broken)
+    monkeypatch.setattr(rag_pipeline, "HYBRID_SEARCH_ENABLED", False)
+
+    assert set(rag_pipeline.warmup()) == {"reranker", "tokenizer"}
+
+
+def test_warmup_reports_invalid_config(monkeypatch):
+    from src.rag import config, rag_pipeline
+
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "faiss")
+    with pytest.raises(ValueError, match="Unknown VECTOR_BACKEND"):
+        rag_pipeline.warmup()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,92 @@
+"""
+Lexical Index Tests: Verifies BM25 search, persistence and hybrid fusion (offline).
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.vector_db.lexical_index import LexicalIndex, tokenize
+from src.rag import retriever
+
+CHUNKS = [
+    ("c0", "Grand Clio Awards AB InBev Michelob ULTRA Lap of Legends FCB New York", 2025, "Clio Awards", "winners"),
+    ("c1", "Clio Sports jury members announced for the 2025 season", 2025, "Clio Sports", "jury"),
+    ("c2", "Spotify Spreadbeats by FCB New York wins Grand Clio for Direct Marketing", 2025, "Clio Awards", "winners"),
+    ("c3", "Clio Health winners include DASA Diagnostics Blood Aid from DM9 Brazil", 2024, "Clio Health", "winners"),
+]
+
+
+def write_chunks(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk_id, content, year, category, page_type in CHUNKS:
+            f.write(json.dumps({
+                "chunk_id": chunk_id, "url": f"https://clios.com/{chunk_id}", "title": "", "content": content,
+                "year": year, "category": category, "page_type": page_type
+            }) + "\n")
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("Who won the Clio Sports 2025?") == ["won", "clio", "sports", "2025"]
+
+
+def test_exact_name_lookup(tmp_path):
+    path = str(tmp_path / "chunks.jsonl")
+    write_chunks(path)
+    index = LexicalIndex.load(path)
+
+    hits = index.search("Michelob ULTRA Lap of Legends", top_k=2)
+    assert hits[0][0] == "c0"
+
+    hits = index.search("DASA Diagnostics", top_k=3)
+    assert [h[0] for h in hits] == ["c3"]
+    assert index.search("nonexistentterm") == []
+
+
+def test_filters_and_persistence(tmp_path):
+    path = str(tmp_path / "chunks.jsonl")
+    write_chunks(path)
+    LexicalIndex.load(path)
+    assert os.path.exists(str(tmp_path / "chunks.bm25.npz"))
+
+    reloaded = LexicalIndex.load(path)
+    hits = reloaded.search("FCB New York Grand Clio", top_k=5, filters={"page_type": "winners", "year": 2025})
+    assert {h[0] for h in hits} == {"c0", "c2"}
+    assert reloaded.search("FCB", filters={"year": 2024}) == []
+
+
+def test_rrf_rewards_agreement():
+    dense = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.8}, {"id": "c", "score": 0.7}]
+    lexical = [{"id": "c", "score": 12.0}, {"id": "d", "score": 8.0}]
+
+    fused = retriever.reciprocal_rank_fusion([dense, lexical], top_k=3)
+    assert [m["id"] for m in fused] == ["c", "a", "b"]  # ties keep dense order
+    assert fused[0]["score"] == 0.7  # dense fields kept
+
+
+def test_lexical_fallback_when_embedding_fails(tmp_path, monkeypatch):
+    path = str(tmp_path / "chunks.jsonl")
+    write_chunks(path)
+
+    async def failing_embed(text):
+        raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+    monkeypatch.setattr(retriever, "embed_query_async", failing_embed)
+    monkeypatch.setattr(retriever, "LEXICAL_CHUNKS_FILE", path)
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", True)
+
+    results = asyncio.run(retriever.retrieve_async("Spotify Spreadbeats", filters={"year": 2025}))
+    assert results[0]["id"] == "c2"
+    assert results[0]["content"].startswith("Spotify")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,97 @@
+"""
+Crawler Tests: Verifies dedup, conditional recrawls and host throttling against a local HTTP server (offline).
+"""
+
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scraping.local_crawler import ClioCrawler, HostThrottle
+
+PAGES = {
+    "index.html": '<a href="a.html">A</a> <a href="b.html">B</a> <a href="a.html#top">A again</a>',
+    "a.html": '<a href="b.html">B</a> <a href="index.html">Home</a>',
+    "b.html": '<a href="a.html">A</a> <a href="https://elsewhere.com/">Out</a>',
+}
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    for name, body in PAGES.items():
+        (root / name).write_text(f"<html><body>{body}</body></html>")
+
+    requests_seen = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send_response(self, code, message=None):
+            requests_seen.append((self.path, code))
+            super().send_response(code, message)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", requests_seen
+    server.shutdown()
+
+
+def test_each_url_fetched_once(site, tmp_path):
+    base, requests_seen = site
+    crawler = ClioCrawler(base_url=base, output_dir=str(tmp_path / "raw"), workers=3, delay=0)
+
+    stats = crawler.crawl(f"{base}/index.html")
+
+    assert stats["pages"] == 3
+    assert sorted(path for path, _ in requests_seen) == ["/a.html", "/b.html", "/index.html"]
+    assert stats["bytes"] > 0
+    assert len(crawler.store) == 3
+
+
+def test_recrawl_uses_conditional_requests(site, tmp_path):
+    base, requests_seen = site
+    output_dir = str(tmp_path / "raw")
+    ClioCrawler(base_url=base, output_dir=output_dir, delay=0).crawl(f"{base}/index.html")
+    requests_seen.clear()
+
+    crawler = ClioCrawler(base_url=base, output_dir=output_dir, delay=0)
+    size = os.path.getsize(crawler.store.path)
+    stats = crawler.crawl(f"{base}/index.html")
+
+    # Links are still followed from the stored copies of unchanged pages
+    assert stats["not_modified"] == 3
+    assert {code for _, code in requests_seen} == {304}
+    assert os.path.getsize(crawler.store.path) == size
+
+
+def test_host_throttle_spaces_requests():
+    throttle = HostThrottle(max_concurrency=1, delay=0.05)
+    starts = []
+
+    def hit():
+        with throttle.slot("https://clios.com/x"):
+            starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=hit) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    starts.sort()
+    assert all(b - a >= 0.045 for a, b in zip(starts, starts[1:]))
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
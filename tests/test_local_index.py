@@ -0,0 +1,122 @@
+"""
+Local Index Tests: Verifies the in-process NumPy vector backend (no API keys needed).
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Run the pipeline against the local backend, fully offline
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.vector_db.local_index import LocalVectorIndex
+
+
+def write_embeddings(path, count=20, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, vec in enumerate(vectors):
+            record = {
+                "id": f"chunk_{i}",
+                "values": vec.tolist(),
+                "metadata": {
+                    "text": f"Chunk number {i}",
+                    "url": f"https://clios.com/page/{i}",
+                    "title": f"Page {i}",
+                    "year": 2025 if i % 2 == 0 else 2024,
+                    "category": "Clio Sports" if i % 3 == 0 else "Clio Music",
+                    "page_type": "winners"
+                }
+            }
+            f.write(json.dumps(record) + "\n")
+    return vectors
+
+
+def test_query_returns_nearest_neighbour(tmp_path):
+    path = str(tmp_path / "emb.jsonl")
+    vectors = write_embeddings(path)
+
+    index = LocalVectorIndex.load(path)
+    hits = index.query(vectors[7].tolist(), top_k=3)
+
+    assert len(hits) == 3
+    assert hits[0][0] == "chunk_7"
+    assert abs(hits[0][1] - 1.0) < 1e-5
+    assert hits[0][1] >= hits[1][1] >= hits[2][1]
+
+
+def test_filters_restrict_results(tmp_path):
+    path = str(tmp_path / "emb.jsonl")
+    vectors = write_embeddings(path)
+
+    index = LocalVectorIndex.load(path)
+    hits = index.query(vectors[7].tolist(), top_k=5, filters={"year": 2025, "category": "Clio Sports"})
+
+    assert hits
+    for _, _, meta in hits:
+        assert meta["year"] == 2025 and meta["category"] == "Clio Sports"
+    assert index.query(vectors[0].tolist(), filters={"year": 1999}) == []
+
+
+def test_cache_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "emb.jsonl")
+    write_embeddings(path)
+
+    LocalVectorIndex.load(path)
+    assert os.path.exists(str(tmp_path / "emb.embstore" / "vectors.npy"))
+
+    reloaded = LocalVectorIndex.load(path)
+    assert isinstance(reloaded.vectors, np.memmap)
+    assert reloaded.vectors.dtype == np.float32
+    assert len(reloaded) == 20
+
+
+def test_search_vectors_local_backend(tmp_path, monkeypatch):
+    path = str(tmp_path / "emb.jsonl")
+    vectors = write_embeddings(path)
+
+    import src.rag  # noqa: F401  (pinecone_utils is imported through the rag package)
+    from src.vector_db import pinecone_utils
+    monkeypatch.setattr(pinecone_utils, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(pinecone_utils, "LOCAL_EMBEDDINGS_FILE", path)
+    monkeypatch.setattr(pinecone_utils, "embed_query", lambda text: vectors[4].tolist())
+
+    matches = pinecone_utils.search_vectors("Who won?", top_k=2, filters={"year": 2025, "category": None})
+
+    assert matches[0]['id'] == "chunk_4"
+    assert matches[0]['content'] == "Chunk number 4"
+    assert matches[0]['year'] == 2025
+    assert set(matches[0].keys()) == {
+        'id', 'score', 'title', 'url', 'content', 'excerpt', 'year', 'category', 'page_type', 'chunk_index'
+    }
+
+
+def test_rewritten_embeddings_are_reloaded(tmp_path, monkeypatch):
+    path = str(tmp_path / "emb.jsonl")
+    write_embeddings(path, count=20)
+
+    import src.rag  # noqa: F401
+    from src.vector_db import pinecone_utils
+    monkeypatch.setattr(pinecone_utils, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(pinecone_utils, "LOCAL_EMBEDDINGS_FILE", path)
+    assert len(pinecone_utils.search_by_vector([1.0] * 8, top_k=50)) == 20
+    version = pinecone_utils.get_index_version()
+
+    # A re-ingest rewrites the file under a running process
+    vectors = write_embeddings(path, count=30, seed=1)
+
+    assert pinecone_utils.get_index_version() != version
+    assert len(pinecone_utils.search_by_vector([1.0] * 8, top_k=50)) == 30
+    assert pinecone_utils.search_by_vector(vectors[25].tolist(), top_k=1)[0]['id'] == "chunk_25"
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,129 @@
+"""
+Manifest Tests: Verifies incremental clean/chunk/embed runs against the content-hash manifest (offline).
+"""
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.preprocessing.manifest import Manifest
+from src.preprocessing import chunk_data
+from src.vector_db import embedders
+from src.vector_db import generate_embeddings as job
+from src.vector_db.embedders import GeminiEmbedder
+from src.vector_db.rate_limiter import RateLimiter
+
+BODY = "The Clio Awards celebrate bold creative work in advertising, design and communication. " * 3
+
+
+def write_records(path, pages):
+    with open(path, 'w', encoding='utf-8') as f:
+        for url, content in pages.items():
+            f.write(json.dumps({"url": url, "content": content, "title": url, "page_type": "page"}) + "\n")
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_diff_classifies_items(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.replace("clean", {"a": "1", "b": "2", "c": "3"})
+
+    delta = manifest.diff("clean", {"a": "1", "b": "changed", "d": "4"})
+    assert delta.summary() == {"new": 1, "changed": 1, "unchanged": 1, "removed": 1}
+    assert sorted(delta.todo) == ["b", "d"]
+    assert delta.removed == ["c"]
+    assert manifest.diff("chunk", {"a": "1"}).new == ["a"]  # stages are independent
+
+
+def test_chunk_file_only_rechunks_changed_pages(tmp_path, monkeypatch):
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    cleaned, chunks = str(tmp_path / "clean.jsonl"), str(tmp_path / "chunks" / "chunks.jsonl")
+    write_records(cleaned, {"u1": BODY, "u2": BODY + " Jury.", "u3": BODY + " Winners."})
+    chunk_data.chunk_file(cleaned, chunks, chunk_size=64, overlap=8, manifest=manifest)
+    before = {c['chunk_id'] for c in read_jsonl(chunks)}
+
+    chunked = []
+    original = chunk_data.chunk_record
+    monkeypatch.setattr(chunk_data, "chunk_record", lambda r, *a: chunked.append(r['url']) or original(r, *a))
+
+    write_records(cleaned, {"u1": BODY, "u2": BODY + " New jury."})
+    assert chunk_data.chunk_file(cleaned, chunks, chunk_size=64, overlap=8, manifest=manifest, dry_run=True) == \
+        {"new": 0, "changed": 1, "unchanged": 1, "removed": 1}
+    stats = chunk_data.chunk_file(cleaned, chunks, chunk_size=64, overlap=8, manifest=manifest)
+
+    assert chunked == ["u2"]
+    assert stats["unchanged"] == 1
+    after = read_jsonl(chunks)
+    assert {c['url'] for c in after} == {"u1", "u2"}
+    assert {c['chunk_id'] for c in after if c['url'] == "u1"} <= before
+
+
+def test_chunk_reruns_keep_one_copy_of_url_less_records(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    cleaned, chunks = str(tmp_path / "clean.jsonl"), str(tmp_path / "chunks" / "chunks.jsonl")
+    with open(cleaned, 'w', encoding='utf-8') as f:
+        for i, topic in enumerate(["Jury", "Winners", "Entries"]):
+            content = " ".join(f"{topic.lower()}{n}" for n in range(60))
+            f.write(json.dumps({"url": "#", "content": content, "title": topic, "page_type": "page"}) + "\n")
+        f.write(json.dumps({"url": "u1", "content": BODY, "title": "u1", "page_type": "page"}) + "\n")
+
+    counts = []
+    for _ in range(3):
+        stats = chunk_data.chunk_file(cleaned, chunks, chunk_size=64, overlap=8, manifest=manifest)
+        ids = [c['chunk_id'] for c in read_jsonl(chunks)]
+        assert len(ids) == len(set(ids))
+        counts.append(len(ids))
+
+    assert counts[0] == counts[1] == counts[2]
+    # Url-less records share the "#" key, so they are re-chunked every run
+    assert stats["unchanged"] == 1
+    assert stats["documents"] == 3
+
+
+def test_embeddings_prune_removed_chunks(tmp_path, monkeypatch):
+    requests = []
+
+    def embed_content(model, contents, config):
+        requests.append(list(contents))
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=[1.0, 0.0]) for _ in contents])
+
+    monkeypatch.setattr(embedders, "_embedder", GeminiEmbedder(
+        client=SimpleNamespace(models=SimpleNamespace(embed_content=embed_content)),
+        limiter=RateLimiter(rpm=1e6, burst=100)))
+
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    chunks, output = str(tmp_path / "chunks.jsonl"), str(tmp_path / "emb.jsonl")
+
+    def write_chunks(contents):
+        with open(chunks, 'w', encoding='utf-8') as f:
+            for chunk_id, content in contents.items():
+                f.write(json.dumps({"chunk_id": chunk_id, "content": content, "url": "#", "title": "t",
+                                    "year": None, "category": None, "page_type": "page"}) + "\n")
+
+    write_chunks({"c1": "one", "c2": "two", "c3": "three"})
+    job.generate_embeddings(chunks, output, manifest=manifest)
+
+    write_chunks({"c1": "one", "c3": "three", "c4": "four"})
+    assert job.generate_embeddings(chunks, output, manifest=manifest, dry_run=True) == \
+        {"new": 1, "changed": 0, "unchanged": 2, "removed": 1}
+    requests.clear()
+    stats = job.generate_embeddings(chunks, output, manifest=manifest)
+
+    assert requests == [["four"]]
+    assert stats["pruned"] == 1
+    assert sorted(r['id'] for r in read_jsonl(output)) == ["c1", "c3", "c4"]
+    assert set(manifest.hashes("embed")) == {"c1", "c3", "c4"}
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,115 @@
+"""
+Metrics Tests: Verifies per-stage timings, counters and the Prometheus / JSON exports (offline).
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.request
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.rag import metrics, rag_pipeline, retriever, response_generator
+
+
+def make_match(match_id):
+    return {'id': match_id, 'score': 0.5, 'title': match_id, 'url': '#', 'content': match_id,
+            'excerpt': match_id, 'year': 2025, 'category': None, 'page_type': 'winners'}
+
+
+class FakeModels:
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(0.02)
+        usage = SimpleNamespace(prompt_token_count=120, candidates_token_count=8)
+        return SimpleNamespace(text="Answer.", usage_metadata=usage)
+
+
+def install_fakes(monkeypatch):
+    async def fake_embed(text):
+        metrics.inc("api_calls", "embedding")
+        await asyncio.sleep(0.01)
+        return [1.0, 0.0]
+
+    def fake_search(embedding, top_k=5, filters=None):
+        with metrics.span("vector_search"):
+            time.sleep(0.03)
+            return [make_match("a")]
+
+    monkeypatch.setattr(rag_pipeline, "embed_query_async", fake_embed)
+    monkeypatch.setattr(rag_pipeline, "answer_cache", None)
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", False)
+    monkeypatch.setattr(retriever, "get_reranker", lambda: None)
+    monkeypatch.setattr(retriever, "search_by_vector", fake_search)
+    monkeypatch.setattr(response_generator, "get_gemini_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=FakeModels())))
+
+
+def test_concurrent_spans_report_wall_time():
+    trace = metrics.QueryTrace()
+
+    def timed_search():
+        with metrics.span("search"):
+            time.sleep(0.05)
+
+    async def run():
+        with trace.active():
+            await asyncio.gather(asyncio.to_thread(timed_search), asyncio.to_thread(timed_search))
+
+    asyncio.run(run())
+    # Two overlapping 50 ms searches: one ~50 ms span, not 100 ms
+    assert 45 <= trace.timings()["search"] < 90
+
+
+def test_query_returns_breakdown_and_usage(monkeypatch):
+    install_fakes(monkeypatch)
+
+    response = rag_pipeline.query("Who won Clio Sports 2025?")
+
+    timings = response['timings']
+    assert list(timings)[:3] == ["filters", "embed", "retrieve"]
+    assert {"vector_search", "context", "generate"} <= set(timings)
+    assert timings["vector_search"] >= 25 and timings["generate"] >= 15
+    assert response['usage']["api_calls"] == {"embedding": 1, "llm": 1}
+    assert response['usage']["tokens"] == {"context": response['usage']["tokens"]["context"],
+                                           "llm_prompt": 120, "llm_output": 8}
+    assert response['usage']["tokens"]["context"] > 0
+
+
+def test_prometheus_text_and_json_log(monkeypatch, tmp_path):
+    install_fakes(monkeypatch)
+    log_file = str(tmp_path / "metrics.jsonl")
+    monkeypatch.setattr(rag_pipeline, "METRICS_LOG_FILE", log_file)
+
+    rag_pipeline.query("Who won Clio Sports 2025?")
+
+    text = metrics.registry.render_prometheus()
+    assert '# TYPE clio_rag_api_calls_total counter' in text
+    assert 'clio_rag_stage_seconds_bucket{stage="generate",le="+Inf"}' in text
+    assert 'clio_rag_query_seconds_count' in text
+
+    with open(log_file, 'r', encoding='utf-8') as f:
+        record = json.loads(f.readline())
+    assert record["filters"] == {"year": 2025, "category": "Clio Sports", "page_type": "winners"}
+    assert "generate" in record["timings"] and record["usage"]["api_calls"]["llm"] == 1
+
+
+def test_http_endpoint_serves_metrics():
+    metrics.inc("retries", "embedding")
+    server = metrics.start_http_server(0, host="127.0.0.1")
+    port = server.server_address[1]
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+        assert 'clio_rag_retries_total{api="embedding"}' in resp.read().decode('utf-8')
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json") as resp:
+        assert json.loads(resp.read())["counters"]["retries"]["embedding"] >= 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,81 @@
+"""
+Quantized Index Tests: Verifies int8 / PQ codes, persistence and exact rescoring (offline).
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_db.embedding_store import write_store
+from src.vector_db.local_index import LocalVectorIndex, get_local_index
+from src.vector_db.quantized_index import QuantizedVectorIndex, ScalarQuantizer
+
+
+def make_store(path, count=600, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(12, dim))
+    vectors = (centers[rng.integers(12, size=count)] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+    metadata = [{"year": 2020 + i % 5, "category": "Clio Sports" if i % 3 == 0 else "Clio Music"}
+                for i in range(count)]
+    return write_store(path, [f"c{i}" for i in range(count)], vectors, metadata), vectors
+
+
+def recall_at_k(index, exact, queries, k=10):
+    hits = [len({h[0] for h in index.query(q, k)} & {h[0] for h in exact.query(q, k)}) / k for q in queries]
+    return float(np.mean(hits))
+
+
+def test_scalar_quantizer_error_is_small():
+    vectors = np.random.default_rng(1).normal(size=(200, 16)).astype(np.float32)
+    quantizer = ScalarQuantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    query = vectors[0]
+
+    assert codes.dtype == np.int8
+    assert np.abs(quantizer.score(codes, query) - vectors @ query).max() < 0.1
+
+
+def test_int8_and_pq_recall_with_rescoring(tmp_path):
+    store, vectors = make_store(str(tmp_path / "emb.embstore"))
+    exact = LocalVectorIndex(store)
+    queries = vectors[:20] + 0.05
+
+    int8 = QuantizedVectorIndex.build(store, "int8")
+    pq = QuantizedVectorIndex.build(store, "pq", pq_subspaces=8)
+
+    assert int8.bytes_per_vector == 32 and pq.bytes_per_vector == 8
+    assert recall_at_k(int8, exact, queries) >= 0.95
+    assert recall_at_k(pq, exact, queries) >= 0.8
+
+    # Rescored scores are exact cosine similarities
+    top = pq.query(vectors[5], top_k=1)[0]
+    assert top[0] == "c5" and abs(top[1] - 1.0) < 1e-5
+
+
+def test_codes_persist_in_store(tmp_path):
+    store, vectors = make_store(str(tmp_path / "emb.embstore"))
+    built = QuantizedVectorIndex.build(store, "pq", pq_subspaces=8)
+    assert os.path.exists(os.path.join(store.path, "pq8.codes.npy"))
+
+    loaded = QuantizedVectorIndex.load(store, "pq", pq_subspaces=8)
+    assert np.array_equal(loaded.codes, built.codes)
+    assert loaded.query(vectors[3], top_k=3) == built.query(vectors[3], top_k=3)
+
+
+def test_filters_apply_before_shortlist(tmp_path):
+    store, vectors = make_store(str(tmp_path / "emb.embstore"))
+    index = get_local_index(store.path, mode="int8")
+
+    hits = index.query(vectors[0], top_k=5, filters={"year": 2023, "category": "Clio Sports"})
+    assert len(hits) == 5
+    assert all(meta["year"] == 2023 and meta["category"] == "Clio Sports" for _, _, meta in hits)
+    assert index.query(vectors[0], filters={"year": 1990}) == []
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
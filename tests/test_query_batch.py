@@ -0,0 +1,132 @@
+"""
+Batch Query Tests: Verifies query_batch embedding batches, ordering, per-item errors and rate limits (offline).
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.rag import rag_pipeline, retriever, response_generator
+from src.vector_db import embedders, pinecone_utils
+from src.vector_db.embedders import Embedder
+from src.vector_db.rate_limiter import RateLimiter
+
+
+class FakeEmbedder(Embedder):
+    name = "fake:embedder"
+    remote = True
+    max_batch_size = 2
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def embed_queries(self, texts):
+        self.calls.append(list(texts))
+        if self.fail_on in texts:
+            raise RuntimeError("quota exceeded")
+        return [[float(len(text)), 1.0] for text in texts]
+
+    embed_documents = embed_queries
+
+    async def embed_queries_async(self, texts):
+        return self.embed_queries(texts)
+
+
+class FakeModels:
+    """
+    Gemini stand-in that records how many generations run at once.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        return SimpleNamespace(text=f" Answer to: {contents.split('User Question: ')[-1].splitlines()[0]} ")
+
+
+def make_match(match_id):
+    return {'id': match_id, 'score': 0.5, 'title': match_id, 'url': '#', 'content': match_id,
+            'excerpt': match_id, 'year': None, 'category': None, 'page_type': 'winners'}
+
+
+def test_queries_are_embedded_in_few_batched_calls(monkeypatch):
+    embedder = FakeEmbedder(fail_on="e")
+    monkeypatch.setattr(embedders, "_embedder", embedder)
+    monkeypatch.setattr(pinecone_utils, "get_embedding_cache", lambda: None)
+
+    vectors = asyncio.run(pinecone_utils.embed_query_batch_async(["a", "bb", "a", "ccc", "e"]))
+
+    # Duplicates are embedded once, max_batch_size texts per call
+    assert sorted(embedder.calls) == [["a", "bb"], ["ccc", "e"]]
+    assert vectors[:3] == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    # A failed batch only loses its own queries
+    assert vectors[3:] == [None, None]
+
+
+def test_batch_runs_concurrently_in_order_with_per_item_errors(monkeypatch):
+    embedded = []
+    searched = []
+    models = FakeModels()
+
+    async def fake_embed_batch(texts):
+        embedded.append(list(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    def fake_search(embedding, top_k=5, filters=None):
+        searched.append(filters)
+        return [make_match("a")]
+
+    real_retrieve = rag_pipeline.retrieve_async
+
+    async def retrieve_or_fail(user_query, filters=None, query_embedding=None):
+        if "broken" in user_query:
+            raise RuntimeError("index unavailable")
+        return await real_retrieve(user_query, filters=filters, query_embedding=query_embedding)
+
+    monkeypatch.setattr(rag_pipeline, "embed_query_batch_async", fake_embed_batch)
+    monkeypatch.setattr(rag_pipeline, "retrieve_async", retrieve_or_fail)
+    monkeypatch.setattr(rag_pipeline, "answer_cache", None)
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", False)
+    monkeypatch.setattr(retriever, "get_reranker", lambda: None)
+    monkeypatch.setattr(retriever, "search_by_vector", fake_search)
+    monkeypatch.setattr(response_generator, "get_gemini_client",
+                        lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    # Pace generation: one call at once, then one every 10 ms
+    limiter = RateLimiter(rpm=6000, burst=1)
+    monkeypatch.setattr(response_generator, "get_llm_limiter", lambda: limiter)
+
+    queries = [f"Who won Clio Sports 2025? #{i}" for i in range(6)] + ["broken query"]
+    responses = rag_pipeline.query_batch(queries, concurrency=3)
+
+    assert embedded == [queries]
+    assert [r['query'] for r in responses] == queries
+    assert [r['answer'] for r in responses[:6]] == [f"Answer to: Who won Clio Sports 2025? #{i}" for i in range(6)]
+    assert responses[0]['filters_used'] == {"year": 2025, "category": "Clio Sports", "page_type": "winners"}
+    assert responses[0]['filters_used'] in searched
+
+    broken = responses[6]
+    assert broken['has_answer'] is False
+    assert broken['error'] == "index unavailable"
+    assert broken['sources'] == []
+
+    assert 1 <= models.peak <= 3
+    waits = sum(r['usage'].get('rate_limit_wait_seconds', {}).get('llm', 0) for r in responses)
+    assert waits > 0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
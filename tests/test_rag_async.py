@@ -0,0 +1,98 @@
+"""
+Async Pipeline Tests: Verifies query_async and concurrent retrieval with stubbed backends (offline).
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.rag import rag_pipeline, retriever, response_generator
+
+
+def make_match(match_id, year):
+    return {'id': match_id, 'score': 0.5, 'title': match_id, 'url': '#', 'content': match_id,
+            'excerpt': match_id, 'year': year, 'category': None, 'page_type': 'winners'}
+
+
+class FakeModels:
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(text=" Answer. ")
+
+
+def install_fakes(monkeypatch, filtered, unfiltered, search_delay=0.1):
+    calls = []
+
+    async def fake_embed(text):
+        return [1.0, 0.0]
+
+    def fake_search(embedding, top_k=5, filters=None):
+        calls.append(filters)
+        time.sleep(search_delay)
+        return filtered if filters else unfiltered
+
+    monkeypatch.setattr(retriever, "embed_query_async", fake_embed)
+    monkeypatch.setattr(rag_pipeline, "embed_query_async", fake_embed)
+    monkeypatch.setattr(rag_pipeline, "answer_cache", None)
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", False)
+    monkeypatch.setattr(retriever, "get_reranker", lambda: None)
+    monkeypatch.setattr(retriever, "search_by_vector", fake_search)
+    monkeypatch.setattr(response_generator, "get_gemini_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=FakeModels())))
+    return calls
+
+
+def test_merge_prefers_filtered_and_dedups():
+    filtered = [make_match("a", 2025)]
+    unfiltered = [make_match("b", 2024), make_match("a", 2025), make_match("c", 2023)]
+
+    merged = retriever.merge_results(filtered, unfiltered, top_k=3)
+    assert [m['id'] for m in merged] == ["a", "b", "c"]
+
+
+def test_filtered_and_unfiltered_searches_run_concurrently(monkeypatch):
+    calls = install_fakes(monkeypatch, filtered=[], unfiltered=[make_match("b", 2024)])
+
+    start = time.time()
+    results = asyncio.run(retriever.retrieve_async("Who won in 2031?", filters={"year": 2031}))
+    elapsed = time.time() - start
+
+    # An empty filtered search still yields results without a second round trip
+    assert [m['id'] for m in results] == ["b"]
+    assert len(calls) == 2
+    assert elapsed < 0.18
+
+
+def test_requests_share_one_event_loop(monkeypatch):
+    install_fakes(monkeypatch, filtered=[make_match("a", 2025)], unfiltered=[], search_delay=0.05)
+
+    async def run_many():
+        return await asyncio.gather(*[rag_pipeline.query_async(f"Who won Clio Sports 2025? #{i}") for i in range(10)])
+
+    start = time.time()
+    responses = asyncio.run(run_many())
+
+    assert time.time() - start < 0.5
+    assert all(r['answer'] == "Answer." for r in responses)
+    assert responses[0]['filters_used']['year'] == 2025
+
+
+def test_sync_query_wraps_async(monkeypatch):
+    install_fakes(monkeypatch, filtered=[make_match("a", 2025)], unfiltered=[make_match("b", 2024)])
+
+    response = rag_pipeline.query("Who won Clio Sports 2025?")
+    assert [s['id'] for s in response['sources']] == ["a", "b"]
+    assert response['has_answer'] is True
+    assert 'processing_time' in response
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
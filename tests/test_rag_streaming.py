@@ -0,0 +1,81 @@
+"""
+Streaming Tests: Verifies query_stream event order with stubbed retrieval and LLM (offline).
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.rag import rag_pipeline, response_generator
+
+SOURCES = [{
+    'id': 'a0da8dcf_0', 'score': 0.9, 'title': 'Clio Sports Winners', 'url': 'https://clios.com/sports/',
+    'content': 'Grand Clio Sports 2025 went to Nike.', 'excerpt': 'Grand Clio Sports 2025 went to Nike....',
+    'year': 2025, 'category': 'Clio Sports', 'page_type': 'winners'
+}]
+
+
+class FakeModels:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+
+    def generate_content_stream(self, model, contents, config=None):
+        def chunks():
+            for i, text in enumerate(["Nike ", "won ", "Grand Clio."]):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise RuntimeError("connection reset")
+                yield SimpleNamespace(text=text)
+        return chunks()
+
+
+def run_stream(monkeypatch, sources, models=None):
+    monkeypatch.setattr(rag_pipeline, "embed_query", lambda text: [1.0, 0.0])
+    monkeypatch.setattr(rag_pipeline, "retrieve", lambda query, filters=None, query_embedding=None: sources)
+    monkeypatch.setattr(rag_pipeline, "answer_cache", None)
+    monkeypatch.setattr(response_generator, "get_gemini_client", lambda: SimpleNamespace(models=models or FakeModels()))
+    return list(rag_pipeline.query_stream("Who won Clio Sports 2025?"))
+
+
+def test_sources_arrive_before_tokens(monkeypatch):
+    events = run_stream(monkeypatch, SOURCES)
+
+    assert events[0]["type"] == "sources"
+    assert events[0]["sources"] == SOURCES
+    assert events[0]["filters_used"] == {"year": 2025, "category": "Clio Sports", "page_type": "winners"}
+    assert [e["text"] for e in events if e["type"] == "token"] == ["Nike ", "won ", "Grand Clio."]
+
+    response = events[-1]["response"]
+    assert events[-1]["type"] == "done"
+    assert response["answer"] == "Nike won Grand Clio."
+    assert response["has_answer"] is True
+    assert response["time_to_first_token"] is not None
+    assert response["time_to_first_token"] <= response["processing_time"]
+    assert list(response["timings"]) == ["filters", "embed", "retrieve", "context", "generate"]
+    assert response["usage"]["api_calls"]["llm"] == 1
+
+
+def test_no_sources_streams_fallback_message(monkeypatch):
+    events = run_stream(monkeypatch, [])
+
+    assert events[0] == {"type": "sources", "sources": [], "filters_used": events[0]["filters_used"]}
+    assert events[-1]["response"]["has_answer"] is False
+
+
+def test_mid_stream_error_keeps_partial_answer(monkeypatch):
+    events = run_stream(monkeypatch, SOURCES, FakeModels(fail_after=2))
+    response = events[-1]["response"]
+
+    assert response["answer"] == "Nike won"
+    assert response["confidence"] == "medium"
+    assert "connection reset" in response["error"]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
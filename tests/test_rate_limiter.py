@@ -0,0 +1,127 @@
+"""
+Rate Limiter Tests: Verifies token-bucket behaviour, 429 backoff and shared state.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_db.rate_limiter import RateLimiter, is_rate_limit_error
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+def test_burst_is_free_then_blocks():
+    limiter = RateLimiter(rpm=600, burst=3)  # refills one request every 0.1s
+
+    start = time.time()
+    for _ in range(3):
+        assert limiter.acquire() == 0.0
+    assert time.time() - start < 0.05
+
+    waited = limiter.acquire()
+    assert 0.05 < waited < 0.3
+
+
+def test_token_budget_limits_large_requests():
+    limiter = RateLimiter(rpm=6000, tpm=600, burst=10)  # 10 tokens per second
+
+    assert limiter.acquire(tokens=600) == 0.0
+    start = time.time()
+    limiter.acquire(tokens=2)
+    assert time.time() - start >= 0.1
+
+
+def test_rate_limited_backoff_and_recovery():
+    limiter = RateLimiter(rpm=6000, burst=1)
+    limiter.report_rate_limited(retry_after=0.1)
+    assert limiter.stats()["rate_factor"] == 0.5
+
+    waited = limiter.acquire()
+    assert waited >= 0.05
+
+    for _ in range(5):
+        limiter.report_success()
+    assert limiter.stats()["rate_factor"] == 1.0
+
+
+def test_call_retries_on_429():
+    limiter = RateLimiter(rpm=60000, burst=5)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise QuotaError("RESOURCE_EXHAUSTED")
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert len(attempts) == 2
+    assert limiter.stats()["rate_limited"] == 1
+    assert is_rate_limit_error(QuotaError())
+    assert not is_rate_limit_error(ValueError("bad input"))
+
+
+def test_rate_limit_errors_are_matched_narrowly():
+    assert is_rate_limit_error(RuntimeError("429 RESOURCE_EXHAUSTED. {'error': {'code': 429}}"))
+    assert is_rate_limit_error(RuntimeError("(429)\nReason: Too Many Requests"))
+    assert is_rate_limit_error(RuntimeError("Server returned HTTP 429"))
+    assert is_rate_limit_error(SimpleNamespace(status="RESOURCE_EXHAUSTED"))
+    # A 429 that is not a status code is not a quota error
+    assert not is_rate_limit_error(ValueError("Error processing batch starting at chunk_4290"))
+    assert not is_rate_limit_error(ValueError("Expected 429 embeddings, got 428"))
+    assert not is_rate_limit_error(TimeoutError("read timed out after 1429 ms"))
+
+
+def test_state_file_is_shared(tmp_path):
+    state_file = str(tmp_path / "ratelimit_test.json")
+    first = RateLimiter(rpm=60, burst=2, state_file=state_file)
+    second = RateLimiter(rpm=60, burst=2, state_file=state_file)
+
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+    # The shared bucket is now empty for both
+    assert first._try_acquire(1) > 0
+    assert second._try_acquire(1) > 0
+
+
+def test_acquire_async_does_not_block_loop():
+    limiter = RateLimiter(rpm=600, burst=1)
+
+    async def run():
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.time())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(limiter.acquire_async(), limiter.acquire_async(), ticker())
+        return ticks
+
+    assert len(asyncio.run(run())) == 5
+
+
+def test_call_gives_up_when_the_wait_passes_the_deadline():
+    limiter = RateLimiter(rpm=6, burst=1)  # one request every 10s
+    limiter.call(lambda: None)
+
+    start = time.time()
+    try:
+        limiter.call(lambda: None, deadline=time.monotonic() + 0.5)
+        assert False, "expected TimeoutError"
+    except TimeoutError:
+        pass
+    assert time.time() - start < 0.1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,126 @@
+"""
+Reranker Tests: Verifies cross-encoder reranking, the score cache, the time budget and the over-fetch (offline).
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.rag import clients, metrics, retriever
+from src.rag.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """
+    Scores a pair by the share of query words found in the passage.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(len(pairs))
+        scores = []
+        for query, passage in pairs:
+            words = query.lower().split()
+            scores.append(sum(word in passage.lower() for word in words) / len(words))
+        return scores
+
+
+def make_match(match_id, content):
+    return {'id': match_id, 'score': 0.5, 'title': match_id, 'url': f"https://clios.com/{match_id}",
+            'content': content, 'excerpt': content, 'year': None, 'category': None, 'page_type': 'winners'}
+
+
+MATCHES = [
+    make_match("jury", "Clio Sports jury members"),
+    make_match("nav", "Latest stories from Muse"),
+    make_match("winner", "Nike won the Grand Clio Sports award"),
+]
+
+
+def test_rerank_orders_by_score_in_one_batch_and_applies_threshold():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model)
+
+    results = reranker.rerank("nike grand clio sports", MATCHES, top_k=5, threshold=0.3)
+
+    assert [m['id'] for m in results] == ["winner", "jury"]
+    assert results[0]['rerank_score'] == 1.0
+    assert model.calls == [3]
+    # Nothing passes the threshold: the best match is still kept
+    assert [m['id'] for m in reranker.rerank("gold lion", MATCHES, threshold=0.5)][:1] == ["jury"]
+
+
+def test_logits_are_squashed_before_the_threshold():
+    class LogitCrossEncoder:
+        def predict(self, pairs, batch_size=32, show_progress_bar=False):
+            return [{"jury": -2.0, "nav": -9.0, "winner": 6.0}[passage.split("\n")[0]] for _, passage in pairs]
+
+    results = CrossEncoderReranker(LogitCrossEncoder(), logits=True).rerank("nike", MATCHES, threshold=0.05)
+
+    # Raw logits would drop everything below 0.05; as probabilities only the nav match falls out
+    assert [m['id'] for m in results] == ["winner", "jury"]
+    assert 0.99 < results[0]['rerank_score'] < 1.0 and 0.1 < results[1]['rerank_score'] < 0.2
+
+
+def test_scores_are_cached_per_query_and_chunk():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model)
+    trace = metrics.QueryTrace()
+
+    reranker.rerank("nike", MATCHES, threshold=0.0)
+    with trace.active():
+        reranker.rerank("nike", MATCHES + [make_match("new", "Nike")], threshold=0.0)
+
+    assert model.calls == [3, 1]
+    assert trace.usage()["cache_hits"] == {"rerank": 3}
+    assert "rerank" in trace.timings()
+
+
+def test_time_budget_limits_inference():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model)
+    reranker.seconds_per_pair = 0.1  # learned from earlier batches
+
+    results = reranker.rerank("nike grand clio sports", MATCHES, top_k=5, threshold=0.0, time_budget_ms=250)
+    assert model.calls == [2]
+    assert [m['id'] for m in results] == ["jury", "nav"]
+
+    # The query deadline has passed: no inference, retrieval order unchanged
+    with clients.deadline(time.monotonic() - 1):
+        assert reranker.rerank("sports", MATCHES, top_k=2) == MATCHES[:2]
+    assert model.calls == [2]
+
+
+def test_retrieve_over_fetches_and_reranks(monkeypatch):
+    model = FakeCrossEncoder()
+    fetched = []
+
+    def fake_search(embedding, top_k=5, filters=None):
+        fetched.append(top_k)
+        return [make_match(f"m{i}", "Nike won" if i == 30 else "Other page") for i in range(top_k)]
+
+    monkeypatch.setattr(retriever, "search_by_vector", fake_search)
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", False)
+    monkeypatch.setattr(retriever, "RERANK_CANDIDATES", 40)
+    monkeypatch.setattr(retriever, "get_reranker", lambda: CrossEncoderReranker(model))
+
+    results = asyncio.run(retriever.retrieve_async("nike won", query_embedding=[1.0, 0.0], top_k=3))
+
+    assert fetched == [40]
+    assert model.calls == [40]
+    assert results[0]['id'] == "m30"
+    assert len(results) == 1  # the rest fall below the threshold
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,116 @@
+"""
+Upload Tests: Verifies size-aware batching, concurrent upserts, retries and dead letters (offline).
+"""
+
+import json
+import os
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.rag import clients
+from src.vector_db import upload_to_pinecone as upload
+from src.preprocessing.manifest import Manifest
+
+
+class FakeIndex:
+    def __init__(self, fail_ids=(), transient_failures=0):
+        self.upserts = []
+        self.deleted = []
+        self.fail_ids = set(fail_ids)
+        self.transient_failures = transient_failures
+        self.timeouts = []
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, timeout=None):
+        with self._lock:
+            self.timeouts.append(timeout)
+            if self.transient_failures:
+                self.transient_failures -= 1
+                raise RuntimeError("503 Service Unavailable")
+            if any(v['id'] in self.fail_ids for v in vectors):
+                raise RuntimeError("400 Bad Request")
+            self.upserts.append([v['id'] for v in vectors])
+
+    def delete(self, ids, timeout=None):
+        self.timeouts.append(timeout)
+        self.deleted.extend(ids)
+
+
+def write_vectors(path, count, dims=8):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"v{i}", "values": [0.1] * dims, "metadata": {"text": "x" * i}}) + "\n")
+
+
+def install(monkeypatch, index):
+    monkeypatch.setattr(clients, "_pinecone_index", index)
+    monkeypatch.setattr(upload.time, "sleep", lambda seconds: None)
+
+
+def test_batches_respect_byte_and_count_limits(tmp_path):
+    path = str(tmp_path / "emb.jsonl")
+    write_vectors(path, 50)
+
+    batches = list(upload.pack_batches(upload.iter_vectors(path), max_bytes=1000, max_vectors=7))
+    sizes = {v['id']: size for v, size in upload.iter_vectors(path)}
+
+    assert sum(len(b) for b in batches) == 50
+    assert all(len(b) <= 7 for b in batches)
+    assert all(sum(sizes[v['id']] for v in b) <= 1000 for b in batches if len(b) > 1)
+
+
+def test_retries_transient_errors(tmp_path, monkeypatch):
+    index = FakeIndex(transient_failures=2)
+    install(monkeypatch, index)
+    path = str(tmp_path / "emb.jsonl")
+    write_vectors(path, 30)
+
+    stats = upload.upload_vectors(path, batch_size=10, workers=3, dead_letter_file=str(tmp_path / "dead.jsonl"))
+
+    assert stats["uploaded"] == 30 and stats["failed"] == 0
+    assert sorted(i for batch in index.upserts for i in batch) == sorted(f"v{i}" for i in range(30))
+    # Every request (retries included) carries the shared client layer's timeout
+    assert len(index.timeouts) == 5 and set(index.timeouts) == {clients.PINECONE_TIMEOUT_SECONDS}
+
+
+def test_failed_batches_go_to_dead_letter_and_replay(tmp_path, monkeypatch):
+    index = FakeIndex(fail_ids={"v12"})
+    install(monkeypatch, index)
+    path, dead = str(tmp_path / "emb.jsonl"), str(tmp_path / "dead.jsonl")
+    write_vectors(path, 30)
+
+    stats = upload.upload_vectors(path, batch_size=10, dead_letter_file=dead)
+    assert stats["failed"] == 10
+    with open(dead, 'r', encoding='utf-8') as f:
+        assert [json.loads(line)['id'] for line in f] == [f"v{i}" for i in range(10, 20)]
+
+    index.fail_ids.clear()
+    assert upload.replay_dead_letters(dead)["uploaded"] == 10
+    assert not os.path.exists(dead)
+
+
+def test_manifest_sync_upserts_changes_and_deletes_removed(tmp_path, monkeypatch):
+    index = FakeIndex()
+    install(monkeypatch, index)
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    path = str(tmp_path / "emb.jsonl")
+
+    write_vectors(path, 5)
+    upload.upload_vectors(path, manifest=manifest)
+    index.upserts.clear()
+
+    write_vectors(path, 3)
+    stats = upload.upload_vectors(path, manifest=manifest)
+
+    assert index.upserts == []
+    assert sorted(index.deleted) == ["v3", "v4"]
+    assert stats["unchanged"] == 3
+    assert sorted(manifest.hashes("upload")) == ["v0", "v1", "v2"]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -2,11 +2,14 @@ import streamlit as st
 import time
 import sys
 import os
+from itertools import chain
 
 # Add project root to path so we can import src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.rag.chat_handler import chat
+from src.rag import warmup
+from src.rag.clients import stats as client_stats
+from src.rag.chat_handler import chat_stream
 
 # Page Config
 st.set_page_config(
@@ -46,6 +49,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner="Connecting to Gemini and the vector index...")
+def warm_clients():
+    """Build API clients and indexes once per server process, not on the first question."""
+    return warmup()
+
+warm_clients()
+
 # Header
 st.title("Clio Awards Assistant")
 st.markdown("Ask me about Clio Awards winners, jury members, and events.")
@@ -60,6 +70,37 @@ if "last_processing_time" not in st.session_state:
 if "last_filters" not in st.session_state:
     st.session_state.last_filters = {}
 
+if "last_time_to_first_token" not in st.session_state:
+    st.session_state.last_time_to_first_token = None
+
+if "last_cache_hit" not in st.session_state:
+    st.session_state.last_cache_hit = False
+
+if "last_timings" not in st.session_state:
+    st.session_state.last_timings = {}
+
+if "last_usage" not in st.session_state:
+    st.session_state.last_usage = {}
+
+def render_sources(sources):
+    """Render the sources expander for an assistant message."""
+    with st.expander("📚 View Sources"):
+        for i, source in enumerate(sources, 1):
+            st.markdown(f"**{i}. [{source['title']}]({source.get('url', '#')})**")
+            
+            # Metadata tags
+            meta = []
+            if source.get('year'): meta.append(f"Year: {source['year']}")
+            if source.get('category'): meta.append(f"Category: {source['category']}")
+            if source.get('page_type'): meta.append(f"Type: {source['page_type']}")
+            
+            if meta:
+                st.markdown(f"<div style='margin-bottom:5px'>{' '.join([f'<span class=metadata-tag>{m}</span>' for m in meta])}</div>", unsafe_allow_html=True)
+            
+            st.markdown(f"_{source.get('excerpt', '')[:200]}..._")
+            if i < len(sources):
+                st.divider()
+
 # Sidebar
 with st.sidebar:
     st.header("About")
@@ -81,8 +122,25 @@ with st.sidebar:
     st.subheader("Performance")
     if st.session_state.last_processing_time:
         st.metric("Processing Time", f"{st.session_state.last_processing_time}s")
+        if st.session_state.last_time_to_first_token is not None:
+            st.metric("Time to First Token", f"{st.session_state.last_time_to_first_token}s")
+        if st.session_state.last_cache_hit:
+            st.caption("⚡ Answered from the semantic cache (no LLM call)")
+        if st.session_state.last_timings:
+            st.markdown("**Stage Breakdown (ms)**")
+            st.table({"Stage": list(st.session_state.last_timings),
+                      "ms": list(st.session_state.last_timings.values())})
+        if st.session_state.last_usage:
+            usage_lines = [f"- {name.replace('_', ' ').capitalize()}: " +
+                           ", ".join(f"{label} {value:g}" for label, value in values.items())
+                           for name, values in st.session_state.last_usage.items()]
+            st.markdown("\n".join(usage_lines))
     else:
         st.info("Ask a question to see stats.")
+    
+    with st.expander("API Clients"):
+        # Process-wide: calls, timeouts and pooled connections across all sessions
+        st.json(client_stats())
         
     if st.session_state.last_filters:
         st.subheader("Filters Applied")
@@ -94,21 +152,7 @@ for message in st.session_state.messages:
         st.markdown(message["content"])
         # If there are sources in the message metadata, show them
         if "sources" in message and message["sources"]:
-            with st.expander("📚 View Sources"):
-                for i, source in enumerate(message["sources"], 1):
-                    st.markdown(f"**{i}. [{source['title']}]({source.get('url', '#')})**")
-                    
-                    # Metadata tags
-                    meta = []
-                    if source.get('year'): meta.append(f"Year: {source['year']}")
-                    if source.get('category'): meta.append(f"Category: {source['category']}")
-                    if source.get('page_type'): meta.append(f"Type: {source['page_type']}")
-                    
-                    if meta:
-                        st.markdown(f"<div style='margin-bottom:5px'>{' '.join([f'<span class=metadata-tag>{m}</span>' for m in meta])}</div>", unsafe_allow_html=True)
-                    
-                    st.markdown(f"_{source.get('excerpt', '')[:200]}..._")
-                    st.divider()
+            render_sources(message["sources"])
 
 # Chat Input
 if prompt := st.chat_input("Ex: Who won Clio Sports 2025?"):
@@ -117,44 +161,45 @@ if prompt := st.chat_input("Ex: Who won Clio Sports 2025?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Generate Response
+    # Generate Response (sources appear as soon as retrieval finishes, then the answer streams in)
     with st.chat_message("assistant"):
+        answer_area = st.container()
+        sources_area = st.container()
+        
+        events = chat_stream(prompt)
         with st.spinner("Searching Clio database..."):
-            # Call Chat Handler
-            response = chat(prompt)
-            
-            # Update Session State Stats
-            st.session_state.last_processing_time = response.get("processing_time", 0)
-            st.session_state.last_filters = response.get("filters_used", {})
-            
-            # Display Answer
-            st.markdown(response["answer"])
-            
-            # Display Sources
-            sources = response.get("sources", [])
-            if sources:
-                with st.expander("📚 View Sources"):
-                    for i, source in enumerate(sources, 1):
-                        st.markdown(f"**{i}. [{source['title']}]({source.get('url', '#')})**")
-                        
-                        meta = []
-                        if source.get('year'): meta.append(f"Year: {source['year']}")
-                        if source.get('category'): meta.append(f"Category: {source['category']}")
-                        if source.get('page_type'): meta.append(f"Type: {source['page_type']}")
-                        
-                        if meta:
-                            st.markdown(f"<div style='margin-bottom:5px'>{' '.join([f'<span class=metadata-tag>{m}</span>' for m in meta])}</div>", unsafe_allow_html=True)
-                        
-                        st.markdown(f"_{source.get('excerpt', '')[:200]}..._")
-                        if i < len(sources):
-                            st.divider()
-            
-            # Add assistant message to history (with sources for persistence)
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": response["answer"],
-                "sources": sources
-            })
-            
-            # Force rerun to update sidebar stats immediately
-            st.rerun()
+            first_event = next(events)
+        
+        response = {}
+        
+        def answer_tokens():
+            for event in chain([first_event], events):
+                if event["type"] == "sources":
+                    if event["sources"]:
+                        with sources_area:
+                            render_sources(event["sources"])
+                elif event["type"] == "token":
+                    yield event["text"]
+                elif event["type"] == "done":
+                    response.update(event["response"])
+        
+        with answer_area:
+            st.write_stream(answer_tokens())
+        
+        # Update Session State Stats
+        st.session_state.last_processing_time = response.get("processing_time", 0)
+        st.session_state.last_time_to_first_token = response.get("time_to_first_token")
+        st.session_state.last_filters = response.get("filters_used", {})
+        st.session_state.last_cache_hit = response.get("cache_hit", False)
+        st.session_state.last_timings = response.get("timings", {})
+        st.session_state.last_usage = response.get("usage", {})
+        
+        # Add assistant message to history (with sources for persistence)
+        st.session_state.messages.append({
+            "role": "assistant", 
+            "content": response.get("answer", ""),
+            "sources": response.get("sources", [])
+        })
+        
+        # Force rerun to update sidebar stats immediately
+        st.rerun()